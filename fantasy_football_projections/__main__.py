@@ -0,0 +1,6 @@
+
+from fantasy_football_projections.cli import main
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+
+import argparse
+import importlib
+import threading
+import time
+
+from fantasy_football_projections.config import TRAINABLE_POSITIONS
+
+
+# Every command imports what it needs when it runs, so `ffproj --help` and
+# `ffproj project` never load plotting, sklearn or unused pipelines
+
+def build(args):
+    """
+    Builds and writes position datasets, see pipeline.engine.write_position_datasets()
+    """
+    from fantasy_football_projections.pipeline.engine import write_position_datasets
+
+    locations = write_position_datasets(args.seasons, args.positions, args.workers)
+    for position, location in locations.items():
+        print(f"{position}: {location}")
+
+def train(args):
+    """
+    Trains and saves a position's model from a dataset
+    """
+    training = importlib.import_module(f"fantasy_football_projections.{args.position.lower()}_modeling.training")
+    training.train_and_save(
+        args.location, show_metrics=args.metrics, show_visuals=args.visuals, visuals_dir=args.visuals_dir
+    )
+
+def retrain(args):
+    """
+    Trains and saves several models concurrently, each fit on its own share of the cores
+    """
+    from fantasy_football_projections.utils.training_scheduler import TrainingJob, run_training_jobs
+
+    jobs = []
+    for spec in args.jobs:
+        position, location, *path = spec.split(":", 2)
+        if position not in TRAINABLE_POSITIONS:
+            raise ValueError(f"Position of job {spec} can't be trained, use one of {TRAINABLE_POSITIONS}")
+        jobs.append(TrainingJob(position, location, path=path[0] if path else None))
+    print(run_training_jobs(jobs, args.workers))
+
+def project(args):
+    """
+    Projects a player's next game, or every wr for a week (or the rest of the season)
+    """
+    # lightgbm is the slowest import, it loads while features are prepared
+    loader = threading.Thread(target=importlib.import_module, args=("lightgbm",), daemon=True)
+    loader.start()
+
+    from fantasy_football_projections.data_loading import load_models
+    from fantasy_football_projections.wr_modeling import project as wr_project
+
+    load_models.WR_LATENCY_BUDGET_MS = args.latency_budget
+
+    if args.player:
+        cache = wr_project.PROJECTION_CACHE
+        if args.cache:
+            from fantasy_football_projections.utils.projection_cache import ProjectionCache
+            cache = ProjectionCache(path=args.cache)
+        points = wr_project.project_player_points(args.player, args.season, args.week, cache)
+        print("bye" if points is None else f"{args.player}: {points:.2f}")
+        return
+
+    table = wr_project.project_rest_of_season(args.season, args.week, args.players)
+    if not args.rest_of_season:
+        week = str(args.week)
+        table = table.select("player_id", week).drop_nulls(week).sort(week, descending=True)
+    print(table.head(args.limit) if args.limit else table)
+
+def compress(args):
+    """
+    Builds, reports and saves compressed variants of the saved wr model
+    """
+    from fantasy_football_projections.wr_modeling.training import compress_and_save
+
+    from fantasy_football_projections.utils.model_compression import DEFAULT_TOLERANCE
+
+    print(compress_and_save(args.location, DEFAULT_TOLERANCE if args.tolerance is None else args.tolerance))
+
+def explain(args):
+    """
+    Explains every wr's projection for a week by stat
+    """
+    from fantasy_football_projections.wr_modeling import project as wr_project
+
+    table = wr_project.explain_week(args.season, args.week, args.players, args.top)
+    if args.output:
+        table.write_parquet(args.output)
+    else:
+        print(table)
+
+def bench(args):
+    """
+    Times the lineup optimizer on synthetic slates
+    """
+    from fantasy_football_projections.utils.lineup_optimizer import benchmark
+
+    start = time.perf_counter()
+    large_slates = tuple(tuple(int(part) for part in case.split(":")) for case in args.large_slates)
+    print(benchmark(tuple(args.slate_sizes), tuple(args.k), args.repeats, large_slates=large_slates))
+    print(f"total: {time.perf_counter() - start:.2f}s")
+
+def parser()->argparse.ArgumentParser:
+    """
+    :return: The ffproj argument parser
+    """
+    root = argparse.ArgumentParser(prog="ffproj", description="Fantasy football projections")
+    commands = root.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser("build", help="Build position datasets")
+    build_parser.add_argument("seasons", type=int, nargs="+")
+    build_parser.add_argument("--positions", nargs="+", choices=["WR", "TE", "RB", "QB"], default=["WR", "RB"])
+    build_parser.add_argument("--workers", type=int, default=1, help="Processes building seasons in parallel")
+    build_parser.set_defaults(func=build)
+
+    train_parser = commands.add_parser("train", help="Train and save a model")
+    train_parser.add_argument("position", choices=TRAINABLE_POSITIONS)
+    train_parser.add_argument("location", help="Parquet file of the training data-frame")
+    train_parser.add_argument("--metrics", action="store_true", help="Print test metrics")
+    train_parser.add_argument("--visuals", action="store_true", help="Show training plots")
+    train_parser.add_argument("--visuals-dir", help="Save training plots as png files instead of showing them")
+    train_parser.set_defaults(func=train)
+
+    retrain_parser = commands.add_parser("retrain", help="Train and save several models concurrently")
+    retrain_parser.add_argument("jobs", nargs="+", help="POSITION:LOCATION[:MODEL_PATH] of each model")
+    retrain_parser.add_argument("--workers", type=int, help="Concurrent fits, one per job if omitted")
+    retrain_parser.set_defaults(func=retrain)
+
+    project_parser = commands.add_parser("project", help="Project a player or a week of wrs")
+    project_parser.add_argument("season", type=int)
+    project_parser.add_argument("week", type=int)
+    project_parser.add_argument("--player", help="gsis id of a single player")
+    project_parser.add_argument("--players", nargs="+", help="gsis ids to project, every wr if omitted")
+    project_parser.add_argument("--rest-of-season", action="store_true", help="Project every remaining week")
+    project_parser.add_argument("--limit", type=int, default=0, help="Rows printed, 0 for all")
+    project_parser.add_argument("--cache", help="sqlite file caching single player projections across runs")
+    project_parser.add_argument("--latency-budget", type=float, help="Max ms per prediction, serves a compressed model")
+    project_parser.set_defaults(func=project)
+
+    compress_parser = commands.add_parser("compress", help="Build and save compressed wr models")
+    compress_parser.add_argument("location", help="Parquet file the wr model was trained on")
+    compress_parser.add_argument(
+        "--tolerance", type=float, help="Relative MAE increase allowed, model_compression.DEFAULT_TOLERANCE if omitted"
+    )
+    compress_parser.set_defaults(func=compress)
+
+    explain_parser = commands.add_parser("explain", help="Explain a week of wr projections")
+    explain_parser.add_argument("season", type=int)
+    explain_parser.add_argument("week", type=int)
+    explain_parser.add_argument("--players", nargs="+", help="gsis ids to explain, every wr if omitted")
+    explain_parser.add_argument("--top", type=int, help="Stats kept per player, all if omitted")
+    explain_parser.add_argument("--output", help="Parquet file the table is written to instead of printed")
+    explain_parser.set_defaults(func=explain)
+
+    bench_parser = commands.add_parser("bench", help="Benchmark the lineup optimizer")
+    bench_parser.add_argument("--slate-sizes", type=int, nargs="+", default=[100, 200, 300, 500])
+    bench_parser.add_argument("--k", type=int, nargs="+", default=[1, 20])
+    bench_parser.add_argument("--repeats", type=int, default=3)
+    bench_parser.add_argument("--large-slates", nargs="*", default=["1500:100"],
+                              help="Extra PLAYERS:K cases, ex. a full main slate with many lineups")
+    bench_parser.set_defaults(func=bench)
+
+    return root
+
+def main(argv=None):
+    """
+    ffproj entry point
+    :param list[str] argv: Arguments, sys.argv[1:] if None
+    """
+    args = parser().parse_args(argv)
+    args.func(args)
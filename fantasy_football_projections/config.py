@@ -5,9 +5,16 @@ PPR = 1.0
 
 EXPLOSIVE_RUN = 10 # Minimum distance for a rushing play to be considered 'explosive'
 EXPLOSIVE_RECEPTION = 12 # Minimum distance for a reception to be considered 'explosive'
+REDZONE_YARDLINE = 20 # Yards from the endzone inside which opportunities are distance weighted
+
+TRAINABLE_POSITIONS = ("WR",) # Positions with a runnable training module, rb_modeling reads rb metrics that aren't written yet
 
 POINTS_PER_RUSH_YARD = 0.1
 POINTS_PER_REC_YARD = 0.1
 
 POINTS_PER_RUSH_TD = 6
-POINTS_PER_REC_TD = 6
\ No newline at end of file
+POINTS_PER_REC_TD = 6
+
+POINTS_PER_PASS_YARD = 0.04
+POINTS_PER_PASS_TD = 4
+POINTS_PER_INTERCEPTION = -2
\ No newline at end of file
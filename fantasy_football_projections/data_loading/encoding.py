@@ -0,0 +1,97 @@
+
+import polars as pl
+
+
+# Every current team, frames store teams as this Enum instead of strings
+TEAMS = (
+    "ARI", "ATL", "BAL", "BUF", "CAR", "CHI", "CIN", "CLE",
+    "DAL", "DEN", "DET", "GB", "HOU", "IND", "JAX", "KC",
+    "LA", "LAC", "LV", "MIA", "MIN", "NE", "NO", "NYG",
+    "NYJ", "PHI", "PIT", "SEA", "SF", "TB", "TEN", "WAS",
+)
+TEAM = pl.Enum(TEAMS)
+
+# Relocated teams and alternate abbreviations mapped to the current team
+LEGACY_TEAMS = {"OAK": "LV", "SD": "LAC", "STL": "LA", "LAR": "LA"}
+
+# Cols encoded by encode_frame()
+TEAM_COLS = (
+    "team", "opponent_team", "posteam", "defteam", "home_team", "away_team",
+    "recent_team", "team_abbr", "opponent",
+)
+ID_COLS = (
+    "player_id", "gsis_id", "player_gsis_id",
+    "passer_player_id", "rusher_player_id", "receiver_player_id",
+)
+
+# gsis ids are "00-" followed by 7 digits, the digits are the player's UInt32 code
+GSIS_PREFIX = "00-"
+GSIS_DIGITS = 7
+
+
+def encode_gsis_id(gsis_id)->int | None:
+    """
+    :param str | int gsis_id: gsis id ("00-0033873") or an already encoded id
+    :return: UInt32 code of the id (33873), None if it is not a gsis id
+    """
+    if gsis_id is None or isinstance(gsis_id, int):
+        return gsis_id
+    if not gsis_id.startswith(GSIS_PREFIX) or not gsis_id[len(GSIS_PREFIX):].isdigit():
+        return None
+    return int(gsis_id[len(GSIS_PREFIX):])
+
+def decode_gsis_id(code)->str | None:
+    """
+    :param int code: Encoded gsis id
+    :return: The gsis id string ("00-0033873")
+    """
+    return None if code is None else f"{GSIS_PREFIX}{code:0{GSIS_DIGITS}d}"
+
+def gsis_code(expr)->pl.Expr:
+    """
+    :param pl.Expr expr: String gsis ids
+    :return: UInt32 codes, null where the value is not a gsis id
+    """
+    digits = expr.str.strip_prefix(GSIS_PREFIX)
+    return pl.when(expr.str.starts_with(GSIS_PREFIX)).then(digits.cast(pl.UInt32, strict=False))
+
+def gsis_string(expr)->pl.Expr:
+    """
+    :param pl.Expr expr: UInt32 gsis codes
+    :return: gsis id strings
+    """
+    return pl.lit(GSIS_PREFIX) + expr.cast(pl.String).str.zfill(GSIS_DIGITS)
+
+def team_code(expr)->pl.Expr:
+    """
+    :param pl.Expr expr: String team abbreviations
+    :return: TEAM Enum, legacy abbreviations mapped and unknown values null
+    """
+    return expr.replace(LEGACY_TEAMS).cast(TEAM, strict=False)
+
+def encode_frame(df)->pl.DataFrame:
+    """
+    Dictionary encodes a freshly loaded frame: team cols become TEAM and gsis id cols UInt32
+    :param pl.DataFrame | pl.LazyFrame df: Any nflverse frame
+    :return: df with every present TEAM_COLS and ID_COLS col encoded
+    """
+    schema = df.collect_schema()
+    exprs = [
+        team_code(pl.col(col)).alias(col)
+        for col in TEAM_COLS if schema.get(col) == pl.String
+    ] + [
+        gsis_code(pl.col(col)).alias(col)
+        for col in ID_COLS if schema.get(col) == pl.String
+    ]
+    return df.with_columns(exprs) if exprs else df
+
+def game_key(player="player_id", season="season", week="week")->pl.Expr:
+    """
+    Packs (season, week, player) into one UInt64 so joins and group_bys run on a single int
+    :param str player: Encoded player id col
+    :param str season: Season col
+    :param str week: Week col
+    :return: UInt64 key, (season * 100 + week) in the high 32 bits and the player in the low 32
+    """
+    game = pl.col(season).cast(pl.UInt64) * 100 + pl.col(week).cast(pl.UInt64)
+    return game * (1 << 32) + pl.col(player).cast(pl.UInt64)
@@ -1,19 +1,64 @@
 
-from lightgbm import Booster
+import hashlib
 import os
+from functools import lru_cache
+
+# Saved boosters, overwritten by each position's training.train_and_save()
+RB_MODEL_PATH = "fantasy_football_projections/data_loading/models/rb_model.txt"
+WR_MODEL_PATH = "fantasy_football_projections/data_loading/models/wr_model.txt"
+
+# Max ms for a single wr prediction, a compressed variant (see wr_modeling.training.compress_and_save())
+# within the budget is served instead of the full model. None always serves the full model
+WR_LATENCY_BUDGET_MS = None
+
+
+@lru_cache(maxsize=None)
+def _file_hash(path, modified, size)->str:
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+def save_booster(booster, path):
+    """
+    Saves a model next to path and renames it over path, so a model loaded while training
+    runs is always the previous or the new model, never a partial file
+    :param lightgbm.Booster booster: Model to save
+    :param str path: Model file
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    booster.save_model(tmp_path)
+    os.replace(tmp_path, path)
+
+def model_hash(path)->str:
+    """
+    :param str path: Saved model file
+    :return: sha256 of the file, only recomputed when the file's mtime or size changes
+    """
+    stat = os.stat(path)
+    return _file_hash(path, stat.st_mtime_ns, stat.st_size)
 
 def load_recent_rb_model():
     """
     :return: The most recent rb model that was saved
     """
-    path = "fantasy_football_projections/data_loading/models/rb_model.txt"
-    loaded_booster = Booster(model_file=path)
+    from lightgbm import Booster
+
+    loaded_booster = Booster(model_file=RB_MODEL_PATH)
     return loaded_booster
 
+def wr_model_path()->str:
+    """
+    :return: Path of the wr model served under WR_LATENCY_BUDGET_MS
+    """
+    from fantasy_football_projections.utils.model_compression import select_variant
+
+    return select_variant(WR_MODEL_PATH, WR_LATENCY_BUDGET_MS)
+
 def load_recent_wr_model():
     """
-    :return: The most recent wr model that was saved
+    :return: The most recent wr model that was saved (or its variant within WR_LATENCY_BUDGET_MS)
     """
-    path = "fantasy_football_projections/data_loading/models/wr_model.txt"
-    loaded_booster = Booster(model_file=path)
+    from lightgbm import Booster
+
+    loaded_booster = Booster(model_file=wr_model_path())
     return loaded_booster
\ No newline at end of file
@@ -5,29 +5,46 @@ from typing import List
 import nflreadpy as nfl
 import polars as pl
 
+from fantasy_football_projections.data_loading.encoding import encode_frame, encode_gsis_id, team_code
+from fantasy_football_projections.data_loading.schema import compact_frame
+from fantasy_football_projections.data_loading.snapshots import snapshotted
 
-# Caches and returns player stats for seasons
+
+# Caches and returns player stats for a single season (memory-mapped snapshot for past seasons)
+@lru_cache(maxsize=None)
+@snapshotted("player_stats")
+def load_season_player_stats(season):
+    return compact_frame(encode_frame(nfl.load_player_stats(seasons=[season])))
+
+# Caches and returns player stats for seasons (built from the per season caches)
 @lru_cache(maxsize=None)
 def load_player_stats(*seasons):
-    data = nfl.load_player_stats(seasons=list(seasons))
+    data = pl.concat([load_season_player_stats(season) for season in seasons], how="diagonal_relaxed")
     return data
 
 # Caches and returns player stats for seasons by team
 @lru_cache(maxsize=None)
 def load_player_stats_by_team(*seasons, team):
     player_stats = load_player_stats(*seasons)
-    by_team = player_stats.filter(pl.col("team") == team)
+    by_team = player_stats.filter(pl.col("team") == team_code(pl.lit(team)))
     return by_team
 
-# Caches and returns pbp data for seasons
+# Caches and returns pbp data for a single season (memory-mapped snapshot for past seasons)
+@lru_cache(maxsize=None)
+@snapshotted("pbp")
+def load_season_pbp_data(season):
+    return compact_frame(encode_frame(nfl.load_pbp([season])))
+
+# Caches and returns pbp data for seasons (built from the per season caches)
 @lru_cache(maxsize=None)
 def load_pbp_data(*seasons):
-    return nfl.load_pbp(list(seasons))
+    return pl.concat([load_season_pbp_data(season) for season in seasons], how="diagonal_relaxed")
 
 # Caches and returns rushing/receiving pbp data for a player during seasons
 @lru_cache(maxsize=None)
 def load_player_pbp_data(*seasons, gsis_id):
     pbp = load_pbp_data(*seasons)
+    gsis_id = encode_gsis_id(gsis_id)
     player_data = pbp.filter(
         (pl.col("rusher_player_id") == gsis_id) |
         (pl.col("receiver_player_id") == gsis_id)
@@ -38,45 +55,57 @@ def load_player_pbp_data(*seasons, gsis_id):
 @lru_cache(maxsize=None)
 def load_player_targets(*seasons, gsis_id):
     pbp = load_pbp_data(*seasons)
-    player_data = pbp.filter(pl.col("receiver_player_id") == gsis_id)
+    player_data = pbp.filter(pl.col("receiver_player_id") == encode_gsis_id(gsis_id))
     return player_data
 
+# Caches and returns every player
+@lru_cache(maxsize=None)
+def load_players():
+    return encode_frame(nfl.load_players())
+
 # Caches and returns player data
 @lru_cache(maxsize=None)
 def load_player_data(season):
-    players = nfl.load_players()
+    players = load_players()
     players = players.filter(
         (pl.col("last_season") >= season - 1) &  # -1 to account for rookies and retirees
         (pl.col("draft_year") <= season)
     )
     return players
 
-# Caches and returns next-gen stats data
+# Caches and returns next-gen stats data (memory-mapped snapshot for past seasons)
 @lru_cache(maxsize=None)
+@snapshotted("nextgen_receiving")
 def load_nextgen_wr_data(*seasons):
-    stats = nfl.load_nextgen_stats(list(seasons), stat_type="receiving")
+    stats = compact_frame(encode_frame(nfl.load_nextgen_stats(list(seasons), stat_type="receiving")))
     return stats
 
 # Caches and returns next-gen stats for a specific receiver
 @lru_cache(maxsize=None)
 def load_rec_nextgen_stats(*seasons, gsis_id):
     stats = load_nextgen_wr_data(*seasons)
-    stats = stats.filter(pl.col("player_gsis_id") == gsis_id)
+    stats = stats.filter(pl.col("player_gsis_id") == encode_gsis_id(gsis_id))
     return stats
 
+# Caches and returns the ff player id crosswalk
+@lru_cache(maxsize=None)
+def load_ff_playerids():
+    return encode_frame(nfl.load_ff_playerids())
+
 @lru_cache(maxsize=None)
 def get_id_map()->dict:
     """
-    :return: Dict mapping pfr_id to gsis_id
+    :return: Dict mapping pfr_id to encoded gsis_id
     """
     # Loads play ID's df and creates pfr_id->gsis_id map
-    player_ids = nfl.load_ff_playerids().select("pfr_id", "gsis_id")
+    player_ids = load_ff_playerids().select("pfr_id", "gsis_id")
     id_map = dict(zip(player_ids["pfr_id"].to_list(), player_ids["gsis_id"].to_list()))
 
     return id_map
 
-# Caches and returns snap count data
+# Caches and returns snap count data (memory-mapped snapshot for past seasons)
 @lru_cache(maxsize=None)
+@snapshotted("snap_shares")
 def load_snap_shares(*seasons):
     snap_counts = nfl.load_snap_counts(list(seasons)).select(
         "pfr_player_id",
@@ -86,22 +115,31 @@ def load_snap_shares(*seasons):
         "position"
     )
     # Maps pfr_id to gsis_id
-    id_map = get_id_map()
-    snap_counts = snap_counts.with_columns(
-        pl.col("pfr_player_id").map_elements(lambda x: id_map.get(x))
-        .alias("gsis_id")
+    player_ids = (
+        load_ff_playerids().select(pl.col("pfr_id").alias("pfr_player_id"), "gsis_id")
+        .filter(pl.col("pfr_player_id").is_not_null())
+        .unique("pfr_player_id")
     )
+    snap_counts = compact_frame(snap_counts.join(player_ids, on="pfr_player_id", how="left"))
     return snap_counts
 
-# Caches and returns fantasy football opportunity data
+# Caches and returns fantasy football opportunity data (memory-mapped snapshot for past seasons)
 @lru_cache(maxsize=None)
+@snapshotted("ff_opportunity")
 def load_ff_opportunity_data(*seasons):
-    ff_data = nfl.load_ff_opportunity(seasons=list(seasons), stat_type="weekly")
+    ff_data = compact_frame(encode_frame(nfl.load_ff_opportunity(seasons=list(seasons), stat_type="weekly")))
     return ff_data
 
 # Caches and returns a list of the ID's of all running backs
 @lru_cache(maxsize=None)
-def get_rb_ids()->List[str]:
-    player_ids = nfl.load_ff_playerids().select("gsis_id", "position")
+def get_rb_ids()->List[int]:
+    player_ids = load_ff_playerids().select("gsis_id", "position")
     player_ids = player_ids.filter(pl.col("position") == "RB")
-    return player_ids["gsis_id"].to_list()
\ No newline at end of file
+    return player_ids["gsis_id"].to_list()
+
+# Caches and returns the position of every player with a gsis_id
+@lru_cache(maxsize=None)
+def load_player_positions()->pl.DataFrame:
+    player_ids = load_ff_playerids().select("gsis_id", "position")
+    player_ids = player_ids.filter(pl.col("gsis_id").is_not_null()).unique("gsis_id")
+    return player_ids
\ No newline at end of file
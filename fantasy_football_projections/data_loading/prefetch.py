@@ -0,0 +1,78 @@
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fantasy_football_projections.data_loading.player_data import (
+    load_season_pbp_data,
+    load_season_player_stats,
+    load_snap_shares,
+    load_nextgen_wr_data,
+    load_ff_playerids,
+    load_ff_opportunity_data,
+    load_players,
+)
+from fantasy_football_projections.data_loading.schedule_data import load_schedule_data
+
+
+# Dataset name -> (cached loader, how it is called)
+# "seasons": once with every season, "season": once per season, None: without seasons
+DATASETS = {
+    "pbp": (load_season_pbp_data, "season"),
+    "player_stats": (load_season_player_stats, "season"),
+    "snap_counts": (load_snap_shares, "seasons"),
+    "nextgen": (load_nextgen_wr_data, "seasons"),
+    "ff_opportunity": (load_ff_opportunity_data, "seasons"),
+    "schedules": (load_schedule_data, "season"),
+    "ff_playerids": (load_ff_playerids, None),
+    "players": (load_players, None),
+}
+
+# Datasets whose loader loads another dataset itself, the dependency is not fetched separately
+# so two threads never download the same dataset
+DATASET_DEPENDENCIES = {
+    "snap_counts": ("ff_playerids",),
+}
+
+# Max datasets downloaded and decoded at once
+MAX_WORKERS = 4
+
+
+def _timed(loader, args)->float:
+    start = time.perf_counter()
+    loader(*args)
+    return time.perf_counter() - start
+
+def prefetch(seasons, datasets, max_workers=MAX_WORKERS)->dict[str, float]:
+    """
+    Loads datasets concurrently into their loaders' caches, later calls with the same
+    seasons are cache hits. Startup takes about as long as the slowest dataset
+    :param int[] seasons: Seasons the pipeline is built on
+    :param datasets: Names of DATASETS the pipeline reads
+    :param int max_workers: Max parallel loads
+    :return: Dict mapping each fetched dataset to its load time in seconds
+    """
+    unknown = set(datasets) - set(DATASETS)
+    if unknown:
+        raise ValueError(f"Unknown datasets: {sorted(unknown)}")
+
+    covered = {dep for name in datasets for dep in DATASET_DEPENDENCIES.get(name, ())}
+    seasons = tuple(seasons)
+
+    # (label, loader, args) for every call
+    jobs = []
+    for name in dict.fromkeys(datasets):
+        if name in covered:
+            continue
+        loader, scope = DATASETS[name]
+        if scope == "seasons":
+            jobs.append((name, loader, seasons))
+        elif scope == "season":
+            jobs.extend((f"{name}_{season}", loader, (season,)) for season in seasons)
+        else:
+            jobs.append((name, loader, ()))
+
+    if not jobs:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(jobs))) as pool:
+        futures = {label: pool.submit(_timed, loader, args) for label, loader, args in jobs}
+        return {label: future.result() for label, future in futures.items()}
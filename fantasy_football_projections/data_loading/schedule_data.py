@@ -1,8 +1,95 @@
 
 from functools import lru_cache
 import nflreadpy as nfl
+import polars as pl
+
+from fantasy_football_projections.data_loading.encoding import encode_frame
 
 # Caches and returns schedule data for seasons
 @lru_cache(maxsize=None)
 def load_schedule_data(*seasons):
-    return nfl.load_schedules(list(seasons))
\ No newline at end of file
+    return encode_frame(nfl.load_schedules(list(seasons)))
+
+@lru_cache(maxsize=None)
+def load_season_schedule_index(season)->pl.DataFrame:
+    """
+    Every (team, week) of a season, including byes
+    :param int season: Season to index
+    :return: Df of team, season, week, opponent_team, home, game_id, bye and game_seq (the
+    team's nth game of the season, null on byes)
+    """
+    schedule = load_schedule_data(season)
+
+    # One row per team per game
+    games = pl.concat([
+        schedule.select(
+            pl.col("home_team").alias("team"), pl.col("away_team").alias("opponent_team"),
+            "season", "week", "game_id", "game_type", pl.lit(True).alias("home")
+        ),
+        schedule.select(
+            pl.col("away_team").alias("team"), pl.col("home_team").alias("opponent_team"),
+            "season", "week", "game_id", "game_type", pl.lit(False).alias("home")
+        ),
+    ])
+
+    # Every team plays or is on bye each regular season week
+    regular = games.filter(pl.col("game_type") == "REG")
+    grid = regular.select("team").unique().join(regular.select("season", "week").unique(), how="cross")
+    index = grid.join(regular.drop("game_type"), on=["team", "season", "week"], how="left")
+
+    # Playoff games are appended without bye rows
+    playoffs = games.filter(pl.col("game_type") != "REG").drop("game_type")
+    index = pl.concat([index, playoffs.select(index.columns)]).sort(["team", "week"])
+
+    index = index.with_columns(pl.col("game_id").is_null().alias("bye"))
+    index = index.with_columns(
+        pl.when(~pl.col("bye"))
+        .then(pl.col("bye").not_().cum_sum().over("team"))
+        .alias("game_seq")
+    )
+    return index
+
+@lru_cache(maxsize=None)
+def load_schedule_index(*seasons)->pl.DataFrame:
+    """
+    :param seasons: Seasons to index
+    :return: Concatenated load_season_schedule_index() of every season
+    """
+    return pl.concat([load_season_schedule_index(season) for season in seasons])
+
+@lru_cache(maxsize=None)
+def schedule_lookup(season)->dict[tuple[str, int], dict]:
+    """
+    :param int season: Season to index
+    :return: Dict mapping (team, week) to its row of load_season_schedule_index()
+    """
+    index = load_season_schedule_index(season)
+    return {(row["team"], row["week"]): row for row in index.iter_rows(named=True)}
+
+def team_week(team, season, week)->dict | None:
+    """
+    O(1) lookup of a team's game
+    :param str team: Team abbreviation
+    :param int season: Season
+    :param int week: Week
+    :return: Dict with opponent_team, home, game_id, bye and game_seq, None if the week
+    is not on the team's schedule
+    """
+    return schedule_lookup(season).get((team, week))
+
+def attach_schedule(df, seasons)->pl.DataFrame:
+    """
+    Sets each row's opponent_team, home, game_id and game_seq from the schedule index
+    :param pl.DataFrame | pl.LazyFrame df: Rows with 'team', 'season' and 'week'
+    :param int[] seasons: Seasons covered by df
+    :return: df with schedule cols, rows without a scheduled game are dropped
+    """
+    index = load_schedule_index(*seasons).filter(~pl.col("bye")).select(
+        "team", "season", "week", "opponent_team", "home", "game_id", "game_seq"
+    )
+    if isinstance(df, pl.LazyFrame):
+        index = index.lazy()
+    schema = df.collect_schema()
+    index = index.with_columns(pl.col("season").cast(schema["season"]), pl.col("week").cast(schema["week"]))
+    df = df.drop(["opponent_team", "home", "game_id", "game_seq"], strict=False)
+    return df.join(index, on=["team", "season", "week"], how="inner")
\ No newline at end of file
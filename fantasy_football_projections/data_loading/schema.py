@@ -0,0 +1,104 @@
+
+import hashlib
+import inspect
+from functools import lru_cache
+
+import polars as pl
+
+from fantasy_football_projections.data_loading import encoding
+from fantasy_football_projections.data_loading.encoding import ID_COLS
+
+
+# 0/1 play flags stored as Int8
+FLAG_COLS = (
+    "pass_attempt", "rush_attempt", "complete_pass", "incomplete_pass", "pass_touchdown",
+    "rush_touchdown", "return_touchdown", "touchdown", "interception", "sack", "fumble",
+    "fumble_lost", "first_down", "first_down_rush", "first_down_pass", "qb_dropback",
+    "qb_scramble", "qb_kneel", "qb_spike", "success", "shotgun", "no_huddle", "penalty",
+    "special_teams_play", "two_point_attempt",
+)
+
+# Yards, downs and counts stored as Int16 (when every value is a whole number)
+SMALL_INT_COLS = (
+    # Play-by-play
+    "yardline_100", "yards_gained", "air_yards", "yards_after_catch", "ydstogo", "down", "qtr",
+    # Weekly player stats
+    "receptions", "targets", "receiving_yards", "receiving_tds", "receiving_air_yards",
+    "receiving_yards_after_catch", "receiving_first_downs", "carries", "rushing_yards",
+    "rushing_tds", "rushing_first_downs", "completions", "attempts", "passing_yards",
+    "passing_tds", "passing_interceptions", "sacks_suffered", "passing_air_yards",
+    "passing_yards_after_catch", "passing_first_downs",
+)
+
+# Join keys keep their source dtype so every frame joins without casts
+KEY_COLS = ("season", "week")
+
+
+def compact_frame(df)->pl.DataFrame:
+    """
+    Downcasts a freshly loaded frame: FLAG_COLS to Int8, SMALL_INT_COLS to Int16 and
+    every other Float64 (epa, shares, ...) to Float32
+    :param pl.DataFrame df: Source frame
+    :return: df with compact dtypes
+    """
+    schema = df.schema
+    small_ints = [col for col in SMALL_INT_COLS if col in schema and schema[col].is_numeric()]
+
+    # Float cols are only made integers when no value has a fraction
+    float_ints = [col for col in small_ints if schema[col].is_float()]
+    if float_ints:
+        whole = df.select([(pl.col(col) == pl.col(col).round(0)).all().alias(col) for col in float_ints]).row(0)
+        small_ints = [col for col in small_ints if col not in float_ints] + [
+            col for col, is_whole in zip(float_ints, whole) if is_whole
+        ]
+
+    exprs = [pl.col(col).cast(pl.Int8) for col in FLAG_COLS if col in schema and schema[col].is_numeric()]
+    exprs += [pl.col(col).cast(pl.Int16) for col in small_ints]
+    cast = {col for col in FLAG_COLS if col in schema} | set(small_ints) | set(KEY_COLS)
+    exprs += [pl.col(col).cast(pl.Float32) for col, dtype in schema.items() if dtype == pl.Float64 and col not in cast]
+    return df.with_columns(exprs) if exprs else df
+
+@lru_cache(maxsize=None)
+def schema_fingerprint()->str:
+    """
+    :return: Hash of the dtype rules of loaded frames (the col lists above, the team and id
+    encoding and the code applying them), snapshots are named with it so changing a rule
+    never reads a frame stored with the old dtypes
+    """
+    parts = [
+        repr((FLAG_COLS, SMALL_INT_COLS, KEY_COLS)),
+        repr((encoding.TEAMS, encoding.LEGACY_TEAMS, encoding.TEAM_COLS, encoding.ID_COLS)),
+        inspect.getsource(compact_frame),
+        inspect.getsource(encoding.encode_frame),
+    ]
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()[:12]
+
+def downcast_drift(df, keys)->pl.DataFrame:
+    """
+    Compares group sums of a source frame with the sums of its compact_frame()
+    :param pl.DataFrame df: Source frame with its original dtypes
+    :param list[str] keys: Cols to group by ('player_id', 'season', 'week', ...)
+    :return: Df of every numeric col with the max absolute and relative error of its sums
+    and the frame sizes in bytes
+    """
+    compact = compact_frame(df)
+    cols = [col for col, dtype in df.schema.items() if dtype.is_numeric() and col not in keys and col not in ID_COLS]
+
+    def sums(frame):
+        return frame.group_by(keys).agg([pl.col(col).cast(pl.Float64).sum() for col in cols]).sort(keys)
+
+    expected, actual = sums(df), sums(compact)
+    rows = []
+    for col in cols:
+        diff = (expected[col] - actual[col]).abs()
+        scale = expected[col].abs().clip(lower_bound=1e-9)
+        rows.append({
+            "col": col,
+            "dtype": str(compact.schema[col]),
+            "max_abs_error": diff.max(),
+            "max_rel_error": (diff / scale).max(),
+        })
+    return pl.DataFrame(rows).with_columns(
+        pl.lit(df.estimated_size()).alias("source_bytes"),
+        pl.lit(compact.estimated_size()).alias("compact_bytes")
+    )
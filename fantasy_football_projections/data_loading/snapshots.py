@@ -0,0 +1,98 @@
+
+import functools
+import hashlib
+import inspect
+import os
+
+import polars as pl
+
+from fantasy_football_projections.config import CURRENT_SEASON
+from fantasy_football_projections.data_loading.schema import schema_fingerprint
+
+
+# Folder of the Arrow IPC snapshots, shared by every process on the host
+SNAPSHOT_DIR = os.path.join("fantasy_football_projections", "data_loading", "snapshots")
+
+# False loads every frame from its source
+SNAPSHOTS_ENABLED = True
+
+
+def snapshot_path(name, seasons)->str:
+    """
+    ex. name="pbp", seasons=(2023, 2024):
+    "fantasy_football_projections/data_loading/snapshots/pbp_2023_2024_<schema fingerprint>.arrow"
+    :param str name: Frame name
+    :param seasons: Seasons in the frame
+    :return: IPC file path, keyed on schema.schema_fingerprint() so a dtype change writes new snapshots
+    """
+    season_str = "_".join(str(season) for season in seasons)
+    return os.path.join(SNAPSHOT_DIR, f"{name}_{season_str}_{schema_fingerprint()}.arrow")
+
+def write_snapshot(df, path):
+    """
+    Writes an uncompressed IPC file (compressed files can't be memory-mapped), the file is
+    written next to path and renamed so readers never see a partial snapshot
+    :param pl.DataFrame df: Frame to write
+    :param str path: IPC file path
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    df.write_ipc(tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+
+def code_hash(obj)->str:
+    """
+    :param obj: Function, class or module, wrapped functions (lru_cache, snapshotted) hash their wrapped code
+    :return: sha256 of its source, its qualified name when the source isn't available
+    """
+    obj = inspect.unwrap(obj)
+    try:
+        source = inspect.getsource(obj)
+    except (OSError, TypeError):
+        source = f"{obj.__module__}.{obj.__qualname__}"
+    return hashlib.sha256(source.encode()).hexdigest()
+
+def read_snapshot(path)->pl.DataFrame:
+    """
+    :param str path: IPC file path
+    :return: Memory-mapped frame, its buffers are the OS page cache shared by every process
+    """
+    return pl.read_ipc(path, memory_map=True)
+
+def _seasons(args)->tuple[int, ...]:
+    seasons = []
+    for arg in args:
+        seasons.extend(arg if isinstance(arg, (list, tuple)) else [arg])
+    return tuple(seasons)
+
+def snapshotted(name, code=None):
+    """
+    Decorator for loaders called with seasons (as *seasons, a list or a keyword). Completed seasons are
+    read from a memory-mapped snapshot, written on the first load. Frames containing
+    CURRENT_SEASON are always loaded from the source since they change every week
+    :param name: Frame name used in the snapshot's file name, or fn()->name evaluated on every load
+    :param code: None for raw source frames. For frames derived from them, the functions the loader
+    derives them with (can be empty), a hash of their source and the loader's names the snapshot so
+    changing the derivation writes new snapshots
+    """
+    def decorator(loader):
+        code_version = None
+        if code is not None:
+            parts = [code_hash(obj) for obj in (loader, *code)]
+            code_version = hashlib.sha256("|".join(parts).encode()).hexdigest()[:12]
+
+        @functools.wraps(loader)
+        def wrapper(*args, **kwargs):
+            seasons = _seasons(args + tuple(kwargs.values()))
+            if not SNAPSHOTS_ENABLED or not seasons or max(seasons) >= CURRENT_SEASON:
+                return loader(*args, **kwargs)
+
+            frame_name = name() if callable(name) else name
+            if code_version is not None:
+                frame_name = f"{frame_name}_{code_version}"
+            path = snapshot_path(frame_name, seasons)
+            if not os.path.exists(path):
+                write_snapshot(loader(*args, **kwargs), path)
+            return read_snapshot(path)
+        return wrapper
+    return decorator
@@ -2,24 +2,25 @@
 from functools import lru_cache
 import nflreadpy as nfl
 import polars as pl
+from fantasy_football_projections.data_loading.encoding import encode_frame, team_code
 from fantasy_football_projections.data_loading.player_data import load_pbp_data
 
 
 # Caches and returns team stats for seasons
 @lru_cache(maxsize=None)
 def load_team_data(*seasons):
-    return nfl.load_team_stats(list(seasons))
+    return encode_frame(nfl.load_team_stats(list(seasons)))
 
 # Caches and returns offensive pbp data for a team during seasons
 @lru_cache(maxsize=None)
 def load_team_pbp_data(*seasons, team):
     pbp = load_pbp_data(*seasons)
-    team_data = pbp.filter(pl.col("posteam") == team)
+    team_data = pbp.filter(pl.col("posteam") == team_code(pl.lit(team)))
     return team_data
 
 # Caches and returns defensive pbp data for a team during seasons
 @lru_cache(maxsize=None)
 def load_team_def_pbp_data(*seasons, team):
     pbp = load_pbp_data(*seasons)
-    team_data = pbp.filter(pl.col("defteam") == team)
+    team_data = pbp.filter(pl.col("defteam") == team_code(pl.lit(team)))
     return team_data
\ No newline at end of file
@@ -0,0 +1,178 @@
+
+import hashlib
+
+import polars as pl
+
+from fantasy_football_projections.data_loading.player_data import load_player_stats
+from fantasy_football_projections.data_loading.snapshots import snapshotted
+from fantasy_football_projections.pipeline.position_specs import PLAY_FLAGS, position_specs
+from fantasy_football_projections.utils.window_kernel import window_means
+
+
+CUBE_KEYS = ["opponent_team", "season", "week"]
+
+
+def defense_totals(plays, stats, specs)->pl.LazyFrame:
+    """
+    Single group_by over pbp and player stats shared by every spec, cols are
+    namespaced by position (f"{position}__{stat}") until each spec selects its own
+    :param pl.LazyFrame plays: Flagged plays from pipeline.engine.flag_plays()
+    :param pl.LazyFrame stats: Weekly player stats
+    :param list[PositionSpec] specs: Specs to aggregate defenses for
+    :return: Lazy df of defensive totals per opponent_team per week
+    """
+    play_aggs = [
+        agg.alias(f"{spec.position}__{name}")
+        for spec in specs for name, agg in spec.defense_play_aggs.items()
+    ]
+    stat_aggs = [
+        agg.alias(f"{spec.position}__{name}")
+        for spec in specs for name, agg in spec.defense_stat_aggs.items()
+    ]
+
+    frames = []
+    if play_aggs:
+        frames.append(
+            plays.filter(pl.col("defteam").is_not_null())
+            .group_by(["defteam", "season", "week"]).agg(play_aggs)
+            .rename({"defteam": "opponent_team"})
+        )
+    if stat_aggs:
+        frames.append(stats.group_by(CUBE_KEYS).agg(stat_aggs))
+
+    defense = frames[0]
+    for frame in frames[1:]:
+        defense = defense.join(frame, on=CUBE_KEYS, how="full", coalesce=True)
+    return defense.with_columns(pl.col("season").cast(pl.Int32), pl.col("week").cast(pl.Int32))
+
+def cube_version()->str:
+    """
+    :return: Hash of every spec's defense aggregations and the play flags, snapshots of cube
+    totals are named with it so changing either builds new ones
+    """
+    parts = [f"{name}={expr}" for name, expr in PLAY_FLAGS.items()]
+    for spec in position_specs().values():
+        for name, agg in {**spec.defense_play_aggs, **spec.defense_stat_aggs}.items():
+            parts.append(f"{spec.position}__{name}={agg}")
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()[:12]
+
+@snapshotted(lambda: f"defense_cube_totals_{cube_version()}")
+def defense_cube_totals(season)->pl.DataFrame:
+    """
+    :param int season: Season to aggregate
+    :return: Defensive totals of every position spec per opponent_team per week of season
+    """
+    # engine imports the cube, so the play flagging is imported when a season is scanned
+    from fantasy_football_projections.pipeline.engine import flagged_plays
+
+    specs = list(position_specs().values())
+    plays = flagged_plays([season], specs)
+    stats = load_player_stats(season).lazy()
+    return defense_totals(plays, stats, specs).collect()
+
+
+class DefenseCube:
+    """
+    Team defense totals and averages of every position: one row per (opponent_team, season, week),
+    cols f"{position}__{stat}" for totals and f"{position}__{stat}_{window}" for point-in-time
+    averages including that week (attach them with utils.as_of.attach_as_of()). Each season is
+    aggregated once (completed seasons are snapshotted) and updated a week at a time in season
+    """
+    def __init__(self):
+        self.specs = position_specs()
+        self._seasons = {}
+
+    def _total_cols(self)->list[str]:
+        """
+        :return: Namespaced total cols of every spec
+        """
+        return [f"{spec.position}__{col}" for spec in self.specs.values() for col in spec.defense_cols()]
+
+    def _with_averages(self, totals)->pl.DataFrame:
+        """
+        :param pl.DataFrame totals: Totals of one season
+        :return: totals with every spec's defense_windows
+        """
+        totals = totals.with_columns(pl.exclude(CUBE_KEYS).fill_null(0)).sort(CUBE_KEYS)
+        for spec in self.specs.values():
+            cols = [f"{spec.position}__{col}" for col in spec.defense_cols()]
+            totals = window_means(totals, cols, spec.defense_windows, ["opponent_team", "season"], 0)
+        return totals
+
+    def season(self, season)->pl.DataFrame:
+        """
+        :param int season: Season of the cube
+        :return: The season's cube, aggregated on the first call
+        """
+        if season not in self._seasons:
+            self._seasons[season] = self._with_averages(defense_cube_totals(season))
+        return self._seasons[season]
+
+    def drop(self, season):
+        """
+        Forgets a season's cube, the next call re-aggregates it from the loaded sources
+        :param int season: Season dropped
+        """
+        self._seasons.pop(season, None)
+
+    def update(self, season, plays, stats)->pl.DataFrame:
+        """
+        Re-aggregates only the weeks in plays and stats and recomputes the season's averages
+        from the totals, ex. after pulling the current week's plays again
+        :param int season: Season updated
+        :param pl.DataFrame plays: Every pbp row of the weeks updated
+        :param pl.DataFrame stats: Every weekly player stat row of the weeks updated
+        :return: The season's updated cube
+        """
+        from fantasy_football_projections.pipeline.engine import flag_plays
+
+        specs = list(self.specs.values())
+        weeks = set(plays["week"].unique().to_list()) | set(stats["week"].unique().to_list())
+        new_totals = defense_totals(flag_plays(plays.lazy(), specs), stats.lazy(), specs).collect()
+
+        totals = self.season(season).select(CUBE_KEYS + self._total_cols())
+        totals = totals.filter(~pl.col("week").is_in(list(weeks)))
+        totals = pl.concat([totals, new_totals.select(totals.columns)], how="vertical_relaxed")
+
+        self._seasons[season] = self._with_averages(totals)
+        return self._seasons[season]
+
+    def frame(self, seasons)->pl.DataFrame:
+        """
+        :param int[] seasons: Seasons of the cube
+        :return: Cube of every season
+        """
+        return pl.concat([self.season(season) for season in seasons], how="vertical_relaxed")
+
+    def totals(self, position, seasons)->pl.DataFrame:
+        """
+        :param str position: Position targeted
+        :param int[] seasons: Seasons of the cube
+        :return: df of (opponent_team, season, week) and the position's weekly totals allowed
+        """
+        cols = self.specs[position].defense_cols()
+        return self.frame(seasons).select(
+            CUBE_KEYS + [pl.col(f"{position}__{col}").alias(col) for col in cols]
+        )
+
+    def averages(self, position, seasons, windows=None)->pl.DataFrame:
+        """
+        :param str position: Position targeted
+        :param int[] seasons: Seasons of the cube
+        :param windows: ((window, cols), ...) to select, ex. FeaturePlan.defense, None for every
+        defense col in every window of the position's spec
+        :return: df of (opponent_team, season, week) and the position's averages including that week
+        """
+        spec = self.specs[position]
+        if windows is None:
+            windows = [(window, spec.defense_cols()) for window in spec.defense_windows]
+        return self.frame(seasons).select(
+            CUBE_KEYS + [
+                pl.col(f"{position}__{col}_{window}").alias(f"{col}_{window}")
+                for window, cols in windows for col in cols
+            ]
+        )
+
+
+# Shared by every builder and projector in the process
+DEFENSE_CUBE = DefenseCube()
@@ -0,0 +1,242 @@
+
+import polars as pl
+
+from fantasy_football_projections.data_loading.encoding import game_key
+from fantasy_football_projections.data_loading.player_data import (
+    load_pbp_data,
+    load_player_stats,
+    load_snap_shares,
+    load_nextgen_wr_data,
+    load_player_positions,
+)
+from fantasy_football_projections.data_loading.prefetch import prefetch
+from fantasy_football_projections.data_loading.schedule_data import attach_schedule
+from fantasy_football_projections.pipeline.defense_cube import DEFENSE_CUBE
+from fantasy_football_projections.pipeline.position_specs import NEXTGEN_COLS, position_specs
+from fantasy_football_projections.pipeline.sharding import sharded_build
+from fantasy_football_projections.utils.as_of import attach_as_of
+from fantasy_football_projections.utils.constrcut_dataset_location import make_file_path
+from fantasy_football_projections.utils.game_index import game_sequence_index, lookback_seasons
+from fantasy_football_projections.utils.window_kernel import lazy_window_means, window_lookback
+
+
+# pbp player id cols and the position col joined for each of them
+ROLE_POSITION_COLS = {
+    "passer_player_id": "passer_position",
+    "rusher_player_id": "rusher_position",
+    "receiver_player_id": "receiver_position",
+}
+
+KEY_COLS = ["player_id", "player_name", "team", "opponent_team", "season", "week"]
+
+# Datasets read by every position, specs add their own sources
+BASE_DATASETS = ("pbp", "player_stats", "ff_playerids", "schedules")
+
+
+def flagged_plays(seasons, specs)->pl.LazyFrame:
+    """
+    :param int[] seasons: Seasons to scan
+    :param list[PositionSpec] specs: Specs whose per-play flags are needed
+    :return: Lazy pbp with the position of every involved player and every spec's flags
+    """
+    return flag_plays(load_pbp_data(*seasons).lazy(), specs)
+
+def flag_plays(plays, specs)->pl.LazyFrame:
+    """
+    :param pl.LazyFrame plays: Lazy pbp
+    :param list[PositionSpec] specs: Specs whose per-play flags are needed
+    :return: plays with the position of every involved player and every spec's flags
+    """
+    positions = load_player_positions().lazy()
+
+    # Attaches the position of the passer, rusher and receiver of each play
+    for id_col, position_col in ROLE_POSITION_COLS.items():
+        plays = plays.join(
+            positions.rename({"gsis_id": id_col, "position": position_col}),
+            on=id_col,
+            how="left"
+        )
+
+    # Union of every spec's flags, each flag is computed once
+    flags = {}
+    for spec in specs:
+        flags.update(spec.play_flags())
+    return plays.with_columns([expr.alias(name) for name, expr in flags.items()])
+
+def snap_shares(seasons)->pl.LazyFrame:
+    """
+    :param int[] seasons: Seasons to load
+    :return: Lazy df of game_key and offense_pct of every player game with a gsis id
+    """
+    return (
+        load_snap_shares(*seasons).lazy()
+        .filter(pl.col("gsis_id").is_not_null())
+        .select(game_key("gsis_id").alias("game_key"), "offense_pct")
+        .unique("game_key")
+    )
+
+def spec_games(spec, seasons, stats)->pl.LazyFrame:
+    """
+    :param PositionSpec spec: Position built
+    :param int[] seasons: Seasons built
+    :param pl.LazyFrame stats: Weekly player stats
+    :return: Lazy df of (player_id, season, week) of every game position_query() keeps a row for
+    """
+    games = attach_schedule(
+        stats.filter(pl.col("position") == spec.position).select("player_id", "team", "season", "week"), seasons
+    )
+    if "snap_counts" in spec.sources:
+        games = games.with_columns(game_key().alias("game_key")).join(snap_shares(seasons), on="game_key", how="left")
+        games = games.filter(pl.col("offense_pct") > spec.min_snap_share)
+    return games.select("player_id", "season", "week")
+
+def carryover_lookback_seasons(specs, seasons, training=True)->int:
+    """
+    Earlier seasons a single season's build must load so its carryover windows read the same
+    games as a build of every season, found with a game index of the rows the specs keep
+    :param list[PositionSpec] specs: Specs being built
+    :param int[] seasons: Seasons being built
+    :param bool training: True excludes each game from its own averages
+    :return: Lookback seasons for pipeline.sharding.sharded_build()
+    """
+    stats = load_player_stats(*seasons).lazy()
+    lookback = 0
+    for spec in specs:
+        if not spec.carryover_windows:
+            continue
+        index = game_sequence_index(spec_games(spec, seasons, stats).collect(), "player_id")
+        game_amt = window_lookback(spec.carryover_windows, 1 if training else 0)
+        lookback = max(lookback, lookback_seasons(index, game_amt, seasons, "player_id"))
+    return lookback
+
+def position_query(spec, seasons, plays, stats, defense, training=True)->pl.LazyFrame:
+    """
+    Compiles a spec into a lazy query over the shared scans
+    :param PositionSpec spec: Position to build
+    :param int[] seasons: Seasons being built
+    :param pl.LazyFrame plays: Flagged plays from flagged_plays()
+    :param pl.LazyFrame stats: Weekly player stats
+    :param pl.LazyFrame defense: The position's point-in-time defensive averages, see DefenseCube.averages()
+    :param bool training: True excludes each game from its own averages
+    :return: Lazy df with one row per player game, its offensive and defensive averages
+    """
+    shift = 1 if training else 0
+
+    # (season, week, player) packed into one integer key for every join below
+    df = stats.filter(pl.col("position") == spec.position).select(
+        KEY_COLS + [col for col in spec.stat_cols if col not in KEY_COLS]
+    ).with_columns(game_key().alias("game_key"))
+
+    # Opponent, home/away and game id of each game from the schedule index
+    df = attach_schedule(df, seasons)
+
+    # Aggregates plays per player per week for each role (rusher, receiver, ...)
+    for id_col, aggs in spec.play_aggs.items():
+        position_col = ROLE_POSITION_COLS[id_col]
+        weekly = (
+            plays.filter(pl.col(position_col) == spec.position)
+            .group_by([id_col, "season", "week"])
+            .agg([agg.alias(name) for name, agg in aggs.items()])
+            .with_columns(game_key(id_col).alias("game_key"))
+            .drop([id_col, "season", "week"])
+        )
+        df = df.join(weekly, on="game_key", how="left")
+
+    # Joins snap shares, dropping games the player barely played
+    if "snap_counts" in spec.sources:
+        df = df.join(snap_shares(seasons), on="game_key", how="left")
+        df = df.filter(pl.col("offense_pct") > spec.min_snap_share)
+
+    # Joins next-gen stats
+    if "nextgen" in spec.sources:
+        nextgen = (
+            load_nextgen_wr_data(*seasons).lazy()
+            .filter(pl.col("week") > 0)
+            .select([game_key("player_gsis_id").alias("game_key")] + NEXTGEN_COLS)
+        )
+        df = df.join(nextgen, on="game_key", how="left")
+
+    # Offensive averages
+    offense_cols = spec.offense_cols()
+    df = df.with_columns(pl.col(offense_cols).fill_null(0)).sort(["player_id", "season", "week"])
+    df = lazy_window_means(df, offense_cols, spec.offense_windows, ["player_id", "season"], shift)
+
+    # Averages of each player's last games, reaching into the seasons before
+    df = lazy_window_means(df, offense_cols, spec.carryover_windows, ["player_id"], shift)
+
+    # Attaches each opponent's latest defensive state strictly before the game
+    df = attach_as_of(df, defense).sort(["player_id", "season", "week"])
+
+    # Derived features for every offensive window
+    derived = [
+        expr(suffix).alias(f"{name}_{suffix}")
+        for suffix in spec.offense_windows for name, expr in spec.derived.items()
+    ]
+    if derived:
+        df = df.with_columns(derived)
+    return df
+
+def required_datasets(specs)->list[str]:
+    """
+    :param list[PositionSpec] specs: Specs being built
+    :return: Names of the data_loading.prefetch datasets the specs read
+    """
+    return list(dict.fromkeys(BASE_DATASETS + tuple(s for spec in specs for s in spec.sources)))
+
+def build_position_datasets(seasons, positions=None, training=True)->dict[str, pl.DataFrame]:
+    """
+    Builds datasets for several positions from a single scan of each source, the
+    per-play flags and defensive aggregation are shared between positions
+    :param int[] seasons: Seasons to build
+    :param list[str] positions: Positions to build (keys of position_specs()), None for all
+    :param bool training: True excludes each game from its own averages
+    :return: Dict mapping position to its dataset
+    """
+    specs = position_specs()
+    specs = [specs[p] for p in (positions or specs)]
+
+    # Loads every source concurrently before building
+    prefetch(seasons, required_datasets(specs))
+
+    plays = flagged_plays(seasons, specs)
+    stats = load_player_stats(*seasons).lazy()
+
+    # Defensive averages of every position come from the shared team-defense cube
+    queries = [
+        position_query(spec, seasons, plays, stats, DEFENSE_CUBE.averages(spec.position, seasons).lazy(), training)
+        for spec in specs
+    ]
+
+    # collect_all runs the queries as one plan so shared scans are only computed once
+    frames = pl.collect_all(queries)
+    return {spec.position: frame for spec, frame in zip(specs, frames)}
+
+def write_position_datasets(seasons, positions=None, max_workers=1)->dict[str, str]:
+    """
+    Builds datasets for positions and writes each to a parquet file
+    utils->constrcut_dataset_location->make_file_path() for file locations
+    :param int[] seasons: Seasons to build
+    :param list[str] positions: Positions to build, None for all
+    :param int max_workers: Processes building seasons in parallel (None for one per season)
+    :return: Dict mapping position to the location of its dataset
+    """
+    specs = position_specs()
+    if max_workers == 1:
+        datasets = build_position_datasets(seasons, positions)
+    else:
+        # Each season's shard also loads the seasons its carryover windows reach into
+        lookback = carryover_lookback_seasons([specs[p] for p in (positions or specs)], seasons)
+        datasets = sharded_build(
+            build_position_datasets, seasons, max_workers, lookback_seasons=lookback,
+            positions=positions, sort_by=["player_id", "season", "week"]
+        )
+
+    locations = {}
+    for position, df in datasets.items():
+        spec = specs[position]
+        off_game_amt = max(w[0] for w in spec.offense_windows.values() if w is not None)
+        def_game_amt = max(w[0] for w in spec.defense_windows.values() if w is not None)
+        location = make_file_path(position, seasons, off_game_amt, def_game_amt)
+        df.write_parquet(location)
+        locations[position] = location
+    return locations
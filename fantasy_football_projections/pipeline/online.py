@@ -0,0 +1,448 @@
+
+import io
+import os
+import threading
+from collections import deque
+
+import numpy as np
+import polars as pl
+
+from fantasy_football_projections.data_loading.encoding import ID_COLS, TEAM, TEAM_COLS, encode_frame
+from fantasy_football_projections.data_loading.player_data import load_player_positions
+from fantasy_football_projections.pipeline.engine import ROLE_POSITION_COLS
+from fantasy_football_projections.pipeline.position_specs import position_specs
+
+
+# pbp cols left as strings when a play file is parsed, every other col read is numeric
+STRING_COLS = set(ID_COLS) | set(TEAM_COLS) | {"play_type", "game_id"}
+
+
+class _EntityState:
+    """
+    Running state of one player (or defense) in one role: the totals of its open game and
+    the window sums over its closed games this season. Windows restart every season like
+    the batch windows of utils.window_kernel.window_means(). A play for an earlier game of the
+    season (rows out of order, a stat correction after the week closed) is added to that
+    game and the windows are refolded from the season's games before they are next read
+    """
+    def __init__(self, size, windows, ewm_alpha):
+        self.size = size
+        self.windows = windows
+        self.ewm_alpha = ewm_alpha
+        self.season = None
+        self.week = None
+        self.open = None
+        self.closed_week = None
+        self.season_games = {}
+        self._stale = False
+        self._reset()
+
+    def _reset(self):
+        self.games = 0
+        self.season_sum = np.zeros(self.size)
+        self.rolling = {
+            suffix: (deque(maxlen=window[0]), np.zeros(self.size))
+            for suffix, window in self.windows.items() if window is not None
+        }
+        self.ewm = None
+
+    def game(self, season, week)->np.ndarray | None:
+        """
+        :return: Totals of the (season, week) game that a play adds to, a later week opens a new
+        game. None for a game of an earlier season, whose windows are no longer kept
+        """
+        if self.open is not None and season == self.season and week == self.week:
+            return self.open
+        if self.season is None or (season, week) > (self.season, self.week):
+            return self.open_game(season, week)
+        if season < self.season:
+            return None
+
+        # An earlier game of the season, windows are refolded before they are read
+        self._stale = True
+        return self.season_games.setdefault(week, np.zeros(self.size))
+
+    def open_game(self, season, week)->np.ndarray:
+        """
+        Closes the open game and opens (season, week)
+        :return: Totals of the new game
+        """
+        self.close()
+        if season != self.season:
+            self._reset()
+            self.season_games, self.closed_week, self._stale = {}, None, False
+        self.season, self.week, self.open = season, week, np.zeros(self.size)
+        self.season_games[week] = self.open
+        return self.open
+
+    def close(self):
+        """
+        Folds the open game into the window sums
+        """
+        if self.open is None:
+            return
+        totals, self.open, self.closed_week = self.open, None, self.week
+        if self._stale:
+            self._refold()
+        else:
+            self._fold(totals)
+
+    def _refold(self):
+        """
+        Rebuilds the window sums from every closed game of the season
+        """
+        self._reset()
+        closed = sorted(week for week in self.season_games if self.open is None or week != self.week)
+        for week in closed:
+            self._fold(self.season_games[week])
+        self.closed_week = closed[-1] if closed else None
+        self._stale = False
+
+    def _fold(self, totals):
+        """
+        Adds a closed game to the window sums
+        """
+        self.games += 1
+        self.season_sum += totals
+        for recent, window_sum in self.rolling.values():
+            if len(recent) == recent.maxlen:
+                window_sum -= recent[0]
+            recent.append(totals)
+            window_sum += totals
+        if self.ewm_alpha is not None:
+            self.ewm = totals.copy() if self.ewm is None else \
+                self.ewm_alpha * totals + (1 - self.ewm_alpha) * self.ewm
+
+    def averages(self, live=False)->dict[str, np.ndarray]:
+        """
+        :param bool live: True counts the open game as if it were closed
+        :return: {suffix: averages}, nan when a window has fewer than min_periods games
+        """
+        if self._stale:
+            self._refold()
+        pending = self.open if live else None
+        games = self.games + (pending is not None)
+        season_sum = self.season_sum if pending is None else self.season_sum + pending
+
+        averages = {}
+        for suffix, window in self.windows.items():
+            if window is None:
+                averages[suffix] = season_sum / games if games else np.full(self.size, np.nan)
+                continue
+
+            window_size, min_periods = window
+            recent, window_sum = self.rolling[suffix]
+            count = len(recent)
+            if pending is not None:
+                window_sum = window_sum + pending
+                if count == window_size:
+                    window_sum = window_sum - recent[0]
+                else:
+                    count += 1
+            averages[suffix] = window_sum / count if count >= min_periods else np.full(self.size, np.nan)
+
+        if self.ewm_alpha is not None:
+            if pending is None:
+                ewm = self.ewm
+            else:
+                ewm = pending if self.ewm is None else self.ewm_alpha * pending + (1 - self.ewm_alpha) * self.ewm
+            averages["ewm"] = np.full(self.size, np.nan) if ewm is None else ewm
+        return averages
+
+
+class OnlineAggregator:
+    """
+    Maintains the weekly play-by-play totals of position specs (pipeline.position_specs) one
+    play at a time, and their window averages, so features refresh while games are played.
+    Each play updates a fixed-size totals array per player role and defense, its values come
+    from the spec's own aggregations so they match the batch builds:
+    - offense: spec.play_aggs per player, ex. the WR cols of wr_stat_aggregation.get_wr_pbp_stats_weekly()
+    and the RB cols of rb_efficiency_metrics()
+    - defense: spec.defense_play_aggs per defteam, ex. wr_defense_stat_aggregation.get_wr_defense_pbp_stats()
+    Cols from weekly player stats (stat_cols, defense_stat_aggs) are only published after games
+    and are not maintained. A player's game closes when a play from a later week arrives
+    for them, or on close_week(). Plays may arrive out of order, late plays and corrections
+    of closed weeks are added to their game
+    """
+    def __init__(self, positions=("WR", "RB"), ewm_alpha=None):
+        """
+        :param list[str] positions: Positions to aggregate (keys of position_specs())
+        :param float ewm_alpha: Smoothing of an extra exponentially weighted average ("ewm"), None for none
+        """
+        specs = position_specs()
+        self.specs = [specs[position] for position in positions]
+        self.ewm_alpha = ewm_alpha
+        self.plays = 0
+
+        self._flags = {}
+        for spec in self.specs:
+            self._flags.update(spec.play_flags())
+
+        # Totals cols of each (position, side), offense is the union of every role's cols
+        self._cols = {}
+        for spec in self.specs:
+            self._cols[(spec.position, "offense")] = list(dict.fromkeys(
+                name for aggs in spec.play_aggs.values() for name in aggs
+            ))
+            self._cols[(spec.position, "defense")] = list(spec.defense_play_aggs)
+        self._windows = {
+            (spec.position, side): spec.offense_windows if side == "offense" else spec.defense_windows
+            for spec in self.specs for side in ("offense", "defense")
+        }
+
+        # {(position, side): {entity: _EntityState}} and {(position, side): {(entity, season, week): totals}}
+        self._states = {key: {} for key in self._cols}
+        self._weekly = {key: {} for key in self._cols}
+
+        # Cols read from play files
+        roots = {"season", "week", "defteam"} | set(ROLE_POSITION_COLS)
+        for expr in self._flags.values():
+            roots.update(expr.meta.root_names())
+        for spec in self.specs:
+            aggs = list(spec.defense_play_aggs.values())
+            for role_aggs in spec.play_aggs.values():
+                aggs += list(role_aggs.values())
+            for agg in aggs:
+                roots.update(agg.meta.root_names())
+        self._play_cols = roots - set(self._flags) - set(ROLE_POSITION_COLS.values())
+
+        # {path: (bytes read, header line)} of followed play files
+        self._offsets = {}
+
+        # Latest (season, week) passed to close_week(), games up to it open closed
+        self._closed_through = None
+
+    def _flag(self, plays)->pl.DataFrame:
+        """
+        :param pl.DataFrame plays: Raw plays
+        :return: Encoded plays with player positions and the specs' play flags
+        """
+        plays = encode_frame(plays)
+        plays = plays.with_columns(
+            [pl.col(col).cast(pl.UInt32) for col in ROLE_POSITION_COLS if col in plays.columns] +
+            [pl.col("season").cast(pl.Int32), pl.col("week").cast(pl.Int32)]
+        )
+
+        # Attaches the position of the passer, rusher and receiver of each play
+        positions = load_player_positions()
+        for id_col, position_col in ROLE_POSITION_COLS.items():
+            if position_col in plays.columns:
+                continue
+            if id_col not in plays.columns:
+                plays = plays.with_columns(pl.lit(None, dtype=pl.UInt32).alias(id_col))
+            plays = plays.join(
+                positions.rename({"gsis_id": id_col, "position": position_col}),
+                on=id_col,
+                how="left"
+            )
+        return plays.with_columns([expr.alias(name) for name, expr in self._flags.items()])
+
+    @staticmethod
+    def _contributions(plays, id_col, aggs)->pl.DataFrame:
+        """
+        Evaluates weekly aggregations over single plays, a play's contribution to a weekly sum
+        is the aggregation over a group holding only that play
+        :param pl.DataFrame plays: Flagged plays with a "play" index
+        :return: df of (play, entity, season, week, *aggs) per play
+        """
+        return (
+            plays.filter(pl.col(id_col).is_not_null())
+            .group_by("play", maintain_order=True)
+            .agg(
+                [pl.col(id_col).first().alias("entity"), pl.col("season").first(), pl.col("week").first()] +
+                [agg.alias(name) for name, agg in aggs.items()]
+            )
+        )
+
+    def _update(self, key, contributions):
+        """
+        Adds every play's contributions to its entity's open game in play order, O(1) per play
+        :param tuple key: (position, side)
+        :param list[pl.DataFrame] contributions: From _contributions(), one per role
+        """
+        # A player's plays from every role (rusher, receiver, ...) are applied in play order
+        contributions = pl.concat(contributions, how="diagonal_relaxed").sort("play").drop("play")
+        cols = contributions.columns[3:]
+        contributions = contributions.with_columns(pl.col(cols).fill_null(0))
+
+        states, weekly = self._states[key], self._weekly[key]
+        index = np.array([self._cols[key].index(col) for col in cols])
+        size, windows = len(self._cols[key]), self._windows[key]
+
+        for entity, season, week, *values in contributions.iter_rows():
+            state = states.get(entity)
+            if state is None:
+                state = states[entity] = _EntityState(size, windows, self.ewm_alpha)
+            totals = state.game(season, week)
+
+            # Games of earlier seasons only keep their weekly totals
+            if totals is None:
+                totals = weekly.setdefault((entity, season, week), np.zeros(size))
+            weekly[(entity, season, week)] = totals
+            totals[index] += values
+
+            # A late play can open a game of a week that was already closed
+            if totals is state.open and self._closed_through is not None and (season, week) <= self._closed_through:
+                state.close()
+
+    def ingest(self, plays)->int:
+        """
+        Updates the aggregates with new plays, pushed plays (an API) or a parsed file
+        :param pl.DataFrame | dict | list[dict] plays: pbp rows with the nflverse pbp cols
+        :return: Number of plays ingested
+        """
+        if isinstance(plays, dict):
+            plays = [plays]
+        if not isinstance(plays, pl.DataFrame):
+            plays = pl.DataFrame(plays, infer_schema_length=None)
+        if plays.is_empty():
+            return 0
+
+        plays = self._flag(plays).with_row_index("play")
+        for spec in self.specs:
+            if spec.play_aggs:
+                self._update((spec.position, "offense"), [
+                    self._contributions(plays.filter(pl.col(ROLE_POSITION_COLS[id_col]) == spec.position), id_col, aggs)
+                    for id_col, aggs in spec.play_aggs.items()
+                ])
+            if spec.defense_play_aggs:
+                self._update((spec.position, "defense"), [
+                    self._contributions(plays, "defteam", spec.defense_play_aggs)
+                ])
+
+        self.plays += plays.height
+        return plays.height
+
+    def _parse(self, plays)->pl.DataFrame:
+        """
+        :param pl.DataFrame plays: Plays read as strings
+        :return: The cols read by the aggregations with numeric cols cast ("NA" becomes null)
+        """
+        cols = [col for col in plays.columns if col in self._play_cols]
+        return plays.select([
+            pl.col(col) if col in STRING_COLS else pl.col(col).cast(pl.Float64, strict=False)
+            for col in cols
+        ])
+
+    def ingest_file(self, path)->int:
+        """
+        Ingests the rows appended to a csv play-by-play file since the last call, a partially
+        written last line is left for the next call. A file smaller than what was read is
+        treated as a new file
+        :param str path: csv file with a header line
+        :return: Number of plays ingested
+        """
+        offset, header = self._offsets.get(path, (0, None))
+        if os.path.getsize(path) < offset:
+            offset, header = 0, None
+
+        with open(path, "rb") as file:
+            file.seek(offset)
+            chunk = file.read()
+
+        # The first line read from a file is its header
+        if header is None:
+            end = chunk.find(b"\n")
+            if end < 0:
+                return 0
+            header, chunk, offset = chunk[:end + 1], chunk[end + 1:], offset + end + 1
+
+        # Only complete lines are parsed
+        end = chunk.rfind(b"\n")
+        chunk = chunk[:end + 1]
+        if not chunk:
+            self._offsets[path] = (offset, header)
+            return 0
+
+        # The offset only moves past rows that were ingested, a failed call reads them again
+        plays = pl.read_csv(io.BytesIO(header + chunk), infer_schema_length=0)
+        ingested = self.ingest(self._parse(plays))
+        self._offsets[path] = (offset + len(chunk), header)
+        return ingested
+
+    def follow(self, path, interval=10., stop=None, on_update=None):
+        """
+        Tails a csv play-by-play file, ingesting its new rows every interval seconds
+        :param str path: csv file, it may not exist yet
+        :param float interval: Seconds between polls
+        :param threading.Event stop: Set to stop following, follows until interrupted if None
+        :param on_update: fn(aggregator, plays ingested) called after every poll that ingested plays
+        """
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            if os.path.exists(path):
+                ingested = self.ingest_file(path)
+                if ingested and on_update is not None:
+                    on_update(self, ingested)
+            stop.wait(interval)
+
+    def close_week(self, season, week):
+        """
+        Closes every open game up to (season, week), call once a week's games are final
+        """
+        self._closed_through = max(self._closed_through or (season, week), (season, week))
+        for states in self._states.values():
+            for state in states.values():
+                if state.open is not None and (state.season, state.week) <= (season, week):
+                    state.close()
+
+    @staticmethod
+    def _entity_col(side)->tuple[str, pl.DataType]:
+        return ("player_id", pl.UInt32) if side == "offense" else ("opponent_team", TEAM)
+
+    def weekly(self, position, side="offense")->pl.DataFrame:
+        """
+        :param str position: Position aggregated
+        :param str side: "offense" (per player) or "defense" (per defense against the position)
+        :return: df of weekly totals, open games included
+        """
+        key = (position, side)
+        cols = self._cols[key]
+        entity_col, dtype = self._entity_col(side)
+        games = self._weekly[key]
+
+        totals = np.array(list(games.values())) if games else np.zeros((0, len(cols)))
+        df = pl.DataFrame({
+            entity_col: pl.Series([game[0] for game in games], dtype=dtype),
+            "season": pl.Series([game[1] for game in games], dtype=pl.Int32),
+            "week": pl.Series([game[2] for game in games], dtype=pl.Int32),
+        })
+        return df.hstack(pl.DataFrame(totals, schema=cols, orient="row")).sort([entity_col, "season", "week"])
+
+    def features(self, position, side="offense", live=False)->pl.DataFrame:
+        """
+        Window averages as of each entity's latest game, cols named like the batch datasets
+        (f"{col}_{suffix}", plus f"{col}_ewm" when ewm_alpha is set)
+        :param str position: Position aggregated
+        :param str side: "offense" (per player) or "defense" (per defense against the position)
+        :param bool live: True includes open games, False only closed games (the features of the next game)
+        :return: df with one row per entity, week is the last game included in its averages
+        """
+        key = (position, side)
+        cols = self._cols[key]
+        entity_col, dtype = self._entity_col(side)
+
+        entities, seasons, weeks, games, rows = [], [], [], [], []
+        for entity, state in self._states[key].items():
+            # Refolds late plays first, they can close a game
+            averages = state.averages(live)
+            week = state.week if live and state.open is not None else state.closed_week
+            if week is None:
+                continue
+            entities.append(entity)
+            seasons.append(state.season)
+            weeks.append(week)
+            games.append(state.games + (live and state.open is not None))
+            rows.append(np.concatenate(list(averages.values())))
+
+        suffixes = list(self._windows[key]) + (["ewm"] if self.ewm_alpha is not None else [])
+        schema = [f"{col}_{suffix}" for suffix in suffixes for col in cols]
+        values = np.array(rows) if rows else np.zeros((0, len(schema)))
+        df = pl.DataFrame({
+            entity_col: pl.Series(entities, dtype=dtype),
+            "season": pl.Series(seasons, dtype=pl.Int32),
+            "week": pl.Series(weeks, dtype=pl.Int32),
+            "games": pl.Series(games, dtype=pl.UInt32),
+        })
+        df = df.hstack(pl.DataFrame(values, schema=schema, orient="row"))
+        return df.with_columns(pl.col(schema).fill_nan(None)).sort(entity_col)
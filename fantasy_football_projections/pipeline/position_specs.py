@@ -0,0 +1,376 @@
+
+from dataclasses import dataclass, field
+from typing import Callable
+
+import polars as pl
+
+from fantasy_football_projections.config import (
+    PPR,
+    POINTS_PER_RUSH_YARD,
+    POINTS_PER_RUSH_TD,
+    POINTS_PER_REC_YARD,
+    POINTS_PER_REC_TD,
+    POINTS_PER_PASS_YARD,
+    POINTS_PER_PASS_TD,
+    POINTS_PER_INTERCEPTION,
+    EXPLOSIVE_RUN,
+    EXPLOSIVE_RECEPTION,
+    REDZONE_YARDLINE,
+)
+
+
+def redzone_distance_weight(yardline)->pl.Expr:
+    """
+    Weighted rushes/targets of the README: 1 outside the redzone, REDZONE_YARDLINE / yardline inside it
+    :param pl.Expr yardline: Yards from the endzone ('yardline_100')
+    :return: Opportunity weight of a play
+    """
+    return (
+        pl.when(yardline <= REDZONE_YARDLINE)
+        .then(REDZONE_YARDLINE / yardline.clip(lower_bound=1))
+        .otherwise(1.0)
+    )
+
+def weighted_opportunity_flags(distance_weight=redzone_distance_weight)->dict[str, pl.Expr]:
+    """
+    Distance weights of every play, summed per rusher, receiver or defense they are carries,
+    targets and opportunities allowed. Replace them to change the weighting, ex.
+    PLAY_FLAGS.update(weighted_opportunity_flags(lambda yardline: 100 / yardline))
+    :param distance_weight: fn(yardline expr)->weight expr
+    :return: {flag name: expr}
+    """
+    weight = distance_weight(pl.col("yardline_100"))
+    return {
+
+        # Weight of every play
+        "opportunity_weight": weight,
+
+        # Weight of plays inside the redzone, 0 outside it
+        "redzone_opportunity_weight": pl.when(pl.col("yardline_100") <= REDZONE_YARDLINE)
+        .then(weight).otherwise(0.0),
+    }
+
+
+# Per-play flags shared by every position, computed once per play-by-play scan
+PLAY_FLAGS = {
+
+    # Plays inside the redzone
+    "redzone_play": (pl.col("yardline_100") <= REDZONE_YARDLINE).fill_null(False),
+
+    # Redzone rushing touchdowns
+    "redzone_rush_td": ((pl.col("yardline_100") <= REDZONE_YARDLINE) & (pl.col("rush_touchdown") == 1))
+    .fill_null(False),
+
+    # Redzone passing touchdowns
+    "redzone_pass_td": ((pl.col("yardline_100") <= REDZONE_YARDLINE) & (pl.col("pass_touchdown") == 1))
+    .fill_null(False),
+
+    # Passes with 20+ air yards
+    "big_play_attempt": (pl.col("air_yards") >= 20).fill_null(False),
+
+    # Completed passes with 20+ air yards
+    "big_play_conversion": ((pl.col("air_yards") >= 20) & (pl.col("complete_pass") == 1))
+    .fill_null(False),
+
+    # Positive epa plays
+    "successful_play": (pl.col("epa") > 0).fill_null(False),
+
+    # Carries
+    "carry": (pl.col("play_type") == "run").fill_null(False),
+
+    # Targets
+    "target": (pl.col("play_type") == "pass").fill_null(False),
+
+    # Rushes of EXPLOSIVE_RUN+ yards
+    "explosive_rush": (pl.col("yards_gained") >= EXPLOSIVE_RUN).fill_null(False),
+
+    # Receptions of EXPLOSIVE_RECEPTION+ yards
+    "explosive_reception": (pl.col("yards_gained") >= EXPLOSIVE_RECEPTION).fill_null(False),
+
+    # Rushing fantasy points gained
+    "rush_fpoints": (pl.col("yards_gained") * POINTS_PER_RUSH_YARD +
+                     pl.col("rush_touchdown") * POINTS_PER_RUSH_TD),
+
+    # Receiving fantasy points gained
+    "rec_fpoints": pl.when(pl.col("complete_pass") == 1)
+    .then(1 * PPR + pl.col("yards_gained") * POINTS_PER_REC_YARD + pl.col("pass_touchdown") * POINTS_PER_REC_TD)
+    .otherwise(0),
+
+    # Passing fantasy points gained
+    "pass_fpoints": pl.when(pl.col("complete_pass") == 1)
+    .then(pl.col("yards_gained") * POINTS_PER_PASS_YARD + pl.col("pass_touchdown") * POINTS_PER_PASS_TD)
+    .otherwise(pl.col("interception") * POINTS_PER_INTERCEPTION),
+
+    # Distance weighted opportunities
+    **weighted_opportunity_flags(),
+}
+
+# Windows as {suffix: (window_size, min_periods)}, None is an average over the whole season
+OFFENSE_WINDOWS = {"3g_avg": (3, 1), "6g_avg": (6, 4), "season_avg": None}
+DEFENSE_WINDOWS = {"6g_avg": (6, 1), "season_avg": None}
+
+# Windows over a player's last games across season boundaries (a week 1 game reads the end of
+# the previous season, byes and playoffs included)
+CARRYOVER_WINDOWS = {"6g_carryover_avg": (6, 3)}
+
+
+@dataclass(frozen=True)
+class PositionSpec:
+    """
+    Declarative description of a positions dataset, compiled into a query plan by
+    pipeline.engine.build_position_datasets()
+    - position: Position as found in player stats ("WR", "RB", ...)
+    - stat_cols: Weekly player stat cols that are averaged
+    - play_aggs: {pbp player id col: {col name: aggregation}} per player per week
+    - defense_play_aggs: {col name: aggregation} over pbp per defteam per week
+    - defense_stat_aggs: {col name: aggregation} over player stats per opponent_team per week
+    - sources: Optional sources joined to weekly stats ("snap_counts", "nextgen")
+    - derived: {col name: fn(window suffix)->expr} computed for every offensive window
+    - carryover_windows: Windows of the offensive cols that don't restart each season
+    """
+    position: str
+    stat_cols: list[str]
+    play_aggs: dict[str, dict[str, pl.Expr]] = field(default_factory=dict)
+    defense_play_aggs: dict[str, pl.Expr] = field(default_factory=dict)
+    defense_stat_aggs: dict[str, pl.Expr] = field(default_factory=dict)
+    sources: tuple[str, ...] = ()
+    offense_windows: dict = field(default_factory=lambda: dict(OFFENSE_WINDOWS))
+    defense_windows: dict = field(default_factory=lambda: dict(DEFENSE_WINDOWS))
+    derived: dict[str, Callable[[str], pl.Expr]] = field(default_factory=dict)
+    min_snap_share: float = .05
+    carryover_windows: dict = field(default_factory=lambda: dict(CARRYOVER_WINDOWS))
+
+    def offense_cols(self)->list[str]:
+        """
+        :return: Cols averaged over offense_windows
+        """
+        cols = list(self.stat_cols)
+        for aggs in self.play_aggs.values():
+            cols += [col for col in aggs if col not in cols]
+        if "snap_counts" in self.sources:
+            cols.append("offense_pct")
+        if "nextgen" in self.sources:
+            cols += [col for col in NEXTGEN_COLS if col not in cols]
+        return cols
+
+    def defense_cols(self)->list[str]:
+        """
+        :return: Cols averaged over defense_windows
+        """
+        return list(self.defense_stat_aggs) + list(self.defense_play_aggs)
+
+    def play_flags(self)->dict[str, pl.Expr]:
+        """
+        :return: The subset of PLAY_FLAGS referenced by this spec's aggregations
+        """
+        aggs = list(self.defense_play_aggs.values())
+        for role_aggs in self.play_aggs.values():
+            aggs += list(role_aggs.values())
+        used = set()
+        for agg in aggs:
+            used.update(agg.meta.root_names())
+        return {name: expr for name, expr in PLAY_FLAGS.items() if name in used}
+
+
+# Next-gen receiving cols joined when "nextgen" is a source
+NEXTGEN_COLS = ["avg_cushion", "avg_separation", "catch_percentage", "avg_yac_above_expectation"]
+
+
+def _receiving_play_aggs()->dict[str, pl.Expr]:
+    """
+    :return: Weekly pbp aggregations for pass catchers, grouped by receiver_player_id
+    """
+    return {
+        "redzone_targets": pl.col("redzone_play").sum(),
+        "big_play_attempts": pl.col("big_play_attempt").sum(),
+        "comp_yac_epa": pl.col("comp_yac_epa").sum(),
+        "redzone_touchdowns": pl.col("redzone_pass_td").sum(),
+        "big_play_conversions": pl.col("big_play_conversion").sum(),
+        "air_yards_targeted": pl.col("air_yards").sum(),
+        "weighted_targets": pl.col("opportunity_weight").sum(),
+        "redzone_target_weight": pl.col("redzone_opportunity_weight").sum(),
+    }
+
+def _receiving_defense_stat_aggs(position=None)->dict[str, pl.Expr]:
+    """
+    :param str position: Position the stats are restricted to, None for all positions
+    :return: Weekly player stat aggregations allowed by a defense, grouped by opponent_team
+    """
+    targeted = pl.lit(True) if position is None else pl.col("position") == position
+    return {
+        "targets_against": pl.col("targets").filter(targeted).sum(),
+        "receptions_against": pl.col("receptions").filter(targeted).sum(),
+        "receiving_yards_against": pl.col("receiving_yards").filter(targeted).sum(),
+        "receiving_tds_against": pl.col("receiving_tds").filter(targeted).sum(),
+        "receiving_epa_against": pl.col("receiving_epa").filter(targeted).sum(),
+        "racr_against": pl.col("racr").filter(targeted).sum(),
+    }
+
+def _receiving_defense_play_aggs(position=None)->dict[str, pl.Expr]:
+    """
+    :param str position: Receiver position the plays are restricted to, None for all pass attempts
+    :return: Weekly pbp aggregations allowed by a defense, grouped by defteam
+    """
+    targeted = pl.col("pass_attempt") == 1
+    if position is not None:
+        targeted = targeted & (pl.col("receiver_position") == position)
+    return {
+        "yards_after_catch_against": pl.col("yards_after_catch").filter(targeted).sum(),
+        "air_yards_against": pl.col("air_yards").filter(targeted).sum(),
+        "yac_epa_against": pl.col("yac_epa").filter(targeted).sum(),
+        "redzone_targets_against": pl.col("redzone_play").filter(targeted).sum(),
+        "big_play_attempts_against": pl.col("big_play_attempt").filter(targeted).sum(),
+        "redzone_touchdowns_against": pl.col("redzone_pass_td").filter(targeted).sum(),
+        "big_play_conversions_against": pl.col("big_play_conversion").filter(targeted).sum(),
+        "weighted_targets_against": pl.col("opportunity_weight").filter(targeted).sum(),
+    }
+
+def _ratio(numerator, denominator)->Callable[[str], pl.Expr]:
+    """
+    :return: fn(window suffix) dividing two averaged cols of the same window
+    """
+    return lambda window: pl.col(f"{numerator}_{window}") / pl.col(f"{denominator}_{window}")
+
+def redzone_capitalization(touchdowns, weight, opportunities)->pl.Expr:
+    """
+    Redzone capitalization score of the README: redzone touchdowns / weight per redzone opportunity
+    :param str touchdowns: Col of redzone touchdowns
+    :param str weight: Col of summed redzone_opportunity_weight, see weighted_opportunity_flags()
+    :param str opportunities: Col of redzone opportunities
+    :return: Score, null without a redzone opportunity (the score is undefined there, not zero)
+    """
+    return pl.when(pl.col(weight) > 0).then(pl.col(touchdowns) * pl.col(opportunities) / pl.col(weight))
+
+def _capitalization(touchdowns, weight, opportunities)->Callable[[str], pl.Expr]:
+    """
+    :return: fn(window suffix) of redzone_capitalization() over averaged cols of the same window
+    """
+    return lambda window: redzone_capitalization(
+        f"{touchdowns}_{window}", f"{weight}_{window}", f"{opportunities}_{window}"
+    )
+
+
+# Receivers, mirrors wr_modeling.feature_engineering.get_training_df()
+WR_SPEC = PositionSpec(
+    position="WR",
+    stat_cols=["receptions", "targets", "receiving_yards", "receiving_tds", "receiving_air_yards",
+               "receiving_yards_after_catch", "receiving_first_downs", "receiving_epa", "racr",
+               "target_share", "air_yards_share", "wopr", "fantasy_points_ppr"],
+    play_aggs={"receiver_player_id": _receiving_play_aggs()},
+    defense_play_aggs=_receiving_defense_play_aggs(),
+    defense_stat_aggs=_receiving_defense_stat_aggs(),
+    sources=("snap_counts", "nextgen"),
+)
+
+# Tight ends, receiving profile with defenses measured against tight ends only
+TE_SPEC = PositionSpec(
+    position="TE",
+    stat_cols=WR_SPEC.stat_cols,
+    play_aggs={"receiver_player_id": _receiving_play_aggs()},
+    defense_play_aggs=_receiving_defense_play_aggs("TE"),
+    defense_stat_aggs=_receiving_defense_stat_aggs("TE"),
+    sources=("snap_counts", "nextgen"),
+    derived={
+        "yards_per_target": _ratio("receiving_yards", "targets"),
+        "avg_depth_of_target": _ratio("air_yards_targeted", "targets"),
+    },
+)
+
+# Running backs, mirrors rb_metrics.rb_efficiency_metrics(), rb_metrics.rb_defense.rb_defensive_metrics() reads its defense
+_rb_rush = (pl.col("rusher_position") == "RB") & pl.col("carry")
+_rb_target = (pl.col("receiver_position") == "RB") & pl.col("target")
+RB_SPEC = PositionSpec(
+    position="RB",
+    stat_cols=["carries", "rushing_yards", "targets", "receiving_yards", "fantasy_points_ppr"],
+    play_aggs={
+        "rusher_player_id": {
+            "redzone_carries": pl.col("redzone_play").sum(),
+            "redzone_td_rushes": pl.col("redzone_rush_td").sum(),
+            "successful_rushes": pl.col("success").sum(),
+            "explosive_rushes": pl.col("explosive_rush").sum(),
+            "rush_fpoints_gained": pl.col("rush_fpoints").sum(),
+            "weighted_carries": pl.col("opportunity_weight").sum(),
+            "redzone_carry_weight": pl.col("redzone_opportunity_weight").sum(),
+        },
+        "receiver_player_id": {
+            "redzone_targets": pl.col("redzone_play").sum(),
+            "redzone_td_receptions": pl.col("redzone_pass_td").sum(),
+            "successful_targets": pl.col("success").sum(),
+            "explosive_receptions": pl.col("explosive_reception").sum(),
+            "rec_fpoints_gained": pl.col("rec_fpoints").sum(),
+            "weighted_targets": pl.col("opportunity_weight").sum(),
+            "redzone_target_weight": pl.col("redzone_opportunity_weight").sum(),
+        },
+    },
+    defense_play_aggs={
+        "carries_against": pl.col("carry").filter(_rb_rush).sum(),
+        "successful_rushes_against": pl.col("successful_play").filter(_rb_rush).sum(),
+        "redzone_carries_against": pl.col("redzone_play").filter(_rb_rush).sum(),
+        "redzone_rush_tds_against": pl.col("redzone_rush_td").filter(_rb_rush).sum(),
+        "rush_fpoints_against": pl.col("rush_fpoints").filter(_rb_rush).sum(),
+        "rush_yards_against": pl.col("yards_gained").filter(_rb_rush).sum(),
+        "explosive_rushes_against": pl.col("explosive_rush").filter(_rb_rush).sum(),
+        "rush_epa_against": pl.col("epa").filter(_rb_rush).sum(),
+        "targets_against": pl.col("target").filter(_rb_target).sum(),
+        "successful_targets_against": pl.col("successful_play").filter(_rb_target).sum(),
+        "rec_fpoints_against": pl.col("rec_fpoints").filter(_rb_target).sum(),
+        "explosive_receptions_against": pl.col("explosive_reception").filter(_rb_target).sum(),
+        "receiving_yards_against": pl.col("yards_gained").filter(_rb_target).sum(),
+        "receiving_epa_against": pl.col("epa").filter(_rb_target).sum(),
+        "weighted_carries_against": pl.col("opportunity_weight").filter(_rb_rush).sum(),
+        "weighted_targets_against": pl.col("opportunity_weight").filter(_rb_target).sum(),
+    },
+    sources=("snap_counts",),
+    derived={
+        "yards_per_carry": _ratio("rushing_yards", "carries"),
+        "yards_per_target": _ratio("receiving_yards", "targets"),
+        "fpoints_per_carry": _ratio("rush_fpoints_gained", "carries"),
+        "fpoints_per_target": _ratio("rec_fpoints_gained", "targets"),
+        "redzone_carry_capitalization": _capitalization("redzone_td_rushes", "redzone_carry_weight", "redzone_carries"),
+        "redzone_target_capitalization": _capitalization(
+            "redzone_td_receptions", "redzone_target_weight", "redzone_targets"
+        ),
+    },
+)
+
+# Quarterbacks, built from the same play-by-play scan as every other position
+_qb_dropback = (pl.col("passer_position") == "QB") & (pl.col("pass_attempt") == 1)
+QB_SPEC = PositionSpec(
+    position="QB",
+    stat_cols=["completions", "attempts", "passing_yards", "passing_tds", "passing_interceptions",
+               "sacks_suffered", "passing_air_yards", "passing_epa", "carries", "rushing_yards",
+               "rushing_tds", "fantasy_points_ppr"],
+    play_aggs={
+        "passer_player_id": {
+            "redzone_attempts": pl.col("redzone_play").sum(),
+            "redzone_pass_tds": pl.col("redzone_pass_td").sum(),
+            "big_play_attempts": pl.col("big_play_attempt").sum(),
+            "big_play_conversions": pl.col("big_play_conversion").sum(),
+            "successful_dropbacks": pl.col("successful_play").sum(),
+        },
+    },
+    defense_play_aggs={
+        "pass_attempts_against": pl.col("pass_attempt").filter(_qb_dropback).sum(),
+        "passing_epa_against": pl.col("epa").filter(_qb_dropback).sum(),
+        "redzone_pass_tds_against": pl.col("redzone_pass_td").filter(_qb_dropback).sum(),
+        "big_play_conversions_against": pl.col("big_play_conversion").filter(_qb_dropback).sum(),
+        "pass_fpoints_against": pl.col("pass_fpoints").filter(_qb_dropback).sum(),
+        "sacks_against": pl.col("sack").filter(pl.col("passer_position") == "QB").sum(),
+        "interceptions_against": pl.col("interception").filter(_qb_dropback).sum(),
+    },
+    defense_stat_aggs={
+        "fantasy_points_ppr_against": pl.col("fantasy_points_ppr").filter(pl.col("position") == "QB").sum(),
+    },
+    sources=("snap_counts",),
+    derived={
+        "yards_per_attempt": _ratio("passing_yards", "attempts"),
+        "big_play_conversion_rate": _ratio("big_play_conversions", "big_play_attempts"),
+    },
+)
+
+
+def position_specs()->dict[str, PositionSpec]:
+    """
+    :return: Every supported position mapped to its spec
+    """
+    return {spec.position: spec for spec in [QB_SPEC, RB_SPEC, WR_SPEC, TE_SPEC]}
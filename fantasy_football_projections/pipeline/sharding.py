@@ -0,0 +1,61 @@
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import polars as pl
+
+
+def _build_shard(build, season, lookback_seasons, first_season, kwargs):
+    """
+    Builds one season in a worker process, with up to lookback_seasons earlier seasons but none
+    before first_season (a build of every season never reads before its first season either)
+    :return: build()'s result restricted to season
+    """
+    seasons = list(range(max(season - lookback_seasons, first_season), season + 1))
+    result = build(seasons, **kwargs)
+    if len(seasons) == 1:
+        return result
+    if isinstance(result, dict):
+        return {key: df.filter(pl.col("season") == season) for key, df in result.items()}
+    return result.filter(pl.col("season") == season)
+
+def _merge(shards, sort_by):
+    """
+    :param list[pl.DataFrame] shards: Shards in season order
+    :param list[str] sort_by: Cols to sort the merged df by, None keeps season order
+    """
+    df = pl.concat(shards, how="diagonal_relaxed")
+    return df.sort(sort_by) if sort_by else df
+
+def sharded_build(build, seasons, max_workers=None, lookback_seasons=0, sort_by=None, **kwargs):
+    """
+    Runs build() once per season in a process pool and merges the shards. A build whose windows
+    restart each season needs no other season; a build whose windows reach into earlier seasons
+    (ex. engine.carryover_lookback_seasons()) sets lookback_seasons and those seasons' rows are
+    dropped from the shard
+    :param build: Module level fn(seasons, **kwargs) returning a df or a dict of dfs
+    :param int[] seasons: Seasons to build
+    :param int max_workers: Worker processes, one per season (up to the cpu count) if None
+    :param int lookback_seasons: Earlier seasons loaded by every shard
+    :param list[str] sort_by: Cols to sort merged dfs by, None keeps season order
+    :param kwargs: Passed to build()
+    :return: Merged df, or dict of merged dfs when build returns a dict
+    """
+    seasons = sorted(seasons)
+    max_workers = max_workers or min(len(seasons), os.cpu_count() or 1)
+
+    if max_workers == 1:
+        results = [_build_shard(build, season, lookback_seasons, seasons[0], kwargs) for season in seasons]
+    else:
+        # Forking a process that already runs polars threads can deadlock, workers are spawned
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+            futures = [
+                pool.submit(_build_shard, build, season, lookback_seasons, seasons[0], kwargs) for season in seasons
+            ]
+            results = [future.result() for future in futures]
+
+    if isinstance(results[0], dict):
+        return {key: _merge([result[key] for result in results], sort_by) for key in results[0]}
+    return _merge(results, sort_by)
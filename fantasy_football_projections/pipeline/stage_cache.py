@@ -0,0 +1,134 @@
+
+import hashlib
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+import polars as pl
+
+from fantasy_football_projections.data_loading.snapshots import code_hash, read_snapshot, write_snapshot
+
+
+# Folder of the stage outputs, one sub folder per stage and one IPC file per key
+STAGE_CACHE_DIR = os.path.join("fantasy_football_projections", "data_loading", "stage_cache")
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    One step of a build DAG, run by StageGraph
+    - name: Stage name, also the folder its outputs are cached in
+    - fn: fn(*input outputs, **params)->pl.DataFrame
+    - inputs: Names of the stages whose outputs are passed to fn, in order
+    - params: Keyword arguments of fn, their repr is part of the key
+    - code: Other functions, classes or modules fn calls, their source is part of the key
+    - version: Extra key material, ex. the data version of the sources a stage loads
+    """
+    name: str
+    fn: Callable[..., pl.DataFrame]
+    inputs: tuple[str, ...] = ()
+    params: dict = field(default_factory=dict)
+    code: tuple = ()
+    version: str = ""
+
+
+def stable_repr(value)->str:
+    """
+    :return: repr of value with dict items sorted, so equal params always hash the same
+    """
+    if isinstance(value, dict):
+        return "{" + ", ".join(f"{k!r}: {stable_repr(v)}" for k, v in sorted(value.items())) + "}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(stable_repr(v) for v in value) + "]"
+    return repr(value)
+
+
+class StageGraph:
+    """
+    Build DAG whose stage outputs are persisted under a key hashing the stage's code, params and
+    version and the keys of its inputs. A change anywhere changes the key of that stage and
+    every stage downstream of it, so a run recomputes only those and reads the rest
+    """
+    def __init__(self, stages, cache_dir=STAGE_CACHE_DIR):
+        """
+        :param list[Stage] stages: Stages of the DAG, in any order
+        :param str cache_dir: Folder of the cached outputs
+        """
+        self.stages = {stage.name: stage for stage in stages}
+        self.cache_dir = cache_dir
+        self.report = []
+        self._keys = {}
+        for stage in stages:
+            missing = [name for name in stage.inputs if name not in self.stages]
+            if missing:
+                raise ValueError(f"Stage {stage.name} reads unknown stages: {missing}")
+        for name in self.stages:
+            self.key(name)
+
+    def key(self, name, visiting=())->str:
+        """
+        :param str name: Stage name
+        :return: Content address of the stage's output
+        """
+        if name in visiting:
+            raise ValueError(f"Stage cycle: {' -> '.join(visiting + (name,))}")
+        if name not in self._keys:
+            stage = self.stages[name]
+            parts = [
+                stage.name,
+                code_hash(stage.fn),
+                *(code_hash(obj) for obj in stage.code),
+                stable_repr(stage.params),
+                stage.version,
+                *(self.key(input_name, visiting + (name,)) for input_name in stage.inputs),
+            ]
+            self._keys[name] = hashlib.sha256("|".join(parts).encode()).hexdigest()[:24]
+        return self._keys[name]
+
+    def path(self, name)->str:
+        """
+        :param str name: Stage name
+        :return: IPC file of the stage's output under its current key
+        """
+        return os.path.join(self.cache_dir, name, f"{self.key(name)}.arrow")
+
+    def run(self, target)->pl.DataFrame:
+        """
+        Reads target if it is cached, otherwise computes it from its inputs (read or computed the
+        same way) and caches it. Stages above a cached stage are never read
+        :param str target: Stage name
+        :return: Output of target
+        """
+        outputs = {}
+
+        def evaluate(name):
+            if name in outputs:
+                return outputs[name]
+            path = self.path(name)
+            start = time.perf_counter()
+            if os.path.exists(path):
+                outputs[name] = read_snapshot(path)
+                status = "hit"
+            else:
+                stage = self.stages[name]
+                inputs = [evaluate(input_name) for input_name in stage.inputs]
+                start = time.perf_counter()
+                outputs[name] = stage.fn(*inputs, **stage.params)
+                write_snapshot(outputs[name], path)
+                status = "computed"
+            self.report.append({
+                "stage": name, "key": self.key(name), "status": status, "seconds": time.perf_counter() - start
+            })
+            return outputs[name]
+
+        return evaluate(target)
+
+    def stats(self)->pl.DataFrame:
+        """
+        :return: df of every stage run so far, its key, 'hit' or 'computed' and seconds spent
+        on it (excluding its inputs)
+        """
+        return pl.DataFrame(
+            self.report, schema={"stage": pl.String, "key": pl.String, "status": pl.String, "seconds": pl.Float64}
+        )
@@ -9,6 +9,7 @@ from fantasy_football_projections.config import (
     POINTS_PER_REC_TD,
     EXPLOSIVE_RUN,
     EXPLOSIVE_RECEPTION,
+    REDZONE_YARDLINE,
 )
 
 from fantasy_football_projections.data_loading.player_data import (
@@ -16,11 +17,14 @@ from fantasy_football_projections.data_loading.player_data import (
     load_pbp_data,
     get_rb_ids,
 )
+from fantasy_football_projections.data_loading.snapshots import snapshotted
 
+from fantasy_football_projections.pipeline.position_specs import redzone_capitalization, weighted_opportunity_flags
 from fantasy_football_projections.rb_metrics.utility import get_rb_efficiency_cols
 
 
 # Metrics measuring a players ability to capitalize on their opportunities
+@snapshotted("rb_efficiency_weekly", code=(weighted_opportunity_flags, redzone_capitalization, get_rb_efficiency_cols))
 def rb_efficiency_metrics(seasons: list[int] | int)->pl.DataFrame:
     """
     Returns a data frame of feature cols for rb efficiency metrics, cols found
@@ -40,19 +44,20 @@ def rb_efficiency_metrics(seasons: list[int] | int)->pl.DataFrame:
     # Filters pbp targets
     pbp_targets = pbp_stats.filter(pl.col("receiver_player_id").is_in(rb_ids))
 
+    # Distance weights of every play, shared with the position specs
+    opportunity_flags = weighted_opportunity_flags()
+
     # Generates needed stat cols in pbp_carries
     pbp_carries = pbp_carries.with_columns(
 
         # Redzone Carries
-        pl.when(pl.col("yardline_100") <= 20)
-        .then(1)
-        .otherwise(0)
+        (pl.col("yardline_100") <= REDZONE_YARDLINE)
+        .fill_null(False)
         .alias("redzone_carry"),
 
         # Redzone touchdowns
-        pl.when((pl.col("yardline_100") <= 20) & (pl.col("rush_touchdown") == 1))
-        .then(1)
-        .otherwise(0)
+        ((pl.col("yardline_100") <= REDZONE_YARDLINE) & (pl.col("rush_touchdown") == 1))
+        .fill_null(False)
         .alias("redzone_td_rush"),
 
         # Positive epa play
@@ -60,30 +65,30 @@ def rb_efficiency_metrics(seasons: list[int] | int)->pl.DataFrame:
         .alias("successful_rush"),
 
         # Rush of 10+ yards
-        pl.when(pl.col("yards_gained") >= EXPLOSIVE_RUN)
-        .then(1)
-        .otherwise(0)
+        (pl.col("yards_gained") >= EXPLOSIVE_RUN)
+        .fill_null(False)
         .alias("explosive_rush"),
 
         # Fantasy points gained
         (pl.col("yards_gained") * POINTS_PER_RUSH_YARD +
         pl.col("rush_touchdown") * POINTS_PER_RUSH_TD)
-        .alias("rush_fpoints_gained")
+        .alias("rush_fpoints_gained"),
+
+        # Distance weighted carries
+        *[expr.alias(name) for name, expr in opportunity_flags.items()]
     )
 
     # Generates needed stat cols in pbp_targets
     pbp_targets = pbp_targets.with_columns(
 
         # Redzone targets
-        pl.when(pl.col("yardline_100") <= 20)
-        .then(1)
-        .otherwise(0)
+        (pl.col("yardline_100") <= REDZONE_YARDLINE)
+        .fill_null(False)
         .alias("redzone_target"),
 
         # Redzone touchdowns
-        pl.when((pl.col("yardline_100") <= 20) & (pl.col("pass_touchdown") == 1))
-        .then(1)
-        .otherwise(0)
+        ((pl.col("yardline_100") <= REDZONE_YARDLINE) & (pl.col("pass_touchdown") == 1))
+        .fill_null(False)
         .alias("redzone_td_reception"),
 
         # Positive epa play
@@ -91,9 +96,8 @@ def rb_efficiency_metrics(seasons: list[int] | int)->pl.DataFrame:
         .alias("successful_target"),
 
         # Reception of 12+ yards
-        pl.when(pl.col("yards_gained") >= EXPLOSIVE_RECEPTION)
-        .then(1)
-        .otherwise(0)
+        (pl.col("yards_gained") >= EXPLOSIVE_RECEPTION)
+        .fill_null(False)
         .alias("explosive_target"),
 
         # Fantasy points gained
@@ -104,7 +108,10 @@ def rb_efficiency_metrics(seasons: list[int] | int)->pl.DataFrame:
             pl.col("yards_gained") * POINTS_PER_REC_YARD +
             pl.col("pass_touchdown") * POINTS_PER_REC_TD
         )
-        .alias("rec_fpoints_gained")
+        .alias("rec_fpoints_gained"),
+
+        # Distance weighted targets
+        *[expr.alias(name) for name, expr in opportunity_flags.items()]
     )
 
     # Aggregates pbp carries to weekly totals
@@ -123,7 +130,11 @@ def rb_efficiency_metrics(seasons: list[int] | int)->pl.DataFrame:
         pl.col("rush_fpoints_gained").sum().alias("rush_fpoints_gained"),
 
         # Explosive plays
-        pl.col("explosive_rush").sum().alias("explosive_rushes")
+        pl.col("explosive_rush").sum().alias("explosive_rushes"),
+
+        # Weighted opportunities
+        pl.col("opportunity_weight").sum().alias("weighted_carries"),
+        pl.col("redzone_opportunity_weight").sum().alias("redzone_carry_weight")
     )
 
     # Aggregates pbp receptions to weekly totals
@@ -142,7 +153,11 @@ def rb_efficiency_metrics(seasons: list[int] | int)->pl.DataFrame:
         pl.col("rec_fpoints_gained").sum().alias("rec_fpoints_gained"),
 
         # Explosive plays
-        pl.col("explosive_target").sum().alias("explosive_receptions")
+        pl.col("explosive_target").sum().alias("explosive_receptions"),
+
+        # Weighted opportunities
+        pl.col("opportunity_weight").sum().alias("weighted_targets"),
+        pl.col("redzone_opportunity_weight").sum().alias("redzone_target_weight")
     )
 
     # Renames week and season in pbp_carries and pbp_targets to avoid duplicate error on the second join
@@ -171,6 +186,14 @@ def rb_efficiency_metrics(seasons: list[int] | int)->pl.DataFrame:
         how="outer"
     ).fill_null(0)
 
+    # Redzone capitalization, null in weeks without a redzone opportunity
+    df = df.with_columns(
+        redzone_capitalization("redzone_td_rushes", "redzone_carry_weight", "redzone_carries")
+        .alias("redzone_carry_capitalization"),
+        redzone_capitalization("redzone_td_receptions", "redzone_target_weight", "redzone_targets")
+        .alias("redzone_target_capitalization"),
+    )
+
     cols = get_rb_efficiency_cols() + ["player_id", "week", "season", "opponent_team"]
     return df.select(cols)
 
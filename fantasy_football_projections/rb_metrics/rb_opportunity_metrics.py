@@ -4,14 +4,13 @@ from functools import lru_cache
 import polars as pl
 from polars import Int32
 
-from fantasy_football_projections.config import CURRENT_SEASON
-
 from fantasy_football_projections.data_loading.player_data import (
     load_snap_shares,
     load_player_stats,
     load_ff_opportunity_data,
     get_rb_ids,
 )
+from fantasy_football_projections.data_loading.snapshots import snapshotted
 
 from fantasy_football_projections.rb_metrics.utility import rusher_opportunity_bounds, get_rb_opportunity_cols
 
@@ -27,6 +26,7 @@ def get_rb_snap_shares(*seasons):
 
     return rb_snap_shares
 
+@snapshotted("rb_opportunity_weekly", code=(get_rb_snap_shares, rusher_opportunity_bounds, get_rb_opportunity_cols))
 def rb_opportunity_scores(seasons: list[int] | int)->pl.DataFrame:
     """
     Scores signifying a players rushing/receiving opportunity rate using snap share and carries
@@ -70,6 +70,13 @@ def rb_opportunity_scores(seasons: list[int] | int)->pl.DataFrame:
         right_on=["p_week", "p_season", "player_id"],
         how="outer"
     )
+
+    # Games missing from the snap counts only have player_stats keys, coalesced before
+    # the ff_opp join so those games still find their expected stats
+    opportunity_data = opportunity_data.with_columns(
+        pl.coalesce("week", "p_week").alias("week"),
+        pl.coalesce("season", "p_season").alias("season")
+    )
     opportunity_data = opportunity_data.join(
         ff_opp,
         left_on=["week", "season", "player_id"],
@@ -81,33 +88,25 @@ def rb_opportunity_scores(seasons: list[int] | int)->pl.DataFrame:
     opportunity_data = opportunity_data.fill_null(0)
     opportunity_data = opportunity_data.sort(["week", "season"])
 
-    # Gets statistical bounds for statistics in current season
-    bounds = rusher_opportunity_bounds(CURRENT_SEASON)
-    car_hi = bounds["carries_upper"]
-    rye_hi = bounds["rush_yards_exp_upper"]
-    rtd_hi = bounds["rush_td_exp_upper"]
-    rfd_hi = bounds["rush_first_down_exp_upper"]
-    tar_hi = bounds["targets_upper"]
-    rec_hi = bounds["receptions_exp_upper"]
-    reye_hi = bounds["rec_yards_exp_upper"]
-    retd_hi = bounds["rec_td_exp_upper"]
-    refd_hi = bounds["rec_first_down_exp_upper"]
+    # Joins each season's rb bounds so every game is scaled by its own season
+    bounds = rusher_opportunity_bounds(*seasons).filter(pl.col("position") == "RB").drop("position")
+    opportunity_data = opportunity_data.join(bounds, on="season", how="left")
 
     # Generates weighted statistics bounding data to [0,1]
     opportunity_data = opportunity_data.with_columns(
 
         # Rushing stats
-        (pl.col("rush_yards_gained_exp") / rye_hi).alias("weighted_rush_yards_exp"),
-        (pl.col("rush_touchdown_exp") / rtd_hi).alias("weighted_rush_touchdown_exp"),
-        (pl.col("rush_first_down_exp") / rfd_hi).alias("weighted_rush_first_down_exp"),
-        (pl.col("carries") / car_hi).alias("weighted_carries"),
+        (pl.col("rush_yards_gained_exp") / pl.col("rush_yards_exp_upper")).alias("weighted_rush_yards_exp"),
+        (pl.col("rush_touchdown_exp") / pl.col("rush_td_exp_upper")).alias("weighted_rush_touchdown_exp"),
+        (pl.col("rush_first_down_exp") / pl.col("rush_first_down_exp_upper")).alias("weighted_rush_first_down_exp"),
+        (pl.col("carries") / pl.col("carries_upper")).alias("weighted_carries"),
 
         # Receiving stats
-        (pl.col("targets") / tar_hi).alias("weighted_targets"),
-        (pl.col("rec_yards_gained_exp") / reye_hi).alias("weighted_rec_yards_exp"),
-        (pl.col("rec_touchdown_exp") / retd_hi).alias("weighted_rec_touchdown_exp"),
-        (pl.col("rec_first_down_exp") / refd_hi).alias("weighted_rec_first_down_exp"),
-        (pl.col("receptions_exp") / rec_hi).alias("receptions_exp_upper")
+        (pl.col("targets") / pl.col("targets_upper")).alias("weighted_targets"),
+        (pl.col("rec_yards_gained_exp") / pl.col("rec_yards_exp_upper")).alias("weighted_rec_yards_exp"),
+        (pl.col("rec_touchdown_exp") / pl.col("rec_td_exp_upper")).alias("weighted_rec_touchdown_exp"),
+        (pl.col("rec_first_down_exp") / pl.col("rec_first_down_exp_upper")).alias("weighted_rec_first_down_exp"),
+        (pl.col("receptions_exp") / pl.col("receptions_exp_upper")).alias("weighted_receptions_exp")
     )
 
     # Generates rushing opportunity score column for each game
@@ -127,7 +126,7 @@ def rb_opportunity_scores(seasons: list[int] | int)->pl.DataFrame:
         # Receiving opportunity
         (
             pl.col("weighted_targets") * .30 +
-            pl.col("receptions_exp_upper") * .25 +
+            pl.col("weighted_receptions_exp") * .25 +
             pl.col("weighted_rec_yards_exp") * .20 +
             pl.col("weighted_rec_touchdown_exp") * .15 +
             pl.col("weighted_rec_first_down_exp") * .10
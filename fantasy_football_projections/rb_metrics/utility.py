@@ -3,95 +3,47 @@ from functools import lru_cache
 import polars as pl
 from fantasy_football_projections.data_loading.player_data import load_ff_opportunity_data, load_player_stats
 
-@lru_cache(maxsize=None)
-def rusher_opportunity_bounds(season)->dict[str, float]:
+# Bound name -> player stats col
+STAT_BOUND_COLS = {
+    "carries": "carries",
+    "targets": "targets",
+}
+
+# Bound name -> ff opportunity col
+OPPORTUNITY_BOUND_COLS = {
+    "rush_yards_exp": "rush_yards_gained_exp",
+    "rush_td_exp": "rush_touchdown_exp",
+    "rush_first_down_exp": "rush_first_down_exp",
+    "rec_yards_exp": "rec_yards_gained_exp",
+    "rec_td_exp": "rec_touchdown_exp",
+    "rec_first_down_exp": "rec_first_down_exp",
+    "receptions_exp": "receptions_exp",
+}
+
+def _percentile_bounds(df, cols)->pl.DataFrame:
     """
-    Stats used: carries, rush_yards_exp, rush_td_exp, rush_first_down_exp
-    :param int season: Seasons to get rush yards expected bounds for
-    :return: Dict containing the 1st percentile and 99th percentile for expected stats
-    per game in a given season
+    :param pl.DataFrame df: Per game stats with 'season' and 'position'
+    :param dict cols: Bound name -> col
+    :return: Df of f"{name}_lower" (1st percentile) and f"{name}_upper" (99th percentile)
+    per (season, position)
     """
-    player_stats = load_player_stats(season).filter(
-        pl.col("position") == "RB"
-    )
-    ff_opp = load_ff_opportunity_data(season).filter(
-        pl.col("position") == "RB"
-    )
-
-    # Carries
-    car_lo, car_hi = player_stats.select(
-        pl.col("carries").quantile(0.01).alias("car_p01"),
-        pl.col("carries").quantile(0.99).alias("car_p99")
-    ).row(0)
-
-    # Targets
-    tar_lo, tar_hi = player_stats.select(
-        pl.col("targets").quantile(0.01).alias("tar_p01"),
-        pl.col("targets").quantile(0.99).alias("tar_p99")
-    )
-
-    # Rush yards expected
-    rye_lo, rye_hi = ff_opp.select(
-        pl.col("rush_yards_gained_exp").quantile(0.01).alias("rye_p01"),
-        pl.col("rush_yards_gained_exp").quantile(0.99).alias("rye_p99")
-    ).row(0)
-
-    # Rush TD expected
-    rtd_lo, rtd_hi = ff_opp.select(
-        pl.col("rush_touchdown_exp").quantile(0.01).alias("rtd_p01"),
-        pl.col("rush_touchdown_exp").quantile(0.99).alias("rtd_p99")
-    ).row(0)
-
-    # Rush first downs expected
-    rfd_lo, rfd_hi = ff_opp.select(
-        pl.col("rush_first_down_exp").quantile(0.01).alias("rfd_p01"),
-        pl.col("rush_first_down_exp").quantile(0.99).alias("rfd_p99")
-    ).row(0)
-
-    # Receiving yards gained expected
-    reye_lo, reye_hi = ff_opp.select(
-        pl.col("rec_yards_gained_exp").quantile(0.01).alias("reye_p01"),
-        pl.col("rec_yards_gained_exp").quantile(0.99).alias("reye_p99")
-    )
-
-    # Receiving touchdown expected
-    retd_lo, retd_hi = ff_opp.select(
-        pl.col("rec_touchdown_exp").quantile(0.01).alias("retd_p01"),
-        pl.col("rec_touchdown_exp").quantile(0.99).alias("retd_p99")
-    )
-
-    # Receiving first downs expected
-    refd_lo, refd_hi = ff_opp.select(
-        pl.col("rec_first_down_exp").quantile(0.01).alias("refd_p01"),
-        pl.col("rec_first_down_exp").quantile(0.99).alias("refd_p99")
+    return df.with_columns(pl.col("season").cast(pl.Int32)).group_by(["season", "position"]).agg(
+        [pl.col(col).quantile(0.01).alias(f"{name}_lower") for name, col in cols.items()] +
+        [pl.col(col).quantile(0.99).alias(f"{name}_upper") for name, col in cols.items()]
     )
 
-    # Yards after catch expected
-    rec_lo, rec_hi = ff_opp.select(
-        pl.col("receptions_exp").quantile(0.01).alias("rec_p01"),
-        pl.col("receptions_exp").quantile(0.99).alias("rec_p99")
-    )
+@lru_cache(maxsize=None)
+def rusher_opportunity_bounds(*seasons)->pl.DataFrame:
+    """
+    Stats used: carries, targets and the expected stats of ff opportunity data
+    :param int seasons: Seasons to get bounds for
+    :return: Df with one row per (season, position) containing the 1st percentile and
+    99th percentile of every stat per game
+    """
+    stat_bounds = _percentile_bounds(load_player_stats(*seasons), STAT_BOUND_COLS)
+    opportunity_bounds = _percentile_bounds(load_ff_opportunity_data(*seasons), OPPORTUNITY_BOUND_COLS)
 
-    return {
-        "carries_upper" : car_hi,
-        "carries_lower" : car_lo,
-        "rush_yards_exp_upper" : rye_hi,
-        "rush_yards_exp_lower" : rye_lo,
-        "rush_td_exp_upper" : rtd_hi,
-        "rush_td_exp_lower" : rtd_lo,
-        "rush_first_down_exp_upper" : rfd_hi,
-        "rush_first_down_exp_lower" : rfd_lo,
-        "targets_upper" : tar_hi,
-        "targets_lower" : tar_lo,
-        "rec_yards_exp_upper" : reye_hi,
-        "rec_yards_exp_lower" : reye_lo,
-        "rec_td_exp_upper" : retd_hi,
-        "rec_td_exp_lower" : retd_lo,
-        "rec_first_down_exp_upper" : refd_hi,
-        "rec_first_down_exp_lower" : refd_lo,
-        "receptions_exp_upper" : rec_hi,
-        "receptions_exp_lower" : rec_lo
-    }
+    return stat_bounds.join(opportunity_bounds, on=["season", "position"], how="full", coalesce=True)
 
 def get_rb_opportunity_cols()->list[str]:
     """
@@ -111,7 +63,9 @@ def get_rb_efficiency_cols()->list[str]:
         "redzone_carries", "redzone_td_rushes", "explosive_rushes",
         "redzone_targets", "redzone_td_receptions", "carries", "rec_fpoints_gained",
         "rushing_yards", "targets", "receiving_yards", "explosive_receptions",
-        "successful_rushes", "successful_targets", "rush_fpoints_gained"
+        "successful_rushes", "successful_targets", "rush_fpoints_gained",
+        "weighted_carries", "weighted_targets", "redzone_carry_weight", "redzone_target_weight",
+        "redzone_carry_capitalization", "redzone_target_capitalization"
     ]
 
 def get_rb_defensive_cols()->list[str]:
@@ -1,12 +1,17 @@
 
-import nflreadpy as nfl
 import polars as pl
 
-from fantasy_football_projections.data_loading.player_data import get_id_map
+from fantasy_football_projections.data_loading.player_data import load_player_stats, load_snap_shares
+from fantasy_football_projections.data_loading.prefetch import prefetch
+from fantasy_football_projections.data_loading.schedule_data import attach_schedule
 from fantasy_football_projections.rb_metrics.rb_defensive_metrics import rb_defense_metrics, rb_defense_metrics_cols
 from fantasy_football_projections.rb_metrics.rb_offenseive_metrics import opportunity_capitalization_stats, team_opportunities_provided, \
     opportunity_capitalization_stats_cols, team_opportunities_provided_cols
 from fantasy_football_projections.utils.constrcut_dataset_location import make_file_path
+from fantasy_football_projections.utils.window_kernel import window_means
+
+# Datasets read while building rb training data
+RB_DATASETS = ("pbp", "player_stats", "snap_counts", "ff_opportunity", "players", "schedules")
 
 
 def get_training_df(seasons, off_game_amt, def_game_amt, ppr=1):
@@ -18,30 +23,22 @@ def get_training_df(seasons, off_game_amt, def_game_amt, ppr=1):
     :return: data-frame with every rb game fpoints during seasons and their averages entering the game
     """
 
-    # Imports rb snap logs
-    id_map = get_id_map()
+    # Loads every source concurrently before building
+    prefetch(seasons, RB_DATASETS)
 
-    # Imports rb snap logs
-    rb_weekly_snaps = nfl.load_snap_counts(seasons).filter(
+    # Imports rb snap logs (gsis id mapped from pfr id)
+    rb_weekly_snaps = load_snap_shares(*seasons).filter(
         pl.col("position") == "RB"
-    ).with_columns(
-        pl.col("pfr_player_id").map_elements(lambda x: id_map.get(x))
-        .alias("gsis_id")
-    )
+    ).sort(["gsis_id", "season", "week"])
 
-    rb_snap_logs = rb_weekly_snaps.with_columns(
-
-        # Average snap share over last 2 games
-        pl.col("offense_pct")
-        .rolling_mean(window_size=3, min_periods=1)
-        .over(["gsis_id", "season"])
-        .shift(1)
-        .alias("snap_share_3g_avg")
-    )
+    # Average snap share over last 3 games
+    rb_snap_logs = window_means(
+        rb_weekly_snaps, ["offense_pct"], {"3g_avg": (3, 1)}, ["gsis_id", "season"]
+    ).rename({"offense_pct_3g_avg": "snap_share_3g_avg"})
 
 
     # Gets rb weekly stats and adds an opportunities col
-    rb_weekly_stats = ((nfl.load_player_stats(seasons).filter(
+    rb_weekly_stats = ((load_player_stats(*seasons).filter(
         pl.col("position") == "RB")).with_columns(
         (pl.col("carries") + pl.col("targets"))
         .alias("opportunities")
@@ -55,6 +52,9 @@ def get_training_df(seasons, off_game_amt, def_game_amt, ppr=1):
         how="inner"
     )
 
+    # Opponent of each game from the schedule index
+    rb_weekly_stats = attach_schedule(rb_weekly_stats, seasons)
+
     rb_weekly_stats = rb_weekly_stats.fill_null(0)
     rb_weekly_stats = rb_weekly_stats.filter(
         pl.col("offense_pct") > .05
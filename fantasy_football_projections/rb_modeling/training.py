@@ -1,18 +1,41 @@
 
 import polars as pl
-from lightgbm import LGBMRegressor
-from sklearn.model_selection import train_test_split
+from fantasy_football_projections.data_loading.load_models import RB_MODEL_PATH, save_booster
+from fantasy_football_projections.utils.backtesting import require_cols, walk_forward_backtest
 from fantasy_football_projections.utils.model_analysis import training_metrics, visualize_training
 from fantasy_football_projections.rb_modeling.feature_engineering import build_feature_df, features
 
 
-def train(location, show_metrics=False, show_visuals=False):
+def model_params(n_jobs=-1)->dict:
+    """
+    :param int n_jobs: LightGBM threads, -1 for every core
+    :return: LGBMRegressor keyword arguments of the rb model
+    """
+    return {
+        "n_jobs": n_jobs,
+        "objective": 'regression',
+        "boosting_type": 'gbdt',
+        "learning_rate": 0.005,
+        "num_leaves": 64,
+        "max_depth": 25,
+        "n_estimators": 1250,
+        "random_state": 42,
+        "verbosity": -1,
+    }
+
+def train(location, show_metrics=False, show_visuals=False, visuals_dir=None, params=None):
     """
     :param os.path location: The file path to the parquet file with the training data-frame
     :param bool show_metrics: Whether to show training metrics or not
     :param bool show_visuals: Whether to show training visuals or not
+    :param str visuals_dir: Folder the visuals are saved to instead of shown (headless)
+    :param dict params: LGBMRegressor keyword arguments, model_params() if None
     :return: A gbdt model for predicting fantasy rb output
     """
+    # Model and sklearn imports are deferred so projecting never loads them
+    from lightgbm import LGBMRegressor
+    from sklearn.model_selection import train_test_split
+
     # Uses all rb1, rb2, rb3 games over 2021 - 2024 seasons
     df = pl.read_parquet(location)
 
@@ -29,16 +52,7 @@ def train(location, show_metrics=False, show_visuals=False):
     )
 
     # Create gradiant boosting regression tree model
-    model = LGBMRegressor(
-        objective='regression',
-        boosting_type='gbdt',
-        learning_rate=0.005,
-        num_leaves=64,
-        max_depth=25,
-        n_estimators=1250,
-        random_state=42,
-        verbosity=-1,
-    )
+    model = LGBMRegressor(**(params or model_params()))
 
     """
     Current implementation:
@@ -51,18 +65,47 @@ def train(location, show_metrics=False, show_visuals=False):
 
     if show_metrics:
         training_metrics(y_test, y_pred=model.predict(X_test))
-    if show_visuals:
-        visualize_training(y_test, y_pred=model.predict(X_test), X_train=X_train, model=model)
+    if show_visuals or visuals_dir is not None:
+        visualize_training(y_test, y_pred=model.predict(X_test), X_train=X_train, model=model, output_dir=visuals_dir)
     return model
 
-def train_and_save(location, show_metrics=False, show_visuals=False):
+def train_and_save(location, show_metrics=False, show_visuals=False, visuals_dir=None, params=None, path=None):
     """
     Trains and saves model to file: "rb_model.txt"
     :param location: The file path to the parquet file with the training data-frame
     :param show_metrics: Whether to show training metrics or not
     :param show_visuals: Whether to show training visuals or not
+    :param visuals_dir: Folder the visuals are saved to instead of shown
+    :param params: LGBMRegressor keyword arguments, model_params() if None
+    :param path: Model file, RB_MODEL_PATH if None
     :return: The trained model
     """
-    model = train(location, show_metrics, show_visuals)
-    model.booster_.save_model("fantasy_football_projections/data_loading/models/rb_model.txt")
-    return model
\ No newline at end of file
+    model = train(location, show_metrics, show_visuals, visuals_dir, params)
+    save_booster(model.booster_, path or RB_MODEL_PATH)
+    return model
+
+def backtest(location, start_season, start_week=1, refresh_rounds=50):
+    """
+    Walk-forward backtest of the rb model, see utils.backtesting.walk_forward_backtest()
+    :param str location: The file path to the parquet file with the training data-frame
+    :param int start_season: Season of the first week predicted
+    :param int start_week: First week predicted in start_season
+    :param int refresh_rounds: Boosting rounds added on each newly available week
+    :return: (per-week metrics df, out-of-sample predictions df, final Booster)
+    """
+    df = pl.read_parquet(location)
+    require_cols(
+        df, ["season", "week", "gsis_id", "team"], location,
+        "rb_modeling.feature_engineering.write_training_df_to_parquet()"
+    )
+
+    # Feature rows keep the order of the training df, so season/week and the ids are carried over
+    # (the training df only holds rbs, residual distributions are learned per position)
+    features_df = build_feature_df(df).with_columns(df.select(
+        "season", "week", pl.col("gsis_id").alias("player_id"), "team", pl.lit("RB").alias("position")
+    ))
+
+    return walk_forward_backtest(
+        features_df, features(), model_params(), start_season, start_week, refresh_rounds,
+        id_cols=["player_id", "team", "position"]
+    )
\ No newline at end of file
@@ -0,0 +1,28 @@
+
+import polars as pl
+
+
+def attach_as_of(df, state, team_col="opponent_team", state_team_col="opponent_team"):
+    """
+    Attaches the latest row of a point-in-time state table strictly before each row's
+    (season, week), so a game never sees its own stats and byes fall back to the last game played
+    :param pl.DataFrame | pl.LazyFrame df: Rows with team_col, 'season' and 'week' of the games being projected
+    :param pl.DataFrame | pl.LazyFrame state: State after each game keyed by state_team_col, 'season', 'week'
+    :param str team_col: Team col of df
+    :param str state_team_col: Team col of state
+    :return: df with the state cols attached (null before a team's first game of the season)
+    """
+    df = df.with_columns((pl.col("week") - 1).alias("_as_of_week")).sort("_as_of_week")
+    state = state.rename({"week": "_state_week"})
+    if state_team_col != team_col:
+        state = state.rename({state_team_col: team_col})
+    state = state.with_columns(pl.col("_state_week").cast(df.collect_schema()["_as_of_week"])).sort("_state_week")
+
+    df = df.join_asof(
+        state,
+        left_on="_as_of_week",
+        right_on="_state_week",
+        by=[team_col, "season"],
+        strategy="backward"
+    )
+    return df.drop(["_as_of_week", "_state_week"], strict=False)
@@ -0,0 +1,120 @@
+
+import time
+
+import numpy as np
+import polars as pl
+
+
+def lgb_train_params(model_params)->tuple[dict, int]:
+    """
+    :param dict model_params: LGBMRegressor keyword arguments
+    :return: (params for lightgbm.train(), number of boosting rounds)
+    """
+    params = dict(model_params)
+    num_boost_round = params.pop("n_estimators", 100)
+    return params, num_boost_round
+
+def regression_metrics(y_true, y_pred)->tuple[float, float]:
+    """
+    :param np.ndarray y_true: Actual outputs
+    :param np.ndarray y_pred: Predicted outputs
+    :return: (MAE, R²), R² is nan with fewer than 2 samples
+    """
+    errors = y_true - y_pred
+    mae = float(np.abs(errors).mean())
+    if len(y_true) < 2:
+        return mae, float("nan")
+    ss_tot = ((y_true - y_true.mean()) ** 2).sum()
+    r2 = float(1 - (errors ** 2).sum() / ss_tot) if ss_tot > 0 else float("nan")
+    return mae, r2
+
+def require_cols(df, cols, location, rebuild):
+    """
+    Training data-frames written by older builds lack the cols a backtest reads
+    :param pl.DataFrame df: Training data-frame read from location
+    :param list[str] cols: Cols the backtest reads
+    :param str location: Parquet file df was read from
+    :param str rebuild: Fn that writes the file with every col, named in the error
+    """
+    missing = [col for col in cols if col not in df.columns]
+    if missing:
+        raise ValueError(
+            f"{location} has no {', '.join(missing)} col(s), it was written by an older build. "
+            f"Rebuild it with {rebuild} before backtesting"
+        )
+
+def walk_forward_backtest(df, features, model_params, start_season, start_week=1,
+                          refresh_rounds=50, target="fantasy_points_ppr", id_cols=()):
+    """
+    Moves a cutoff through every (season, week) from (start_season, start_week). The model is fit
+    once on all games before the first cutoff, each week is then predicted with only earlier
+    data and the model is refreshed by continuing training from the previous Booster
+    (init_model) on the newly available week instead of refitting from scratch
+    :param pl.DataFrame df: Data-frame with 'season', 'week', target and features cols
+    :param list[str] features: Feature cols
+    :param dict model_params: LGBMRegressor keyword arguments (see training.model_params())
+    :param int start_season: Season of the first week predicted
+    :param int start_week: First week predicted in start_season
+    :param int refresh_rounds: Boosting rounds added on each newly available week
+    :param str target: Target col
+    :param id_cols: Cols copied to the out-of-sample predictions (player_id, position, ...)
+    :return: (df of per-week n/MAE/R²/predict and refresh wall time,
+    df of every out-of-sample prediction, the final Booster)
+    """
+    import lightgbm as lgb
+
+    params, num_boost_round = lgb_train_params(model_params)
+    df = df.filter(pl.col(target).is_not_null()).sort(["season", "week"])
+    cutoff = (pl.col("season") < start_season) | (
+        (pl.col("season") == start_season) & (pl.col("week") < start_week)
+    )
+
+    # Initial fit on everything before the first cutoff
+    history = df.filter(cutoff)
+    fit_start = time.perf_counter()
+    booster = lgb.train(
+        params,
+        lgb.Dataset(history.select(features).to_numpy(), label=history[target].to_numpy()),
+        num_boost_round=num_boost_round,
+        keep_training_booster=True
+    )
+    initial_fit_seconds = time.perf_counter() - fit_start
+
+    rows = []
+    predictions = []
+    for (season, week), games in df.filter(~cutoff).group_by(["season", "week"], maintain_order=True):
+        X = games.select(features).to_numpy()
+        y = games[target].to_numpy()
+
+        # Predicts the week with a model that has only seen earlier weeks
+        predict_start = time.perf_counter()
+        y_pred = booster.predict(X)
+        predict_seconds = time.perf_counter() - predict_start
+        mae, r2 = regression_metrics(y, y_pred)
+        predictions.append(
+            games.select(["season", "week", *id_cols, target]).with_columns(pl.Series("projection", y_pred))
+        )
+
+        # Continues training from the current Booster on the newly available week
+        refresh_start = time.perf_counter()
+        booster = lgb.train(
+            params,
+            lgb.Dataset(X, label=y),
+            num_boost_round=refresh_rounds,
+            init_model=booster,
+            keep_training_booster=True
+        )
+        refresh_seconds = time.perf_counter() - refresh_start
+
+        rows.append({
+            "season": season,
+            "week": week,
+            "n": len(y),
+            "mae": mae,
+            "r2": r2,
+            "predict_seconds": predict_seconds,
+            "refresh_seconds": refresh_seconds,
+        })
+
+    results = pl.DataFrame(rows).with_columns(pl.lit(initial_fit_seconds).alias("initial_fit_seconds"))
+    return results, pl.concat(predictions), booster
@@ -1,34 +1,44 @@
 
 import polars as pl
 
-def select_relevant_plays(plays, seasons, game_amt, start_week):
+from fantasy_football_projections.utils.game_index import game_sequence_index, games_before
+
+def select_relevant_plays(plays, seasons, game_amt, start_week, entity_col=None, index=None):
     """
-    Filters player_data from [start_week-game_amt, start_week-1]
+    Filters plays to each entity's last game_amt games before start_week of seasons[0],
+    reaching into previous seasons when needed (byes and season lengths are accounted for)
     :param pl.DataFrame plays: Player data to filter
     :param int[] seasons: That fall into range of games
     :param int game_amt: Amount of games
     :param start_week: Week that is being projected (not included in returned df)
+    :param str entity_col: Col identifying the player/team, None if plays belong to one entity
+    :param pl.DataFrame index: Precomputed game_index.game_sequence_index() for plays, built if None
     :return: Data frame with all play-by-play data in specified range
     """
     season = seasons[0]
 
-    # Creates list with range of relevant weeks of season
-    end_week = max(1, start_week - game_amt)
-    week_range = list(range(start_week - 1, end_week - 1, -1))
+    # A single entity is indexed under a constant key
+    if entity_col is None:
+        entity_col = "_entity"
+        plays = plays.with_columns(pl.lit(0).alias(entity_col))
+        index = None
+    if index is None:
+        index = game_sequence_index(plays, entity_col)
 
-    # Filters player_data by relevant games
-    relevant_player_data = plays.filter(
-        (pl.col("season") == season) &
-        (pl.col("week").is_in(week_range))
+    # Every entity is projected for the same game
+    targets = index.select(entity_col).unique().with_columns(
+        pl.lit(season).cast(index.schema["season"]).alias("season"),
+        pl.lit(start_week).cast(index.schema["week"]).alias("week")
+    )
+    window = games_before(index, targets, game_amt, entity_col).select(
+        entity_col,
+        pl.col("game_season").alias("season"),
+        pl.col("game_week").alias("week")
     )
 
-    # Gets data from previous season if necessary, concatenates results to relevant_player_data
-    if game_amt >= start_week:
-        leftover_games = abs(start_week - game_amt)
-        secondary_range = list(range(17, 17 - leftover_games, -1))
-        secondary_player_data = plays.filter(
-            (pl.col("season") == season - 1) &
-            (pl.col("week").is_in(secondary_range))
-        )
-        relevant_player_data = pl.concat([secondary_player_data, relevant_player_data])
+    # Keeps plays from games inside the window, ordered oldest to newest
+    relevant_player_data = plays.join(window, on=[entity_col, "season", "week"], how="semi")
+    relevant_player_data = relevant_player_data.sort(["season", "week"], maintain_order=True)
+    if entity_col == "_entity":
+        relevant_player_data = relevant_player_data.drop(entity_col)
     return relevant_player_data
@@ -0,0 +1,120 @@
+
+from functools import lru_cache
+
+import numpy as np
+import polars as pl
+
+from fantasy_football_projections.data_loading.player_data import load_player_stats
+from fantasy_football_projections.data_loading.schedule_data import load_schedule_data
+
+
+# Weeks per season in a packed (season, week) key, leaves room for playoff weeks
+_WEEK_SPAN = 100
+# Packed (season, week) keys per entity in the searched key array
+_ENTITY_SPAN = 10_000 * _WEEK_SPAN
+
+
+def game_sequence_index(games, entity_col)->pl.DataFrame:
+    """
+    Gives every game of every entity an ordinal that runs across seasons, so byes,
+    18 week seasons, playoffs and season boundaries need no special handling
+    :param pl.DataFrame games: Any df with entity_col, 'season' and 'week' (plays, weekly stats, ...)
+    :param str entity_col: Col identifying the team or player
+    :return: Df of (entity_col, season, week, game_seq) sorted by entity then game
+    """
+    index = (
+        games.select(entity_col, "season", "week")
+        .filter(pl.col(entity_col).is_not_null())
+        .unique()
+        .sort([entity_col, "season", "week"])
+    )
+    index = index.with_columns(
+        pl.int_range(pl.len(), dtype=pl.UInt32).over(entity_col).alias("game_seq")
+    )
+    return index
+
+@lru_cache(maxsize=None)
+def team_game_index(*seasons)->pl.DataFrame:
+    """
+    :param seasons: Seasons to index, regular season and playoffs
+    :return: Df of (team, season, week, game_seq) for every game a team played
+    """
+    schedule = load_schedule_data(*seasons)
+    games = pl.concat([
+        schedule.select(pl.col("home_team").alias("team"), "season", "week"),
+        schedule.select(pl.col("away_team").alias("team"), "season", "week"),
+    ])
+    return game_sequence_index(games, "team")
+
+@lru_cache(maxsize=None)
+def player_game_index(*seasons)->pl.DataFrame:
+    """
+    :param seasons: Seasons to index
+    :return: Df of (player_id, season, week, game_seq) for every game a player recorded stats
+    """
+    return game_sequence_index(load_player_stats(*seasons), "player_id")
+
+def games_before(index, targets, game_amt, entity_col)->pl.DataFrame:
+    """
+    Finds each target's last game_amt games strictly before (season, week) with a binary
+    search on the index, every entity and target is resolved in one vectorized pass
+    :param pl.DataFrame index: Index from game_sequence_index() (or team/player_game_index())
+    :param pl.DataFrame targets: Df with entity_col, 'season' and 'week' of the games being projected
+    :param int game_amt: Amount of prior games wanted
+    :param str entity_col: Col identifying the team or player
+    :return: Df with one row per (target, prior game): entity_col, season, week, game_season,
+    game_week, game_seq
+    """
+    # Dense entity codes so every entity owns a disjoint range of packed keys
+    entities = index.select(entity_col).unique(maintain_order=True).with_columns(
+        pl.int_range(pl.len(), dtype=pl.Int64).alias("_entity_code")
+    )
+    index = index.join(entities, on=entity_col, how="left").sort(["_entity_code", "season", "week"])
+    keys = (
+        index["_entity_code"] * _ENTITY_SPAN +
+        index["season"].cast(pl.Int64) * _WEEK_SPAN +
+        index["week"].cast(pl.Int64)
+    ).to_numpy()
+
+    targets = targets.select(entity_col, "season", "week").join(entities, on=entity_col, how="inner")
+    codes = targets["_entity_code"].to_numpy()
+    target_keys = (
+        codes * _ENTITY_SPAN +
+        targets["season"].cast(pl.Int64).to_numpy() * _WEEK_SPAN +
+        targets["week"].cast(pl.Int64).to_numpy()
+    )
+
+    # [first, stop) is the range of the entity's games before the target
+    stop = np.searchsorted(keys, target_keys, side="left")
+    entity_start = np.searchsorted(keys, codes * _ENTITY_SPAN, side="left")
+    first = np.maximum(stop - game_amt, entity_start)
+
+    # Expands every range to its rows without a python loop
+    lengths = stop - first
+    target_rows = np.repeat(np.arange(len(targets)), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    game_rows = np.repeat(first, lengths) + offsets
+
+    window = targets.drop("_entity_code")[target_rows]
+    games = index[game_rows].select(
+        pl.col("season").alias("game_season"),
+        pl.col("week").alias("game_week"),
+        "game_seq"
+    )
+    return pl.concat([window, games], how="horizontal")
+
+def lookback_seasons(index, game_amt, seasons, entity_col)->int:
+    """
+    ex. game_amt=6, a player's first game of 2024 reads their last 6 games, which start in
+    2022 when they played 4 games in 2023: 2
+    :param pl.DataFrame index: Index from game_sequence_index()
+    :param int game_amt: Games before each game that are read, None for every earlier game
+    :param int[] seasons: Seasons whose games read the prior games
+    :param str entity_col: Col identifying the team or player
+    :return: Most earlier seasons the prior games of any game of seasons reach into
+    """
+    targets = index.filter(pl.col("season").is_in(list(seasons)))
+    window = games_before(index, targets, index.height if game_amt is None else game_amt, entity_col)
+    if window.is_empty():
+        return 0
+    return int((window["season"].cast(pl.Int64) - window["game_season"].cast(pl.Int64)).max())
@@ -0,0 +1,234 @@
+
+import heapq
+import time
+
+import numpy as np
+import polars as pl
+
+
+# Default roster, positions mapped to required starters
+DEFAULT_ROSTER = {"RB": 2, "WR": 3, "TE": 1}
+DEFAULT_FLEX = 1
+FLEX_POSITIONS = ("RB", "WR", "TE")
+SALARY_CAP = 50_000
+
+
+def _roster_limits(roster, flex, flex_positions)->dict[str, tuple[int, int]]:
+    """
+    :return: {position: (min players, max players)} in a lineup
+    """
+    positions = set(roster) | set(flex_positions if flex else ())
+    return {
+        p: (roster.get(p, 0), roster.get(p, 0) + (flex if p in flex_positions else 0))
+        for p in positions
+    }
+
+def _prune_dominated(df, limits, k)->pl.DataFrame:
+    """
+    Drops players that can never be in a top-k lineup: those with at least max_players + k - 1
+    players of the same position that are no more expensive and project at least as high
+    :param pl.DataFrame df: Candidate players
+    :return: df without dominated players
+    """
+    keep = []
+    for (position,), group in df.group_by(["position"], maintain_order=True):
+        salary = group["salary"].to_numpy()
+        projection = group["projection"].to_numpy()
+        dominates = (
+            (salary[:, None] <= salary[None, :]) & (projection[:, None] >= projection[None, :]) &
+            ((salary[:, None] < salary[None, :]) | (projection[:, None] > projection[None, :]))
+        )
+        allowed = limits[position][1] + k - 1
+        keep.append(group.filter(pl.Series(dominates.sum(axis=0) < allowed)))
+    return pl.concat(keep)
+
+def _lagrangian_bound(values, salaries, position_idx, limits, flex, salary_cap, multiplier)->float:
+    """
+    :return: Upper bound on any lineup's projection when salary is priced at multiplier per dollar
+    """
+    adjusted = values - multiplier * salaries
+    total = multiplier * salary_cap
+    extras = []
+    for p, (lo, hi) in enumerate(limits):
+        ranked = np.sort(adjusted[position_idx == p])[::-1]
+        if len(ranked) < lo:
+            return -np.inf
+        total += ranked[:lo].sum()
+        extras.append(ranked[lo:hi])
+    extras = np.sort(np.concatenate(extras))[::-1] if extras else np.array([])
+    if len(extras) < flex:
+        return -np.inf
+    return total + extras[:flex].sum()
+
+def _best_multiplier(values, salaries, position_idx, limits, flex, salary_cap)->float:
+    """
+    :return: Salary price minimizing the lagrangian bound (ternary search, the bound is convex)
+    """
+    lo, hi = 0.0, float((values / np.maximum(salaries, 1)).max())
+    for _ in range(60):
+        m1 = lo + (hi - lo) / 3
+        m2 = hi - (hi - lo) / 3
+        if (_lagrangian_bound(values, salaries, position_idx, limits, flex, salary_cap, m1) <=
+                _lagrangian_bound(values, salaries, position_idx, limits, flex, salary_cap, m2)):
+            hi = m2
+        else:
+            lo = m1
+    return (lo + hi) / 2
+
+def optimize_lineups(projections, roster=None, flex=DEFAULT_FLEX, flex_positions=FLEX_POSITIONS,
+                     salary_cap=SALARY_CAP, k=1)->pl.DataFrame:
+    """
+    Exact branch-and-bound search for the k highest projected distinct lineups. Nodes are bounded
+    by a lagrangian relaxation of the salary cap solved over the remaining roster slots, and
+    dominated players are pruned before the search
+    :param pl.DataFrame projections: Df with 'player_id', 'position', 'salary' and 'projection'
+    :param dict roster: {position: starters}, DEFAULT_ROSTER if None
+    :param int flex: Flex slots
+    :param flex_positions: Positions that can fill a flex slot
+    :param int salary_cap: Max total salary
+    :param int k: Amount of lineups returned
+    :return: Df of the lineups' players with 'lineup' (1 is the best) and 'lineup_projection',
+    empty if no lineup fits the constraints
+    """
+    roster = DEFAULT_ROSTER if roster is None else roster
+    limits = _roster_limits(roster, flex, flex_positions)
+    slots = sum(roster.values()) + flex
+
+    df = projections.filter(pl.col("position").is_in(list(limits)) & pl.col("projection").is_not_null())
+    df = _prune_dominated(df, limits, k)
+
+    positions = sorted(limits)
+    position_idx = df["position"].replace_strict(positions, list(range(len(positions))), return_dtype=pl.Int64).to_numpy()
+    values = df["projection"].to_numpy().astype(np.float64)
+    salaries = df["salary"].to_numpy().astype(np.float64)
+    mins = [limits[p][0] for p in positions]
+    maxs = [limits[p][1] for p in positions]
+    flexible = [p in flex_positions for p in positions]
+
+    # Players are searched in order of their salary adjusted value
+    multiplier = float(_best_multiplier(values, salaries, position_idx, list(zip(mins, maxs)), flex, salary_cap))
+    adjusted = values - multiplier * salaries
+    order = np.argsort(-adjusted, kind="stable")
+    df, position_idx, values, salaries, adjusted = (
+        df[order], position_idx[order], values[order], salaries[order], adjusted[order]
+    )
+    n = len(values)
+
+    # Each position's adjusted values in search order, with prefix sums and the amount
+    # of the position's players that come before every search index
+    # (python lists, the search reads single elements far more often than it reads arrays)
+    lists = [adjusted[position_idx == p] for p in range(len(positions))]
+    prefix = [np.concatenate([[0.0], np.cumsum(lst)]).tolist() for lst in lists]
+    before = [np.concatenate([[0], np.cumsum(position_idx == p)]).tolist() for p in range(len(positions))]
+    lists = [lst.tolist() for lst in lists]
+    position_idx, values, salaries = position_idx.tolist(), values.tolist(), salaries.tolist()
+
+    def bound(i, counts, salary):
+        # Best adjusted value of the remaining slots from players i.., plus the priced salary left
+        total = multiplier * (salary_cap - salary)
+        free = slots - sum(counts)
+        heads = []
+        for p in range(len(positions)):
+            start = before[p][i]
+            need = max(0, mins[p] - counts[p])
+            if start + need > len(lists[p]):
+                return -float("inf")
+            total += prefix[p][start + need] - prefix[p][start]
+            free -= need
+            heads.append([start + need, maxs[p] - max(counts[p], mins[p])])
+        for _ in range(free):
+            best = None
+            for p, (head, room) in enumerate(heads):
+                if flexible[p] and room > 0 and head < len(lists[p]):
+                    if best is None or lists[p][head] > lists[best][heads[best][0]]:
+                        best = p
+            if best is None:
+                return -float("inf")
+            total += lists[best][heads[best][0]]
+            heads[best][0] += 1
+            heads[best][1] -= 1
+        return total
+
+    best_lineups = []  # min-heap of (projection, lineup indices)
+    counts = [0] * len(positions)
+    chosen = []
+
+    # Depth first search with an explicit stack (a recursion would be as deep as the slate),
+    # entries are (player index, salary, value) nodes or (player index, None, None) to undo
+    # taking that player once its subtree is searched
+    stack = [(0, 0.0, 0.0)]
+    while stack:
+        i, salary, value = stack.pop()
+        if salary is None:
+            chosen.pop()
+            counts[position_idx[i]] -= 1
+            continue
+        if len(chosen) == slots:
+            entry = (value, tuple(chosen))
+            if len(best_lineups) < k:
+                heapq.heappush(best_lineups, entry)
+            elif value > best_lineups[0][0]:
+                heapq.heapreplace(best_lineups, entry)
+            continue
+        if i == n:
+            continue
+        threshold = best_lineups[0][0] if len(best_lineups) == k else -float("inf")
+        if value + bound(i, counts, salary) <= threshold + 1e-9:
+            continue
+
+        # Branch including player i, then excluding it (past its starters a player takes a flex slot)
+        stack.append((i + 1, salary, value))
+        p = position_idx[i]
+        flex_used = sum(max(0, c - lo) for c, lo in zip(counts, mins))
+        fits_roster = counts[p] < mins[p] or (flexible[p] and flex_used < flex)
+        if fits_roster and salary + salaries[i] <= salary_cap:
+            counts[p] += 1
+            chosen.append(i)
+            stack.append((i, None, None))
+            stack.append((i + 1, salary + salaries[i], value + values[i]))
+
+    lineups = []
+    for rank, (value, indices) in enumerate(sorted(best_lineups, reverse=True), start=1):
+        lineups.append(df[list(indices)].with_columns(
+            pl.lit(rank).alias("lineup"),
+            pl.lit(value).alias("lineup_projection")
+        ))
+    if not lineups:
+        return df.clear().with_columns(pl.lit(0).alias("lineup"), pl.lit(0.0).alias("lineup_projection"))
+    return pl.concat(lineups).sort(["lineup", "position", "projection"], descending=[False, False, True])
+
+def random_slate(n_players=300, seed=0)->pl.DataFrame:
+    """
+    :param int n_players: Players in the slate
+    :param int seed: Random seed
+    :return: Synthetic projections df with dfs-like salaries
+    """
+    rng = np.random.default_rng(seed)
+    position = rng.choice(["RB", "WR", "TE"], size=n_players, p=[0.35, 0.5, 0.15])
+    projection = rng.gamma(2.0, 4.5, size=n_players)
+    salary = np.clip(3000 + projection * 330 + rng.normal(0, 700, size=n_players), 3000, 10000)
+    return pl.DataFrame({
+        "player_id": [f"P{i}" for i in range(n_players)],
+        "position": position,
+        "salary": (salary // 100 * 100).astype(np.int64),
+        "projection": projection,
+    })
+
+def benchmark(slate_sizes=(100, 200, 300, 500), ks=(1, 20), repeats=3, seed=0,
+              large_slates=((1500, 100),))->pl.DataFrame:
+    """
+    Times optimize_lineups() on synthetic slates
+    :param large_slates: Extra (slate size, k) cases, ex. a full main slate with many lineups
+    :return: Df of slate size, k and best/mean wall time in milliseconds
+    """
+    cases = [(n_players, k) for n_players in slate_sizes for k in ks] + list(large_slates)
+    rows = []
+    for n_players, k in cases:
+        slate = random_slate(n_players, seed)
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            optimize_lineups(slate, k=k)
+            times.append((time.perf_counter() - start) * 1000)
+        rows.append({"players": n_players, "k": k, "best_ms": min(times), "mean_ms": sum(times) / len(times)})
+    return pl.DataFrame(rows)
@@ -1,8 +1,15 @@
 
-from sklearn.metrics import r2_score, mean_absolute_error
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import os
+import re
+
+import numpy as np
+import polars as pl
+
+from fantasy_football_projections.utils.backtesting import regression_metrics
+
+
+# Window suffix of averaged features, ex. "receiving_yards_3g_avg" -> "receiving_yards"
+WINDOW_SUFFIX = re.compile(r"_(\d+g_avg|season_avg)$")
 
 def training_metrics(y_test, y_pred):
     """
@@ -11,11 +18,78 @@ def training_metrics(y_test, y_pred):
     :param y_pred: Test outputs
     :return:
     """
-    print("R²:", r2_score(y_test, y_pred))
-    print("MAE:", mean_absolute_error(y_test, y_pred))
+    mae, r2 = regression_metrics(y_test, y_pred)
+    print("R²:", r2)
+    print("MAE:", mae)
+
+def base_feature(feature)->str:
+    """
+    :param str feature: Feature name, ex. "receiving_yards_3g_avg"
+    :return: The feature without its window suffix, ex. "receiving_yards"
+    """
+    return WINDOW_SUFFIX.sub("", feature)
+
+def explain(model, X, keys=None, top_k=None)->pl.DataFrame:
+    """
+    Explains every row of a feature matrix with one batched pred_contrib call, the
+    contributions of a stat's window variants (3g, 6g, season) are summed into the stat
+    :param model: Booster or fitted LGBMRegressor
+    :param pl.DataFrame | pd.DataFrame X: Feature matrix with (at least) the model's features
+    :param pl.DataFrame keys: Cols identifying each row of X (player_id, week, ...), a 'row' index if None
+    :param int top_k: Stats kept per row by absolute contribution, None keeps every stat
+    :return: Long df of keys, 'feature' and 'contribution' (float32). A row's 'expected_value'
+    plus all of its contributions is its prediction
+    """
+    booster = getattr(model, "booster_", model)
+    names = booster.feature_name()
+    matrix = X.select(names).to_numpy() if isinstance(X, pl.DataFrame) else X[names].to_numpy()
+
+    # (rows, features + 1), the last col is the expected value
+    contrib = booster.predict(matrix, pred_contrib=True)
+
+    # Sums window variants with a (features, stats) indicator matrix
+    bases = [base_feature(name) for name in names]
+    stats = list(dict.fromkeys(bases))
+    indicator = np.zeros((len(names), len(stats)), dtype=contrib.dtype)
+    indicator[np.arange(len(names)), [stats.index(base) for base in bases]] = 1
+    by_stat = np.hstack([contrib[:, :-1] @ indicator, contrib[:, -1:]]).astype(np.float32)
+    stats.append("expected_value")
+
+    # Stat cols kept per row, largest absolute contributions first, expected value last
+    row_amt = len(matrix)
+    if top_k is not None and top_k < len(stats) - 1:
+        cols = np.argsort(-np.abs(by_stat[:, :-1]), axis=1)[:, :top_k]
+    else:
+        cols = np.tile(np.arange(len(stats) - 1), (row_amt, 1))
+    cols = np.hstack([cols, np.full((row_amt, 1), len(stats) - 1)])
+    rows = np.repeat(np.arange(row_amt), cols.shape[1])
+
+    if keys is None:
+        keys = pl.DataFrame({"row": np.arange(row_amt, dtype=np.uint32)})
+    return keys[rows].with_columns(
+        pl.Series("feature", np.array(stats)[cols.ravel()], dtype=pl.Categorical),
+        pl.Series("contribution", by_stat[rows, cols.ravel()]),
+    )
 
-# Shows visuals of training data
-def visualize_training(y_test, y_pred, X_train, model):
+# Shows visuals of training data, saved as png files instead when output_dir is given
+def visualize_training(y_test, y_pred, X_train, model, output_dir=None):
+    # Plotting libraries are only imported when visuals are shown
+    import pandas as pd
+    import matplotlib
+
+    # Headless backend, figures are written to files and never block
+    if output_dir is not None:
+        matplotlib.use("Agg")
+        os.makedirs(output_dir, exist_ok=True)
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    def finish(name):
+        if output_dir is None:
+            plt.show()
+        else:
+            plt.savefig(os.path.join(output_dir, f"{name}.png"), bbox_inches="tight")
+            plt.close()
 
     # Predictions vs Actual scores
     plt.figure(figsize=(6, 6))
@@ -24,7 +98,7 @@ def visualize_training(y_test, y_pred, X_train, model):
     plt.xlabel("Actual Fantasy Points")
     plt.ylabel("Predicted Fantasy Points")
     plt.title("Model Predictions vs Actual")
-    plt.show()
+    finish("predictions")
 
     # After training your LightGBM model
     feature_names = X_train.columns
@@ -40,4 +114,18 @@ def visualize_training(y_test, y_pred, X_train, model):
     plt.figure(figsize=(10, 6))
     sns.barplot(x="importance", y="feature", data=feat_imp_df, palette="viridis")
     plt.title("Feature Importance")
-    plt.show()
+    finish("feature_importance")
+
+    # Mean absolute contribution of each stat (window variants summed)
+    contrib_df = (
+        explain(model, X_train)
+        .filter(pl.col("feature") != "expected_value")
+        .group_by(pl.col("feature").cast(pl.String))
+        .agg(pl.col("contribution").abs().mean())
+        .sort("contribution", descending=True)
+        .to_pandas()
+    )
+    plt.figure(figsize=(10, 6))
+    sns.barplot(x="contribution", y="feature", data=contrib_df, palette="viridis")
+    plt.title("Mean Absolute Contribution")
+    finish("contributions")
@@ -0,0 +1,205 @@
+
+import json
+import os
+import time
+import warnings
+
+import numpy as np
+import polars as pl
+
+from fantasy_football_projections.data_loading.load_models import model_hash, save_booster
+from fantasy_football_projections.utils.backtesting import lgb_train_params, regression_metrics
+
+
+# Shallow student trained on the full model's predictions
+DISTILL_PARAMS = {
+    "objective": "regression",
+    "learning_rate": 0.05,
+    "num_leaves": 15,
+    "max_depth": 4,
+    "n_estimators": 300,
+    "min_child_samples": 20,
+    "verbosity": -1,
+}
+
+# Fractions of the full model's trees evaluated on the validation curve
+TRUNCATION_FRACTIONS = (0.05, 0.1, 0.15, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+# Batch sizes latency is measured at, 1 is a single player and 256 a slate
+LATENCY_BATCH_SIZES = (1, 256)
+
+# Relative MAE increase allowed for a compressed variant, truncating and saving use the same bound
+DEFAULT_TOLERANCE = 0.05
+
+
+def truncation_curve(booster, X_val, y_val, fractions=TRUNCATION_FRACTIONS)->pl.DataFrame:
+    """
+    :param lightgbm.Booster booster: Full model
+    :param np.ndarray X_val: Validation features
+    :param np.ndarray y_val: Validation targets
+    :param fractions: Fractions of the trees evaluated
+    :return: df of 'trees', 'mae' and 'r2' when only the first trees are used
+    """
+    total = booster.num_trees()
+    rows = []
+    for trees in sorted({max(1, round(total * fraction)) for fraction in fractions}):
+        mae, r2 = regression_metrics(y_val, booster.predict(X_val, num_iteration=trees))
+        rows.append({"trees": trees, "mae": mae, "r2": r2})
+    return pl.DataFrame(rows)
+
+def truncate(booster, trees):
+    """
+    :param lightgbm.Booster booster: Full model
+    :param int trees: Trees kept
+    :return: Booster of the first trees only
+    """
+    import lightgbm as lgb
+
+    return lgb.Booster(model_str=booster.model_to_string(num_iteration=trees))
+
+def distill(booster, X_train, params=None):
+    """
+    Fits a shallow ensemble to the full model's predictions on the training features
+    :param lightgbm.Booster booster: Full model (the teacher)
+    :param np.ndarray X_train: Training features
+    :param dict params: LGBMRegressor keyword arguments of the student, DISTILL_PARAMS if None
+    :return: Student Booster
+    """
+    import lightgbm as lgb
+
+    params, num_boost_round = lgb_train_params(params or DISTILL_PARAMS)
+    dataset = lgb.Dataset(X_train, label=booster.predict(X_train), feature_name=booster.feature_name())
+    return lgb.train(params, dataset, num_boost_round=num_boost_round)
+
+def measure_latency(booster, X, batch_sizes=LATENCY_BATCH_SIZES, repeats=20)->dict[str, float]:
+    """
+    :param lightgbm.Booster booster: Model to time
+    :param np.ndarray X: Rows predicted (repeated up to the largest batch size)
+    :param batch_sizes: Rows per predict call
+    :param int repeats: Calls timed per batch size, the median is reported
+    :return: {"latency_ms_{n}": median ms per call, "load_ms": ms to parse the model, "size_bytes": model size}
+    """
+    import lightgbm as lgb
+
+    rows = np.resize(X, (max(batch_sizes), X.shape[1]))
+    timings = {}
+    for batch_size in batch_sizes:
+        batch = rows[:batch_size]
+        calls = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            booster.predict(batch)
+            calls.append(time.perf_counter() - start)
+        timings[f"latency_ms_{batch_size}"] = float(np.median(calls)) * 1000
+
+    model_str = booster.model_to_string()
+    start = time.perf_counter()
+    lgb.Booster(model_str=model_str)
+    timings["load_ms"] = (time.perf_counter() - start) * 1000
+    timings["size_bytes"] = len(model_str.encode())
+    return timings
+
+def compress(booster, X_train, X_val, y_val, tolerance=DEFAULT_TOLERANCE, distill_params=None):
+    """
+    Builds compressed variants of a model and reports their accuracy/latency tradeoff:
+    - "full": the model itself
+    - "truncated": the fewest trees whose validation MAE is within tolerance of the full model
+    - "distilled": a shallow student fit to the full model (distill())
+    :param lightgbm.Booster booster: Full model
+    :param np.ndarray X_train: Features the model was trained on
+    :param np.ndarray X_val: Held out features
+    :param np.ndarray y_val: Held out targets
+    :param float tolerance: Relative MAE increase allowed for the truncated variant
+    :param dict distill_params: Student params, DISTILL_PARAMS if None
+    :return: (dict of variant name to Booster, report df with a row per variant)
+    """
+    curve = truncation_curve(booster, X_val, y_val)
+    full_mae = curve["mae"][-1]
+    trees = curve.filter(pl.col("mae") <= full_mae * (1 + tolerance))["trees"].min()
+
+    variants = {
+        "full": booster,
+        "truncated": truncate(booster, trees),
+        "distilled": distill(booster, X_train, distill_params),
+    }
+
+    rows = []
+    for name, variant in variants.items():
+        mae, r2 = regression_metrics(y_val, variant.predict(X_val))
+        rows.append({
+            "variant": name,
+            "trees": variant.num_trees(),
+            "mae": mae,
+            "r2": r2,
+            "mae_increase": mae / full_mae - 1,
+            **measure_latency(variant, X_val),
+        })
+    return variants, pl.DataFrame(rows)
+
+def manifest_path(model_path)->str:
+    """
+    ex. "models/wr_model.txt" -> "models/wr_model.manifest.json"
+    """
+    return f"{os.path.splitext(model_path)[0]}.manifest.json"
+
+def variant_path(model_path, variant)->str:
+    """
+    ex. "models/wr_model.txt", "distilled" -> "models/wr_model.distilled.txt"
+    """
+    root, extension = os.path.splitext(model_path)
+    return model_path if variant == "full" else f"{root}.{variant}{extension}"
+
+def save_variants(variants, report, model_path, tolerance=DEFAULT_TOLERANCE)->str:
+    """
+    Saves the variants whose MAE is within tolerance of the full model next to it, with a
+    manifest of their metrics and the hash of the full model read by select_variant()
+    :param dict variants: From compress()
+    :param pl.DataFrame report: From compress()
+    :param str model_path: Path of the full model
+    :param float tolerance: Relative MAE increase allowed for a variant to be saved
+    :return: Path of the manifest
+    """
+    kept = report.filter((pl.col("variant") == "full") | (pl.col("mae_increase") <= tolerance))
+
+    entries = []
+    for row in kept.iter_rows(named=True):
+        path = variant_path(model_path, row["variant"])
+        if row["variant"] != "full":
+            save_booster(variants[row["variant"]], path)
+        entries.append({**row, "file": os.path.basename(path)})
+
+    path = manifest_path(model_path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump({"source_hash": model_hash(model_path), "variants": entries}, file, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+def select_variant(model_path, latency_budget_ms=None, batch_size=1)->str:
+    """
+    :param str model_path: Path of the full model
+    :param float latency_budget_ms: Max ms per predict call, None for the full model
+    :param int batch_size: Batch size the budget applies to (see LATENCY_BATCH_SIZES)
+    :return: Path of the most accurate saved variant within the budget, the fastest if none
+    is, the full model when there is no manifest or the variants were built from another model
+    """
+    path = manifest_path(model_path)
+    if latency_budget_ms is None or not os.path.exists(path):
+        return model_path
+
+    with open(path) as file:
+        manifest = json.load(file)
+
+    # Variants of a model that has since been retrained are never served
+    if manifest.get("source_hash") != model_hash(model_path):
+        warnings.warn(f"Compressed variants of {model_path} are stale, serving the full model")
+        return model_path
+    entries = manifest["variants"]
+    latency = f"latency_ms_{batch_size}"
+
+    within = [entry for entry in entries if entry[latency] <= latency_budget_ms]
+    if within:
+        entry = min(within, key=lambda e: e["mae"])
+    else:
+        entry = min(entries, key=lambda e: e[latency])
+    return os.path.join(os.path.dirname(model_path), entry["file"])
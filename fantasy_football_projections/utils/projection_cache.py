@@ -0,0 +1,224 @@
+
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import polars as pl
+
+from fantasy_football_projections.config import CURRENT_SEASON
+from fantasy_football_projections.data_loading.player_data import (
+    load_season_player_stats,
+    load_season_pbp_data,
+    load_snap_shares,
+    load_nextgen_wr_data,
+)
+from fantasy_football_projections.data_loading.schedule_data import load_season_schedule_index
+
+
+# Sources read by wr_modeling.project.prepare_wr_metrics()
+VERSIONED_SOURCES = {
+    "player_stats": load_season_player_stats,
+    "pbp": load_season_pbp_data,
+    "snap_shares": load_snap_shares,
+    "nextgen": load_nextgen_wr_data,
+    "schedule": load_season_schedule_index,
+}
+
+# Seconds the current season's loaded sources are used before data_version() reloads them,
+# None keeps them until refresh_season_data()
+CURRENT_SEASON_MAX_AGE = 15 * 60
+
+# Sentinel distinguishing a cached bye (None) from a miss
+_MISS = object()
+
+# Monotonic time each current season's sources were last (re)loaded
+_loaded_at = {}
+
+
+def refresh_season_data(season=CURRENT_SEASON):
+    """
+    Drops every in-process copy of the sources so the next load pulls them again. Loaders are
+    lru cached at every level (per season frames, the frames concatenated from them and the
+    frames derived from those), so every lru cached fn of the package is cleared
+    :param int season: Season whose defense cube is dropped and whose load time is reset
+    """
+    from fantasy_football_projections.pipeline.defense_cube import DEFENSE_CUBE
+
+    for name, module in list(sys.modules.items()):
+        if not name.startswith("fantasy_football_projections"):
+            continue
+        for value in list(vars(module).values()):
+            if getattr(value, "__module__", None) == name and callable(getattr(value, "cache_clear", None)):
+                value.cache_clear()
+    DEFENSE_CUBE.drop(season)
+    _loaded_at[season] = time.monotonic()
+
+def data_version(season)->str:
+    """
+    Stamp of the source data a season's projections were computed from. Completed seasons
+    never change (see data_loading.snapshots), the current season is stamped with the
+    rows and latest week of each loaded source so new games and plays change the stamp.
+    The stamp describes the frames projections read, which are cached in process, so the
+    sources are reloaded (refresh_season_data()) once they are CURRENT_SEASON_MAX_AGE old
+    :param int season: Season projected
+    :return: Version string
+    """
+    if season < CURRENT_SEASON:
+        return f"{season}-final"
+
+    loaded_at = _loaded_at.setdefault(season, time.monotonic())
+    if CURRENT_SEASON_MAX_AGE is not None and time.monotonic() - loaded_at > CURRENT_SEASON_MAX_AGE:
+        refresh_season_data(season)
+
+    parts = []
+    for name, loader in VERSIONED_SOURCES.items():
+        df = loader(season)
+        last_week = df["week"].max() if "week" in df.columns and df.height else None
+        parts.append(f"{name}:{df.height}:{last_week}")
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()[:16]
+
+
+class ProjectionCache:
+    """
+    Size-bounded LRU cache of projections keyed by (player, season, week, model hash,
+    data version), a new model file or new source data make old entries unreachable and
+    they age out. An optional sqlite file is a second tier shared by processes and restarts
+    """
+    def __init__(self, maxsize=4096, path=None, disk_maxsize=100_000):
+        """
+        :param int maxsize: Entries kept in memory
+        :param str path: sqlite file of the disk tier, None for memory only
+        :param int disk_maxsize: Entries kept on disk
+        """
+        self.maxsize = maxsize
+        self.path = path
+        self.disk_maxsize = disk_maxsize
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+        if path is not None:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS projections (key TEXT PRIMARY KEY, value REAL, used REAL)"
+            )
+            # Eviction orders entries by last use
+            self._db.execute("CREATE INDEX IF NOT EXISTS projections_used ON projections (used)")
+            self._db.commit()
+
+    @staticmethod
+    def key(player_id, season, week, model_version, data_version)->tuple:
+        """
+        :param str model_version: load_models.model_hash() of the model projecting
+        :param str data_version: data_version() of season
+        :return: Cache key of a projection
+        """
+        return str(player_id), int(season), int(week), model_version, data_version
+
+    def _disk_get(self, key):
+        disk_key = "|".join(map(str, key))
+        row = self._db.execute("SELECT value FROM projections WHERE key = ?", (disk_key,)).fetchone()
+        if row is None:
+            return _MISS
+        self._db.execute("UPDATE projections SET used = ? WHERE key = ?", (time.time(), disk_key))
+        self._db.commit()
+        return row[0]
+
+    def _disk_put(self, key, value):
+        self._db.execute(
+            "INSERT OR REPLACE INTO projections VALUES (?, ?, ?)",
+            ("|".join(map(str, key)), value, time.time())
+        )
+        # Evicts the least recently used entries past disk_maxsize
+        self._db.execute(
+            "DELETE FROM projections WHERE key IN "
+            "(SELECT key FROM projections ORDER BY used DESC LIMIT -1 OFFSET ?)",
+            (self.disk_maxsize,)
+        )
+        self._db.commit()
+
+    def _memory_put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        """
+        :param tuple key: From key()
+        :return: The cached projection (None for a bye), _MISS if not cached
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            if self._db is not None:
+                value = self._disk_get(key)
+                if value is not _MISS:
+                    self._memory_put(key, value)
+                    self.disk_hits += 1
+                    return value
+            self.misses += 1
+            return _MISS
+
+    def put(self, key, value):
+        """
+        :param tuple key: From key()
+        :param float value: Projection, None for a bye
+        """
+        with self._lock:
+            self._memory_put(key, value)
+            if self._db is not None:
+                self._disk_put(key, value)
+
+    def get_or_compute(self, key, compute):
+        """
+        :param tuple key: From key()
+        :param compute: fn() returning the projection on a miss
+        :return: The cached or computed projection
+        """
+        value = self.get(key)
+        if value is _MISS:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """
+        Empties both tiers and resets the counters
+        """
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM projections")
+                self._db.commit()
+            self.hits = self.disk_hits = self.misses = 0
+
+    def stats(self)->pl.DataFrame:
+        """
+        :return: One row df of hit, disk hit and miss counts, the hit rate and tier sizes
+        """
+        with self._lock:
+            disk_size = self._db.execute("SELECT COUNT(*) FROM projections").fetchone()[0] if self._db else 0
+        lookups = self.hits + self.disk_hits + self.misses
+        return pl.DataFrame({
+            "hits": [self.hits],
+            "disk_hits": [self.disk_hits],
+            "misses": [self.misses],
+            "hit_rate": [(self.hits + self.disk_hits) / lookups if lookups else None],
+            "memory_size": [len(self._entries)],
+            "disk_size": [disk_size],
+        })
+
+
+# Shared by every projection in the process, memory only
+PROJECTION_CACHE = ProjectionCache()
@@ -0,0 +1,144 @@
+
+import numpy as np
+import polars as pl
+from scipy.special import ndtr
+
+
+# Projection band edges, residual distributions are learned separately for each band
+PROJECTION_BANDS = [5.0, 10.0, 15.0, 20.0]
+
+# Quantiles stored for every (position, band) residual distribution
+N_QUANTILES = 101
+
+# Lowest simulated points, tail residuals below a low projection would give negative totals
+# (only a rare lost fumble or interception scores below zero)
+POINTS_FLOOR = 0.0
+
+
+def projection_band(projection)->pl.Expr:
+    """
+    :param pl.Expr projection: Projected points
+    :return: Band index of each projection (0 to len(PROJECTION_BANDS))
+    """
+    band = pl.lit(0, dtype=pl.Int32)
+    for edge in PROJECTION_BANDS:
+        band = band + (projection >= edge).cast(pl.Int32)
+    return band
+
+def residual_distributions(predictions, target="fantasy_points_ppr", min_samples=30)->pl.DataFrame:
+    """
+    Learns residual (actual - projected) quantiles from out-of-sample errors, e.g. the predictions
+    returned by utils.backtesting.walk_forward_backtest()
+    :param pl.DataFrame predictions: Df with 'position', 'projection' and target cols
+    :param str target: Actual points col
+    :param int min_samples: Bands with fewer residuals use the position's pooled residuals
+    :return: Df of (position, band, n, quantiles) where quantiles is a list of N_QUANTILES residuals
+    """
+    probs = np.linspace(0, 1, N_QUANTILES)
+    df = predictions.filter(pl.col(target).is_not_null()).with_columns(
+        (pl.col(target) - pl.col("projection")).alias("residual"),
+        projection_band(pl.col("projection")).alias("band")
+    )
+
+    rows = []
+    for (position,), group in df.group_by(["position"], maintain_order=True):
+        pooled = group["residual"].to_numpy()
+        for band in range(len(PROJECTION_BANDS) + 1):
+            residuals = group.filter(pl.col("band") == band)["residual"].to_numpy()
+            if len(residuals) < min_samples:
+                residuals = pooled
+            rows.append({
+                "position": position,
+                "band": band,
+                "n": len(residuals),
+                "quantiles": np.quantile(residuals, probs).tolist(),
+            })
+    return pl.DataFrame(rows)
+
+def teammate_correlation(predictions, target="fantasy_points_ppr")->float:
+    """
+    Estimates how strongly teammates' errors move together in the same game
+    (intraclass correlation of standardized residuals within a team game)
+    :param pl.DataFrame predictions: Df with 'team', 'season', 'week', 'position', 'projection' and target cols
+    :param str target: Actual points col
+    :return: Correlation in [0, 1)
+    """
+    df = predictions.filter(pl.col(target).is_not_null()).with_columns(
+        (pl.col(target) - pl.col("projection")).alias("residual")
+    ).with_columns(
+        ((pl.col("residual") - pl.col("residual").mean()) / pl.col("residual").std())
+        .over("position").alias("z")
+    )
+
+    # sum over games of sum_{i != j} z_i * z_j = (sum z)^2 - sum z^2
+    games = df.group_by(["team", "season", "week"]).agg(
+        (pl.col("z").sum() ** 2 - (pl.col("z") ** 2).sum()).alias("cross"),
+        (pl.len() * (pl.len() - 1)).alias("pairs")
+    )
+    pairs = games["pairs"].sum()
+    if not pairs:
+        return 0.0
+    return float(np.clip(games["cross"].sum() / pairs, 0.0, 0.99))
+
+def simulate_slate(slate, distributions, n_sims=10_000, rho=0.0, seed=None, floor=POINTS_FLOOR)->np.ndarray:
+    """
+    Draws n_sims outcomes for every player of a slate at once. Residual quantiles of each player's
+    (position, projection band) are sampled through a gaussian copula where every player of a team
+    shares that team's game draw, weighted by rho
+    :param pl.DataFrame slate: Df with 'team', 'position' and 'projection' cols, one row per player
+    :param pl.DataFrame distributions: Residual distributions from residual_distributions()
+    :param int n_sims: Outcomes drawn per player
+    :param float rho: Teammate correlation, see teammate_correlation()
+    :param int seed: Random seed
+    :param float floor: Simulated points are clipped below at floor, None to keep every draw
+    :return: float32 array of shape (n_sims, len(slate)) of simulated points
+    """
+    rng = np.random.default_rng(seed)
+
+    # Maps every player to the row of its residual distribution
+    slate = slate.with_row_index("_row").with_columns(
+        projection_band(pl.col("projection")).alias("band")
+    )
+    table = distributions.with_row_index("_dist")
+    slate = slate.join(table.select("position", "band", "_dist"), on=["position", "band"], how="left").sort("_row")
+    if slate["_dist"].null_count():
+        missing = slate.filter(pl.col("_dist").is_null())["position"].unique().to_list()
+        raise ValueError(f"No residual distribution for positions: {missing}")
+
+    quantiles = np.array(table["quantiles"].to_list(), dtype=np.float32)
+    dist = slate["_dist"].to_numpy()
+    teams, team_idx = np.unique(slate["team"].to_numpy(), return_inverse=True)
+
+    # Shared team game draws + individual draws, mapped to uniforms
+    team_draws = rng.standard_normal((n_sims, len(teams)), dtype=np.float32)
+    player_draws = rng.standard_normal((n_sims, len(slate)), dtype=np.float32)
+    z = float(np.sqrt(rho)) * team_draws[:, team_idx] + float(np.sqrt(1 - rho)) * player_draws
+    u = ndtr(z)
+
+    # Linear interpolation into each player's residual quantiles
+    position = u * (N_QUANTILES - 1)
+    lower = np.minimum(position.astype(np.int32), N_QUANTILES - 2)
+    frac = position - lower.astype(np.float32)
+    lo_values = quantiles[dist, lower]
+    hi_values = quantiles[dist, lower + 1]
+    residuals = lo_values + frac * (hi_values - lo_values)
+
+    points = slate["projection"].to_numpy().astype(np.float32)[None, :] + residuals
+    if floor is not None:
+        np.maximum(points, np.float32(floor), out=points)
+    return points
+
+def summarize_simulations(slate, sims)->pl.DataFrame:
+    """
+    :param pl.DataFrame slate: The simulated slate
+    :param np.ndarray sims: Outcomes from simulate_slate()
+    :return: slate with mean, std, p10, p50 and p90 of each player's simulated points
+    """
+    p10, p50, p90 = np.percentile(sims, [10, 50, 90], axis=0)
+    return slate.with_columns(
+        pl.Series("sim_mean", sims.mean(axis=0)),
+        pl.Series("sim_std", sims.std(axis=0)),
+        pl.Series("sim_p10", p10),
+        pl.Series("sim_p50", p50),
+        pl.Series("sim_p90", p90),
+    )
@@ -0,0 +1,117 @@
+
+import importlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import polars as pl
+
+from fantasy_football_projections.config import TRAINABLE_POSITIONS
+from fantasy_football_projections.data_loading.load_models import RB_MODEL_PATH, WR_MODEL_PATH
+
+# Model file of a job without a path
+DEFAULT_MODEL_PATHS = {"WR": WR_MODEL_PATH, "RB": RB_MODEL_PATH}
+
+
+@dataclass(frozen=True)
+class TrainingJob:
+    """
+    One model fit run by run_training_jobs()
+    - position: Position whose training module fits the model, one of config.TRAINABLE_POSITIONS
+    - location: Parquet file of the training data-frame
+    - params: Overrides of the position's model_params()
+    - path: Model file, the position's default model file if None
+    """
+    position: str
+    location: str
+    params: dict = field(default_factory=dict)
+    path: str = None
+
+    def __post_init__(self):
+        if self.position not in TRAINABLE_POSITIONS:
+            raise ValueError(f"Position {self.position} can't be trained, use one of {TRAINABLE_POSITIONS}")
+
+    @property
+    def name(self)->str:
+        return f"{self.position}:{os.path.basename(self.location)}:{os.path.basename(self.target_path())}"
+
+    def target_path(self)->str:
+        """
+        :return: Model file the job writes
+        """
+        return os.path.abspath(self.path or DEFAULT_MODEL_PATHS[self.position])
+
+
+def core_sets(workers, cores=None)->list[list[int]]:
+    """
+    ex. workers=3, cores=[0..7]: [[0, 1, 2], [3, 4, 5], [6, 7]]
+    :param int workers: Concurrent fits
+    :param list[int] cores: Cores to share, the cores this process may run on if None
+    :return: A disjoint, non-empty list of cores per worker
+    """
+    if cores is None:
+        cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+    workers = max(1, min(workers, len(cores)))
+    return [cores[len(cores) * i // workers: len(cores) * (i + 1) // workers] for i in range(workers)]
+
+# Cores of the worker process, set once by _pin_worker()
+_WORKER_CORES = None
+
+def _pin_worker(queue):
+    """
+    Pool initializer, takes a core set no other worker holds and pins the process to it
+    """
+    global _WORKER_CORES
+    _WORKER_CORES = queue.get()
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, _WORKER_CORES)
+
+def _run_job(job):
+    """
+    Fits and saves one job's model with one LightGBM thread per core of the worker
+    :return: Report row of the job
+    """
+    training = importlib.import_module(f"fantasy_football_projections.{job.position.lower()}_modeling.training")
+    threads = len(_WORKER_CORES) if _WORKER_CORES else os.cpu_count()
+    params = {**training.model_params(n_jobs=threads), **job.params}
+
+    start = time.perf_counter()
+    training.train_and_save(job.location, params=params, path=job.path)
+    return {
+        "job": job.name,
+        "cores": ",".join(str(core) for core in _WORKER_CORES or []),
+        "threads": threads,
+        "seconds": time.perf_counter() - start,
+    }
+
+def run_training_jobs(jobs, max_workers=None, cores=None)->pl.DataFrame:
+    """
+    Runs fits concurrently, each worker process is pinned to a disjoint share of the cores and
+    LightGBM gets one thread per core of its share, so concurrent fits never compete for a
+    core. Models are saved atomically (load_models.save_booster())
+    :param list[TrainingJob] jobs: Fits to run, ex. every position x dataset x config of a nightly retrain
+    :param int max_workers: Concurrent fits, one per job (up to the core count) if None
+    :param list[int] cores: Cores to share, every available core if None
+    :return: df of each job's cores, threads and wall time, in job order
+    """
+    # Concurrent jobs writing one file would silently overwrite each other's model
+    paths = [job.target_path() for job in jobs]
+    duplicates = sorted({path for path in paths if paths.count(path) > 1})
+    if duplicates:
+        raise ValueError(f"Several jobs write the same model file, give each its own path: {duplicates}")
+
+    shares = core_sets(max_workers or len(jobs), cores)
+
+    # Workers are spawned, forking a process running polars or OpenMP threads can deadlock
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    for share in shares:
+        queue.put(share)
+
+    with ProcessPoolExecutor(
+        max_workers=len(shares), mp_context=context, initializer=_pin_worker, initargs=(queue,)
+    ) as pool:
+        rows = list(pool.map(_run_job, jobs))
+    return pl.DataFrame(rows)
@@ -0,0 +1,111 @@
+
+import numpy as np
+import polars as pl
+
+
+def segment_starts(df, group)->np.ndarray:
+    """
+    :param pl.DataFrame df: Data-frame sorted by group
+    :param list[str] group: Cols that partition the rows, ex. ["player_id", "season"]
+    :return: Bool array, True on the first row of every group
+    """
+    starts = df.select(
+        pl.any_horizontal([pl.col(col).ne_missing(pl.col(col).shift(1)) for col in group])
+    ).to_series().to_numpy().copy()
+    if len(starts):
+        starts[0] = True
+    return starts
+
+def segmented_window_means(values, starts, window_size=None, min_periods=1, shift=1)->np.ndarray:
+    """
+    Lagged rolling or cumulative means of many cols at once, never reading across a group
+    boundary. A single cumulative sum over the sorted rows gives every window as a difference
+    of two prefix sums. Non-finite values (NaN, inf) are missing, they are not counted towards a
+    mean or min_periods, so one can't poison the prefix sums of every later row
+    :param np.ndarray values: (rows, cols) values sorted by group then time
+    :param np.ndarray starts: Bool array of rows starting a group, see segment_starts()
+    :param int window_size: Rows averaged, None averages every row of the group so far
+    :param int min_periods: Values needed in a window for a mean, NaN otherwise
+    :param int shift: Rows the means are lagged by within a group, 1 excludes the current row
+    :return: (rows, cols) float64 means
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        return segmented_window_means(values[:, None], starts, window_size, min_periods, shift)[:, 0]
+    rows = values.shape[0]
+    index = np.arange(rows)
+
+    # Index of the first row of each row's group
+    group_start = np.maximum.accumulate(np.where(starts, index, 0)) if rows else index
+
+    # Prefix sums of values and of non-missing counts, with a leading zero row
+    valid = np.isfinite(values)
+    sums = np.zeros((rows + 1, values.shape[1]))
+    counts = np.zeros((rows + 1, values.shape[1]))
+    np.cumsum(np.where(valid, values, 0.0), axis=0, out=sums[1:])
+    np.cumsum(valid, axis=0, out=counts[1:])
+
+    # Each window is [low, row], clipped to the row's group
+    low = group_start if window_size is None else np.maximum(index - window_size + 1, group_start)
+    window_sums = sums[index + 1] - sums[low]
+    window_counts = counts[index + 1] - counts[low]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(window_counts >= max(min_periods, 1), window_sums / window_counts, np.nan)
+
+    if shift == 0:
+        return means
+    lagged = np.full_like(means, np.nan)
+    source = index - shift
+    within = source >= group_start
+    lagged[within] = means[source[within]]
+    return lagged
+
+def window_means(df, cols, windows, group, shift=1)->pl.DataFrame:
+    """
+    :param pl.DataFrame df: Data-frame sorted by group then time
+    :param list[str] cols: Cols to average
+    :param dict windows: {suffix: (window_size, min_periods)} where None averages over the whole group
+    :param list[str] group: Cols that partition the averages
+    :param int shift: 1 excludes the current game from its own averages
+    :return: df with f"{col}_{suffix}" added for every col and window (nulls where a mean is missing)
+    """
+    if not cols or not windows:
+        return df
+    starts = segment_starts(df, group)
+    values = df.select(pl.col(cols).cast(pl.Float64)).to_numpy()
+
+    averages = []
+    for suffix, window in windows.items():
+        window_size, min_periods = window if window is not None else (None, 1)
+        means = segmented_window_means(values, starts, window_size, min_periods, shift)
+        averages += [
+            pl.Series(f"{col}_{suffix}", means[:, i], nan_to_null=True) for i, col in enumerate(cols)
+        ]
+    return df.with_columns(averages)
+
+def window_lookback(windows, shift=1)->int | None:
+    """
+    ex. {"6g_avg": (6, 4)}, shift=1: 6 (the 6 games before a game)
+    :param dict windows: {suffix: (window_size, min_periods)} where None averages over the whole group
+    :param int shift: Rows the means are lagged by
+    :return: Rows before a row that its windows read, None when a window reads the whole group
+    """
+    if any(window is None for window in windows.values()):
+        return None
+    return max((window_size - 1 + shift for window_size, _ in windows.values()), default=0)
+
+def lazy_window_means(df, cols, windows, group, shift=1)->pl.LazyFrame:
+    """
+    window_means() as a step of a lazy query
+    :param pl.LazyFrame df: Lazy df sorted by group then time
+    :return: Lazy df with f"{col}_{suffix}" added for every col and window
+    """
+    schema = dict(df.collect_schema())
+    schema.update({f"{col}_{suffix}": pl.Float64 for suffix in windows for col in cols})
+    return df.map_batches(
+        lambda batch: window_means(batch, cols, windows, group, shift),
+        predicate_pushdown=False,
+        projection_pushdown=False,
+        slice_pushdown=False,
+        schema=schema,
+    )
@@ -51,11 +51,21 @@ def max_depth_of_target(season):
     m_dot = avgs["avg_depth_of_target"].max()
     return m_dot
 
-def select_wanted_cols(df):
+def select_wanted_cols(df, plan=None, id_cols=()):
+    """
+    :param pl.DataFrame df: Df with offensive and defensive averages
+    :param FeaturePlan plan: Plan whose averaged cols are kept, None keeps every average
+    :param id_cols: Identifying cols kept ahead of the averages, ex. TRAINING_ID_COLS
+    :return: df of id_cols, season, week, fantasy_points_ppr and the averages
+    """
+    # Isolates only relevant stat columns
+    cols_wanted = [*id_cols, "season", "week", "fantasy_points_ppr"]
+    if plan is not None:
+        df = df.select(cols_wanted + plan.window_cols())
+        return df
+
     stat_cols = get_stat_cols()
     def_cols = get_defense_cols()
-    # Isolates only relevant stat columns
-    cols_wanted = ["season", "fantasy_points_ppr"]
     for window in ["3g_avg", "6g_avg", "season_avg"]:
         cols_wanted += [f"{col}_{window}" for col in stat_cols]
     for window in ["6g_avg", "season_avg"]:
@@ -2,57 +2,60 @@ from fantasy_football_projections.data_loading.player_data import load_player_da
 from fantasy_football_projections.data_loading.team_data import load_team_def_pbp_data
 import polars as pl
 
+from fantasy_football_projections.pipeline.defense_cube import DEFENSE_CUBE
+from fantasy_football_projections.pipeline.position_specs import WR_SPEC
+
+from fantasy_football_projections.utils.window_kernel import window_means
 from fantasy_football_projections.wr_modeling.utility import get_defense_cols
 
+# (window_size, min_periods) of each window, None averages over the whole season
+DEFENSE_WINDOW_SIZES = {"6g_avg": (6, 1), "season_avg": None}
+
 
 def group_defensive_stats(df)->pl.DataFrame:
     """
     :param pl.DataFrame df: Player weekly stats data-frame
-    :return: Data-frame where each teams defensive totals allowed are aggregated
+    :return: Data-frame where each teams defensive totals allowed are aggregated, with the
+    aggregations of the wr team-defense cube (pipeline.defense_cube)
     """
-    df = df.group_by(["opponent_team", "week", "season"]).agg(
-        pl.col("targets").sum().alias("targets_against"),
-        pl.col("receptions").sum().alias("receptions_against"),
-        pl.col("receiving_yards").sum().alias("receiving_yards_against"),
-        pl.col("receiving_tds").sum().alias("receiving_tds_against"),
-        pl.col("receiving_epa").sum().alias("receiving_epa_against"),
-        pl.col("racr").sum().alias("racr_against")
+    return df.group_by(["opponent_team", "week", "season"]).agg(
+        [agg.alias(name) for name, agg in WR_SPEC.defense_stat_aggs.items()]
     )
 
-    return df
-
-def generate_defensive_averages(defense_df, training=True)->pl.DataFrame:
+def generate_defensive_averages(defense_df, training=True, windows=None)->pl.DataFrame:
     """
     :param pl.DataFrame defense_df: Data-frame containing cols seen in def_cols (within this method)
     :param bool training: True if averages are for training, False otherwise (True means most
     recent game will not be included in averages)
+    :param windows: ((window, cols), ...) to compute, ex. FeaturePlan.defense, None for every defense
+    col in every window
     :return: Data-frame of average stat against over 6 weeks, and season
     """
+    shift = 1 if training else 0
     defense_df = defense_df.sort(["opponent_team", "season", "week"])
 
     def_cols = get_defense_cols()
+    windows = dict(windows) if windows is not None else {window: def_cols for window in ["6g_avg", "season_avg"]}
 
     defense_df = defense_df.fill_null(0)
 
-    # Rolling defense average over 6 games
-    for col in def_cols:
-        defense_df = defense_df.with_columns(
-            pl.col(col)
-            .rolling_mean(window_size=6, min_periods=1)
-            .over(["opponent_team", "season"])
-            .shift(1)
-            .alias(f"{col}_6g_avg")
+    # Rolling defense average over 6 games and over the whole season, every col of a window in one pass
+    for window, cols in windows.items():
+        defense_df = window_means(
+            defense_df, list(cols), {window: DEFENSE_WINDOW_SIZES[window]}, ["opponent_team", "season"], shift
         )
 
-    # Defense average's over whole season
-    for col in def_cols:
-        defense_df = defense_df.with_columns(
-            (
-                    pl.col(col).cum_sum().over(["opponent_team", "season"])
-                    / pl.col("week").cum_count().over(["opponent_team", "season"])
-            )
-            .shift(1)
-            .alias(f"{col}_season_avg")
-        )
+    return defense_df
 
-    return defense_df
\ No newline at end of file
+def point_in_time_defense_features(season, windows=None)->pl.DataFrame:
+    """
+    Defensive state of every team after each of its games in season, attach it to games
+    with utils.as_of.attach_as_of() so only games strictly before the projected one are used
+    :param int season: Season to compute defensive states for
+    :param windows: ((window, cols), ...) to compute, ex. FeaturePlan.defense, None for all
+    :return: Data-frame of (opponent_team, season, week) and the 6 game and season averages
+    including that week, read from the team-defense cube
+    """
+    if windows is None:
+        windows = [(window, get_defense_cols()) for window in ["6g_avg", "season_avg"]]
+    return DEFENSE_CUBE.averages("WR", [season], windows)
\ No newline at end of file
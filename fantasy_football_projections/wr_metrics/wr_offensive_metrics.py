@@ -1,22 +1,27 @@
 
 from functools import lru_cache
 import polars as pl
-import nflreadpy as nfl
 
+from fantasy_football_projections.data_loading.player_data import load_ff_playerids
+from fantasy_football_projections.utils.window_kernel import window_means
 from fantasy_football_projections.wr_modeling.utility import get_stat_cols
 
+# (window_size, min_periods) of each window, None averages over the whole season
+OFFENSE_WINDOW_SIZES = {"3g_avg": (3, 1), "6g_avg": (6, 4), "season_avg": None}
 
 @lru_cache(maxsize=None)
 def player_id_map():
-    player_ids = nfl.load_ff_playerids().select("pfr_id", "gsis_id")
+    player_ids = load_ff_playerids().select("pfr_id", "gsis_id")
     id_map = dict(zip(player_ids["pfr_id"].to_list(), player_ids["gsis_id"].to_list()))
     return id_map
 
-def generate_offensive_averages(df, training=True)->pl.DataFrame:
+def generate_offensive_averages(df, training=True, windows=None)->pl.DataFrame:
     """
     :param pl.DataFrame df: Data-frame containing cols seen in stat_cols (within this method)
     :param bool training: True if averages are for training, False otherwise (True means most
     recent game will not be included in averages)
+    :param windows: ((window, cols), ...) to compute, ex. FeaturePlan.offense, None for every stat col
+    in every window
     :return:
     """
     shift = 1 if training else 0
@@ -24,38 +29,13 @@ def generate_offensive_averages(df, training=True)->pl.DataFrame:
     df = df.fill_null(0)
 
     stat_cols = get_stat_cols()
+    windows = dict(windows) if windows is not None else {
+        window: stat_cols for window in ["3g_avg", "6g_avg", "season_avg"]
+    }
 
-
-    # Rolling average over 3 games
-    for col in stat_cols:
-        df = df.with_columns(
-            pl.col(col)
-            .rolling_mean(window_size=3, min_periods=1)
-            .over(["player_id", "season"])
-            .shift(shift)
-            .alias(f"{col}_3g_avg")
-        )
-
-    # Rolling average over 6 games
-    for col in stat_cols:
-        df = df.with_columns(
-            pl.col(col)
-            .rolling_mean(window_size=6, min_periods=4)
-            .over(["player_id", "season"])
-            .shift(shift)
-            .alias(f"{col}_6g_avg")
-        )
-
-    # Average over whole season
-    for col in stat_cols:
-        df = df.with_columns(
-            (
-            pl.col(col).cum_sum().over(["player_id", "season"])
-            / pl.col("week").cum_count().over(["player_id", "season"])
-            )
-            .shift(shift)
-            .alias(f"{col}_season_avg")
-        )
+    # Rolling 3 and 6 game and season averages, every col of a window in one pass
+    for window, cols in windows.items():
+        df = window_means(df, list(cols), {window: OFFENSE_WINDOW_SIZES[window]}, ["player_id", "season"], shift)
 
     return df
 
@@ -1,28 +1,23 @@
 
 from functools import lru_cache
 import polars as pl
-import nflreadpy as nfl
-from fantasy_football_projections.data_loading.player_data import load_player_stats, load_pbp_data
+from fantasy_football_projections.config import REDZONE_YARDLINE
+from fantasy_football_projections.data_loading.player_data import load_player_stats, load_pbp_data, \
+    load_snap_shares, load_nextgen_wr_data
+from fantasy_football_projections.data_loading.snapshots import snapshotted
 
 def get_wr_snap_counts(seasons)->pl.DataFrame:
     """
     :param int[] seasons: Seasons to get snap counts from
     :return: df of relevant snap count information (includes gsis_id)
     """
-    # Loads play ID's df and creates pfr_id->gsis_id map
-    player_ids = nfl.load_ff_playerids().select("pfr_id", "gsis_id")
-    id_map = dict(zip(player_ids["pfr_id"].to_list(), player_ids["gsis_id"].to_list()))
-
-    # Loads snap counts, adds gsis id column
-    snap_counts = nfl.load_snap_counts(seasons).select(
+    # Loads cached snap counts (gsis id mapped from pfr id)
+    snap_counts = load_snap_shares(*seasons).select(
         "pfr_player_id",
         "offense_pct",
         "week",
-        "season"
-    )
-    snap_counts = snap_counts.with_columns(
-        pl.col("pfr_player_id").map_elements(lambda x: id_map.get(x))
-        .alias("gsis_id")
+        "season",
+        "gsis_id"
     )
 
     return snap_counts
@@ -46,12 +41,13 @@ def get_wr_nextgen_stats(seasons)->pl.DataFrame:
     :return: Sorted df of weekly wr nextgen stats from nflreadpy.load_nextgen_stats(seasons)
     """
     # Gets all nextgen wr games over seasons
-    nextgen_stats = (nfl.load_nextgen_stats(seasons, stat_type="receiving").filter(
+    nextgen_stats = (load_nextgen_wr_data(*seasons).filter(
         (pl.col("player_position") == "WR")
     )).sort(["player_gsis_id", "season", "week"])
 
     return nextgen_stats
 
+@snapshotted("wr_pbp_weekly", code=())
 def get_wr_pbp_stats_weekly(seasons):
     """
     :param seasons: Seasons to get pbp stats from
@@ -65,27 +61,23 @@ def get_wr_pbp_stats_weekly(seasons):
     .with_columns(
 
         # Red zone targets
-        (pl.when(pl.col("yardline_100") <= 20)
-         .then(1)
-         .otherwise(0)
+        ((pl.col("yardline_100") <= REDZONE_YARDLINE)
+         .fill_null(False)
          .alias("redzone_target")),
 
         # Big play attempts
-        pl.when(pl.col("air_yards") >= 20)
-        .then(1)
-        .otherwise(0)
+        (pl.col("air_yards") >= 20)
+        .fill_null(False)
         .alias("big_play_attempt"),
 
         # Red zone tds
-        pl.when((pl.col("yardline_100") <= 20) & (pl.col("pass_touchdown") == 1))
-        .then(1)
-        .otherwise(0)
+        ((pl.col("yardline_100") <= REDZONE_YARDLINE) & (pl.col("pass_touchdown") == 1))
+        .fill_null(False)
         .alias("redzone_touchdown"),
 
         # Big play conversions
-        pl.when((pl.col("air_yards") >= 20) & (pl.col("complete_pass") == 1))
-        .then(1)
-        .otherwise(0)
+        ((pl.col("air_yards") >= 20) & (pl.col("complete_pass") == 1))
+        .fill_null(False)
         .alias("big_play_conversions"),
 
         # Renames receiver_player_id
@@ -2,27 +2,67 @@ import numpy
 
 from fantasy_football_projections.wr_metrics.universal_averages import max_depth_of_target, max_reception_per_game, \
     select_wanted_cols
-from fantasy_football_projections.wr_metrics.wr_defense_stat_aggregation import get_wr_defense_pbp_stats, \
-    get_wr_defense_weekly_stats
-from fantasy_football_projections.wr_metrics.wr_defensive_metrics import generate_defensive_averages
-from fantasy_football_projections.wr_metrics.wr_offensive_metrics import generate_offensive_averages
+from fantasy_football_projections.data_loading import encoding
+from fantasy_football_projections.data_loading.prefetch import prefetch
+from fantasy_football_projections.data_loading.schema import schema_fingerprint
+from fantasy_football_projections.data_loading.schedule_data import attach_schedule
+from fantasy_football_projections.pipeline.defense_cube import DefenseCube, cube_version, defense_totals
+from fantasy_football_projections.pipeline.position_specs import WR_SPEC
+from fantasy_football_projections.pipeline.sharding import sharded_build
+from fantasy_football_projections.pipeline.stage_cache import Stage, StageGraph, code_hash, stable_repr
+from fantasy_football_projections.utils.as_of import attach_as_of
+from fantasy_football_projections.utils.projection_cache import data_version
+from fantasy_football_projections.utils.window_kernel import segmented_window_means, window_means
+from fantasy_football_projections.wr_modeling.feature_graph import AUXILIARY_STAGES, FeaturePlan, feature_plan
+from fantasy_football_projections.wr_metrics.wr_defensive_metrics import point_in_time_defense_features
+from fantasy_football_projections.wr_metrics.wr_offensive_metrics import OFFENSE_WINDOW_SIZES, generate_offensive_averages
 import polars as pl
 
 from fantasy_football_projections.wr_metrics.wr_stat_aggregation import get_wr_snap_counts, get_wr_weekly_stats, \
     get_wr_nextgen_stats, get_wr_pbp_stats_weekly
 
+# Datasets read while building wr training data
+WR_DATASETS = ("pbp", "player_stats", "snap_counts", "nextgen", "players", "schedules")
 
-def get_training_df(seasons) -> pl.DataFrame:
+# Identifying cols kept in the training data-frame, backtest predictions are grouped by them
+TRAINING_ID_COLS = ["player_id", "team", "position"]
+
+
+def get_training_df(seasons, plan=None) -> pl.DataFrame:
     """
     :param int[] seasons: Seasons to base data on
+    :param FeaturePlan plan: Features the data-frame is built for, default_feature_plan() if None
+    (only the averages the plan reads are computed)
     :return: Data-frame tailored for training wr points prediction model
     """
+    plan = plan or default_feature_plan()
+
+    # Loads every source concurrently before building
+    prefetch(seasons, WR_DATASETS)
+
+    # Gets df with all wr games (at least one target) and their snap counts, next-gen and pbp stats
+    df = join_sources(
+        get_wr_weekly_stats(seasons),
+        get_wr_snap_counts(seasons),
+        get_wr_nextgen_stats(seasons),
+        get_wr_pbp_stats_weekly(seasons),
+        seasons,
+    )
 
-    snap_counts = get_wr_snap_counts(seasons)
+    # Generates previous relevant averages
+    df = generate_offensive_averages(df, windows=plan.offense)
 
-    # Gets df with all wr games (at least one target)
-    player_stats = get_wr_weekly_stats(seasons)
+    return attach_defense(df, defense_features(seasons, plan.defense), plan)
 
+def join_sources(player_stats, snap_counts, nextgen_stats, pbp_stats, seasons)->pl.DataFrame:
+    """
+    :param pl.DataFrame player_stats: wr weekly stats, see get_wr_weekly_stats()
+    :param pl.DataFrame snap_counts: wr snap counts, see get_wr_snap_counts()
+    :param pl.DataFrame nextgen_stats: wr next-gen stats, see get_wr_nextgen_stats()
+    :param pl.DataFrame pbp_stats: wr weekly pbp stats, see get_wr_pbp_stats_weekly()
+    :param int[] seasons: Seasons of the stats
+    :return: Data-frame of every wr game with its snap counts, next-gen and pbp stats and its schedule
+    """
     # Joins player_stats and snap count
     player_stats = player_stats.join(
         snap_counts,
@@ -34,8 +74,6 @@ def get_training_df(seasons) -> pl.DataFrame:
     # Filters out games where players played more than 20% of snaps
     player_stats = player_stats.filter(pl.col("offense_pct") > .05)
 
-    nextgen_stats = get_wr_nextgen_stats(seasons)
-
     # Joins next-gen stats and player_stats together
     player_stats = player_stats.join(
         nextgen_stats,
@@ -44,9 +82,6 @@ def get_training_df(seasons) -> pl.DataFrame:
         how="left"
     )
 
-    # Gets pbp data for all wr games over season
-    pbp_stats = get_wr_pbp_stats_weekly(seasons)
-
     # Joins pbp_stats to player_stats
     df = player_stats.join(
         pbp_stats,
@@ -55,46 +90,116 @@ def get_training_df(seasons) -> pl.DataFrame:
         how="left"
     )
 
-    # Generates previous relevant averages
-    df = generate_offensive_averages(df)
-
-    defense_stats = get_wr_defense_weekly_stats(seasons)
+    # Opponent, home/away and game id of each game from the schedule index
+    return attach_schedule(df, seasons)
 
-    # Gets defensive pbp for defensive metrics
-    defense_pbp = get_wr_defense_pbp_stats(seasons)
-
-    # Joins pbp and weekly stats
-    defense_df = defense_stats.join(
-        defense_pbp,
-        left_on=["opponent_team", "week", "season"],
-        right_on=["defteam", "week", "season"],
-        how="left"
-    )
+def defense_features(seasons, windows)->pl.DataFrame:
+    """
+    :param int[] seasons: Seasons to compute defensive states for
+    :param windows: ((window, cols), ...) to compute, ex. FeaturePlan.defense
+    :return: Point-in-time defensive states of every season, see point_in_time_defense_features()
+    """
+    return pl.concat([point_in_time_defense_features(season, windows) for season in seasons])
 
-    # Gets averages for all defenses
-    defense_df = generate_defensive_averages(defense_df)
+def attach_defense(df, defense_df, plan)->pl.DataFrame:
+    """
+    :param pl.DataFrame df: wr games with their offensive averages
+    :param pl.DataFrame defense_df: Point-in-time defensive states, see defense_features()
+    :param FeaturePlan plan: Features the data-frame is built for
+    :return: Training data-frame of the cols plan reads, games against an opponent without a
+    defensive state (its first game of the season) are dropped
+    """
+    # Attaches each opponent's latest defensive state strictly before the game
+    defense_df = defense_df.with_columns(pl.lit(True).alias("_has_defense"))
+    df = attach_as_of(df, defense_df).sort(["player_id", "season", "week"])
 
-    # Joins df and defense_df
-    df = df.join(
-        defense_df,
-        left_on=["opponent_team", "week", "season"],
-        right_on=["opponent_team", "week", "season"]
-    )
+    # Games without a prior state would train on null defensive features
+    df = df.filter(pl.col("_has_defense").is_not_null()).drop("_has_defense")
 
     # Selects only cols needed for features
-    df = select_wanted_cols(df)
-    return df
+    return select_wanted_cols(df, plan, TRAINING_ID_COLS)
 
-def write_training_df_to_parquet(seasons):
+def training_stages(seasons, plan=None, ppr=1)->list[Stage]:
+    """
+    The wr build as a DAG for pipeline.stage_cache.StageGraph: source loads (per-play flags and
+    weekly aggregates for pbp) -> joins -> offensive windows and defensive states -> training
+    data-frame ("wr_training_df") -> auxiliary features ("wr_features")
+    :param int[] seasons: Seasons to build
+    :param FeaturePlan plan: Features to build, default_feature_plan() if None
+    :param float ppr: Points per reception
+    :return: Stages of the build
+    """
+    plan = plan or default_feature_plan()
+    seasons = tuple(seasons)
+
+    # New games or plays in a season change its data version and every stage reading it
+    version = ",".join(data_version(season) for season in seasons)
+
+    # Loaders store frames with the schema's dtypes and the encoded ids and teams, changing either
+    # must miss the frames stored with the old ones
+    source_version = f"{version}|{schema_fingerprint()}|{code_hash(encoding)}"
+
+    # Definitions the stage code reads aren't part of its source: the window sizes, and the play
+    # flags and spec aggregations of the defense cube (the fingerprint naming its snapshots)
+    offense_version = stable_repr(OFFENSE_WINDOW_SIZES)
+    defense_version = f"{source_version}|{cube_version()}|{stable_repr(WR_SPEC.defense_windows)}"
+
+    sources = {
+        "wr_weekly_stats": get_wr_weekly_stats,
+        "wr_snap_counts": get_wr_snap_counts,
+        "wr_nextgen_stats": get_wr_nextgen_stats,
+        "wr_pbp_weekly": get_wr_pbp_stats_weekly,
+    }
+
+    return [
+        *(Stage(name, loader, params={"seasons": seasons}, version=source_version) for name, loader in sources.items()),
+        Stage(
+            "wr_joined", join_sources, inputs=tuple(sources), params={"seasons": seasons},
+            code=(attach_schedule,), version=version
+        ),
+        Stage(
+            "wr_offense_windows", generate_offensive_averages, inputs=("wr_joined",),
+            params={"windows": plan.offense}, code=(window_means, segmented_window_means),
+            version=offense_version
+        ),
+        Stage(
+            "wr_defense_windows", defense_features, params={"seasons": seasons, "windows": plan.defense},
+            code=(point_in_time_defense_features, DefenseCube, defense_totals, window_means, segmented_window_means),
+            version=defense_version
+        ),
+        Stage(
+            "wr_training_df", attach_defense, inputs=("wr_offense_windows", "wr_defense_windows"),
+            params={"plan": plan}, code=(attach_as_of, select_wanted_cols)
+        ),
+        Stage(
+            "wr_features", build_feature_df, inputs=("wr_training_df",), params={"ppr": ppr, "plan": plan},
+            code=(generate_auxiliary_features, auxiliary_exprs)
+        ),
+    ]
+
+def write_training_df_to_parquet(seasons, max_workers=1, plan=None, stage_cache_dir=None):
     """
     Generates a training data-frame and writes it to a parquet file
     utils->construct_dataset_location->construct_rb_dataset_location() w/ same args for file location
     :param int[] seasons: Seasons to generate training df from
+    :param int max_workers: Processes building seasons in parallel (None for one per season)
+    :param FeaturePlan plan: Features the data-frame is built for, default_feature_plan() if None
+    :param str stage_cache_dir: Folder of cached stage outputs (see training_stages()), only the stages
+    whose code, params or data changed are recomputed. None builds without the cache
     :return: The location of training df
     """
     path = "fantasy_football_projections/data_loading/datasets/wr_training_ds.parquet"
 
-    df = get_training_df(seasons)
+    if stage_cache_dir is not None:
+        if max_workers != 1:
+            raise ValueError("Cached builds run in one process, use max_workers=1")
+        df = StageGraph(training_stages(seasons, plan), stage_cache_dir).run("wr_training_df")
+    elif max_workers == 1:
+        df = get_training_df(seasons, plan)
+    else:
+        # Windows restart each season so shards need no earlier season, rows are ordered as
+        # get_training_df() orders them
+        df = sharded_build(get_training_df, seasons, max_workers, plan=plan, sort_by=["player_id", "season", "week"])
     df.write_parquet(path)
 
     return path
@@ -105,87 +210,105 @@ def training_df_cols():
     """
     ...
 
-def generate_auxiliary_features(training_df, ppr=1):
+def auxiliary_exprs(window)->dict[str, pl.Expr]:
     """
-    Generates auxiliary features for training/predicting
-    :param pl.DataFrame training_df: Training df as returned by get_training_df()
-    :param float ppr: Points per reception
-    :return: df with new features
+    :param str window: Window suffix ("3g_avg", "6g_avg" or "season_avg")
+    :return: Dict mapping each auxiliary feature to its expression over window's averages,
+    see feature_graph.AUXILIARY_STAGES for the cols each reads
     """
-    df = training_df
-    for window in ["_3g_avg", "_6g_avg", "_season_avg"]:
-        df = df.with_columns(
-
-            # Average depth of target
-            (pl.col(f"air_yards_targeted{window}") / pl.col(f"targets{window}"))
-            .alias(f"avg_depth_of_target{window}"),
+    window = f"_{window}"
+    return {
 
-            # Big play conversion rate
-            (pl.col(f"big_play_conversions{window}") / pl.col(f"big_play_attempts{window}"))
-            .alias(f"big_play_conversion_rate{window}"),
+        # Average depth of target
+        "avg_depth_of_target":
+            (pl.col(f"air_yards_targeted{window}") / pl.col(f"targets{window}")),
 
-            # Yards per target
-            (pl.col(f"receiving_yards{window}") / pl.col(f"targets{window}"))
-            .alias(f"yards_per_target{window}")
-        )
+        # Big play conversion rate
+        "big_play_conversion_rate":
+            (pl.col(f"big_play_conversions{window}") / pl.col(f"big_play_attempts{window}")),
 
+        # Yards per target
+        "yards_per_target":
+            (pl.col(f"receiving_yards{window}") / pl.col(f"targets{window}")),
 
-        df = df.with_columns(
-            # Receiver quality score
+        # Receiver quality score
+        "receiver_quality_score":
             ((pl.col(f"avg_depth_of_target{window}") / pl.col("season").map_elements(max_depth_of_target, return_dtype=pl.Float64)) +
-            (pl.col(f"receptions{window}") / pl.col("season").map_elements(max_reception_per_game, return_dtype=pl.Float64)))
-            .alias(f"receiver_quality_score{window}"),
+            (pl.col(f"receptions{window}") / pl.col("season").map_elements(max_reception_per_game, return_dtype=pl.Float64))),
 
-            # Boom score
+        # Boom score
+        "boom_score":
             (pl.col(f"receiving_tds{window}") * 4
              + pl.col(f"redzone_targets{window}")
-             + pl.col(f"big_play_conversion_rate{window}") * 3)
-            .alias(f"boom_score{window}"),
+             + pl.col(f"big_play_conversion_rate{window}") * 3),
 
-            # Target quality
+        # Target quality
+        "avg_target_quality":
             (pl.col(f"avg_depth_of_target{window}") +
-             (pl.col(f"avg_separation{window}")**2))
-             .alias(f"avg_target_quality{window}"),
+             (pl.col(f"avg_separation{window}")**2)),
 
-            # Weighted target score
-            ((pl.col(f"target_share{window}") + pl.col(f"air_yards_share{window}"))*1.5)
-            .alias(f"weighted_target_score{window}"),
+        # Weighted target score
+        "weighted_target_score":
+            ((pl.col(f"target_share{window}") + pl.col(f"air_yards_share{window}"))*1.5),
 
-            # Target value added
-            (pl.col(f"receiving_epa{window}") / pl.col(f"targets{window}"))
-            .alias(f"target_value_added{window}"),
+        # Target value added
+        "target_value_added":
+            (pl.col(f"receiving_epa{window}") / pl.col(f"targets{window}")),
 
-            # Yard Opportunity Capitalization Score
+        # Yard Opportunity Capitalization Score
+        "yard_opportunity_capitalization":
             (pl.col(f"catch_percentage{window}")*
              pl.col(f"avg_depth_of_target{window}") +
-             (pl.col(f"receiving_yards_after_catch{window}")))
-            .alias(f"yard_opportunity_capitalization{window}"),
-        )
+             (pl.col(f"receiving_yards_after_catch{window}"))),
 
-    for window in ["_6g_avg", "_season_avg"]:
-        df = df.with_columns(
+        # RACR differential
+        "racr_differential":
+            (pl.col(f"racr{window}") - pl.col(f"racr_against{window}")),
 
-            # RACR differential
-            (pl.col(f"racr{window}") - pl.col(f"racr_against{window}"))
-            .alias(f"racr_differential{window}"),
+        # Receiving EPA differential
+        "rec_epa_differential":
+            (pl.col(f"receiving_epa{window}") - pl.col(f"receiving_epa_against{window}")),
+    }
 
-            # Receiving EPA differential
-            (pl.col(f"receiving_epa{window}") - pl.col(f"receiving_epa_against{window}"))
-            .alias(f"rec_epa_differential{window}")
-        )
+def generate_auxiliary_features(training_df, ppr=1, plan=None):
+    """
+    Generates auxiliary features for training/predicting
+    :param pl.DataFrame training_df: Training df as returned by get_training_df()
+    :param float ppr: Points per reception
+    :param FeaturePlan plan: Features to generate, feature_plan(features()) if None
+    :return: df with new features
+    """
+    plan = plan or default_feature_plan()
+    df = training_df
 
-    df = df.select(["fantasy_points_ppr"] + features())
+    # Each stage only reads averages and earlier stages
+    for stage in AUXILIARY_STAGES:
+        exprs = []
+        for window, names in plan.auxiliary:
+            window_exprs = auxiliary_exprs(window)
+            exprs += [window_exprs[name].alias(f"{name}_{window}") for name in names if name in stage]
+        if exprs:
+            df = df.with_columns(exprs)
+
+    df = df.select(["fantasy_points_ppr"] + list(plan.features))
     return df
 
-def build_feature_df(training_df, ppr=1):
+def build_feature_df(training_df, ppr=1, plan=None):
     """
     :param pl.DataFrame training_df: Training data-frame
     :param float ppr: Points per reception
+    :param FeaturePlan plan: Features to build, default_feature_plan() if None
     :return: Data-frame with only metrics relevant to training
     """
-    df = generate_auxiliary_features(training_df, ppr)
+    df = generate_auxiliary_features(training_df, ppr, plan)
     return df
 
+def default_feature_plan()->FeaturePlan:
+    """
+    :return: The FeaturePlan of features()
+    """
+    return feature_plan(tuple(features()))
+
 def features():
     """
     :return: A list of features used
@@ -0,0 +1,112 @@
+
+from dataclasses import dataclass
+from functools import lru_cache
+
+from fantasy_football_projections.utils.model_analysis import WINDOW_SUFFIX
+from fantasy_football_projections.wr_modeling.utility import get_stat_cols, get_defense_cols
+
+
+# Windows in the order they are computed
+OFFENSE_WINDOWS = ("3g_avg", "6g_avg", "season_avg")
+DEFENSE_WINDOWS = ("6g_avg", "season_avg")
+
+# Auxiliary features and the averaged cols (of the same window) each is computed from,
+# grouped in stages so a stage only reads earlier stages
+AUXILIARY_STAGES = (
+    {
+        "avg_depth_of_target": ("air_yards_targeted", "targets"),
+        "big_play_conversion_rate": ("big_play_conversions", "big_play_attempts"),
+        "yards_per_target": ("receiving_yards", "targets"),
+    },
+    {
+        "receiver_quality_score": ("avg_depth_of_target", "receptions"),
+        "boom_score": ("receiving_tds", "redzone_targets", "big_play_conversion_rate"),
+        "avg_target_quality": ("avg_depth_of_target", "avg_separation"),
+        "weighted_target_score": ("target_share", "air_yards_share"),
+        "target_value_added": ("receiving_epa", "targets"),
+        "yard_opportunity_capitalization": ("catch_percentage", "avg_depth_of_target", "receiving_yards_after_catch"),
+        "racr_differential": ("racr", "racr_against"),
+        "rec_epa_differential": ("receiving_epa", "receiving_epa_against"),
+    },
+)
+AUXILIARY_DEPENDENCIES = {name: deps for stage in AUXILIARY_STAGES for name, deps in stage.items()}
+
+
+@dataclass(frozen=True)
+class FeaturePlan:
+    """
+    Everything a feature list needs, resolved back to source cols and windows. Fields are
+    tuples so plans can key lru caches
+    - features: The features, in model order
+    - offense: ((window, cols), ...) averaged per player by generate_offensive_averages()
+    - defense: ((window, cols), ...) averaged per defense by generate_defensive_averages()
+    - auxiliary: ((window, names), ...) computed by generate_auxiliary_features(), in stage order
+    """
+    features: tuple[str, ...]
+    offense: tuple[tuple[str, tuple[str, ...]], ...]
+    defense: tuple[tuple[str, tuple[str, ...]], ...]
+    auxiliary: tuple[tuple[str, tuple[str, ...]], ...]
+
+    def window_cols(self)->list[str]:
+        """
+        :return: Every averaged col the plan reads ("receptions_3g_avg", ...)
+        """
+        return [f"{col}_{window}" for window, cols in self.offense + self.defense for col in cols]
+
+
+def split_feature(feature)->tuple[str, str]:
+    """
+    :param str feature: Feature name, ex. "receiving_yards_3g_avg"
+    :return: (stat, window), ex. ("receiving_yards", "3g_avg")
+    """
+    match = WINDOW_SUFFIX.search(feature)
+    if match is None:
+        raise ValueError(f"Feature has no window: {feature}")
+    return feature[:match.start()], match.group(1)
+
+@lru_cache(maxsize=None)
+def feature_plan(feature_names)->FeaturePlan:
+    """
+    Walks each feature back through the auxiliary features to the averaged cols it reads
+    :param tuple[str] feature_names: Features to compute, ex. features() or Booster.feature_name()
+    :return: The FeaturePlan of feature_names
+    """
+    stat_cols, defense_cols = get_stat_cols(), get_defense_cols()
+    offense, defense, auxiliary = set(), set(), set()
+
+    def resolve(stat, window):
+        if stat in AUXILIARY_DEPENDENCIES:
+            auxiliary.add((stat, window))
+            for dependency in AUXILIARY_DEPENDENCIES[stat]:
+                resolve(dependency, window)
+        elif stat in defense_cols:
+            defense.add((stat, window))
+        elif stat in stat_cols:
+            offense.add((stat, window))
+        else:
+            raise ValueError(f"Unknown feature stat: {stat}_{window}")
+
+    for feature in feature_names:
+        resolve(*split_feature(feature))
+
+    def by_window(needed, windows, order):
+        return tuple(
+            (window, tuple(col for col in order if (col, window) in needed))
+            for window in windows if any(w == window for _, w in needed)
+        )
+
+    auxiliary_order = [name for stage in AUXILIARY_STAGES for name in stage]
+    return FeaturePlan(
+        features=tuple(feature_names),
+        offense=by_window(offense, OFFENSE_WINDOWS, stat_cols),
+        defense=by_window(defense, DEFENSE_WINDOWS, defense_cols),
+        auxiliary=by_window(auxiliary, OFFENSE_WINDOWS, auxiliary_order),
+    )
+
+def model_feature_plan(model)->FeaturePlan:
+    """
+    :param model: Booster or fitted LGBMRegressor
+    :return: The FeaturePlan of the features the model was trained on
+    """
+    booster = getattr(model, "booster_", model)
+    return feature_plan(tuple(booster.feature_name()))
@@ -1,34 +1,41 @@
 
 import polars as pl
-from fantasy_football_projections.data_loading.load_models import load_recent_wr_model
-from fantasy_football_projections.data_loading.schedule_data import load_schedule_data
+from fantasy_football_projections.data_loading.encoding import TEAM, encode_gsis_id, gsis_string
+from fantasy_football_projections.data_loading.load_models import load_recent_wr_model, model_hash, wr_model_path
+from fantasy_football_projections.data_loading.schedule_data import load_season_schedule_index, team_week
+from fantasy_football_projections.utils.as_of import attach_as_of
+from fantasy_football_projections.utils.model_analysis import explain
+from fantasy_football_projections.utils.projection_cache import PROJECTION_CACHE, data_version
 from fantasy_football_projections.wr_metrics.universal_averages import select_wanted_cols
-from fantasy_football_projections.wr_metrics.wr_defense_stat_aggregation import get_wr_defense_weekly_stats, \
-    get_wr_defense_pbp_stats
-from fantasy_football_projections.wr_metrics.wr_defensive_metrics import generate_defensive_averages
+from fantasy_football_projections.wr_metrics.wr_defensive_metrics import point_in_time_defense_features
 from fantasy_football_projections.wr_metrics.wr_offensive_metrics import generate_offensive_averages
 from fantasy_football_projections.wr_metrics.wr_stat_aggregation import get_wr_snap_counts, get_wr_weekly_stats, \
     get_wr_pbp_stats_weekly, get_wr_nextgen_stats
-from fantasy_football_projections.wr_modeling.feature_engineering import features, generate_auxiliary_features
+from fantasy_football_projections.wr_modeling.feature_engineering import generate_auxiliary_features
+from fantasy_football_projections.wr_modeling.feature_graph import model_feature_plan
 
 
-def prepare_wr_metrics(player_id, season, week) -> pl.DataFrame:
+def wr_offensive_states(season, week, player_ids=None, plan=None) -> pl.DataFrame:
     """
-    Returns a data-frame ready to project a fantasy wr's output in next game
-    :param player_id:
-    :param season:
-    :param week:
-    :return: polars DataFrame
+    Returns every wr's offensive averages entering week (only games before week are used)
+    :param int season: Season being projected
+    :param int week: Week being projected
+    :param list[str] player_ids: Players to include, None for every wr
+    :param FeaturePlan plan: Only the averages the plan reads are computed, every average if None
+    :return: polars DataFrame with one row per player, their latest game and its averages
     """
+    if player_ids is not None:
+        player_ids = [encode_gsis_id(player_id) for player_id in player_ids]
+
+    def by_player(df, id_col):
+        df = df.filter(pl.col("season") == season, pl.col("week") < week)
+        return df if player_ids is None else df.filter(pl.col(id_col).is_in(player_ids))
+
     # Loads snap counts, filters by player id
-    snap_counts = get_wr_snap_counts([season]).filter(
-        pl.col("gsis_id") == player_id
-    )
+    snap_counts = by_player(get_wr_snap_counts([season]), "gsis_id")
 
     # Loads weekly stats, filters by player
-    player_stats = get_wr_weekly_stats([season]).filter(
-        pl.col("player_id") == player_id
-    )
+    player_stats = by_player(get_wr_weekly_stats([season]), "player_id")
 
     # Joins plays stats with snap counts
     df = player_stats.join(
@@ -39,9 +46,7 @@ def prepare_wr_metrics(player_id, season, week) -> pl.DataFrame:
     )
 
     # Loads pbp stats aggregated by week, filters by player
-    pbp_stats = get_wr_pbp_stats_weekly([season]).filter(
-        pl.col("player_id") == player_id
-    )
+    pbp_stats = by_player(get_wr_pbp_stats_weekly([season]), "player_id")
 
     # Joins df with pbp_stats
     df = df.join(
@@ -52,9 +57,7 @@ def prepare_wr_metrics(player_id, season, week) -> pl.DataFrame:
     )
 
     # Loads nextgen stats
-    nextgen = get_wr_nextgen_stats([season]).filter(
-        pl.col("player_gsis_id") == player_id
-    )
+    nextgen = by_player(get_wr_nextgen_stats([season]), "player_gsis_id")
 
     # Joins nextgen to df
     df = df.join(
@@ -64,56 +67,133 @@ def prepare_wr_metrics(player_id, season, week) -> pl.DataFrame:
         how="inner"
     )
 
-    df = generate_offensive_averages(df, training=False)
+    df = generate_offensive_averages(df, training=False, windows=plan.offense if plan else None)
 
-    team = df.tail(1)["team"].item()
+    # Latest offensive state entering the projected game
+    return df.group_by("player_id", maintain_order=True).tail(1)
 
-    schedule = load_schedule_data(*[season]).filter(
-        ((pl.col("away_team") == team) |
-        (pl.col("home_team") == team)) &
-        (pl.col("week") == week)
+def prepare_wr_metrics(player_id, season, week, plan=None) -> pl.DataFrame | None:
+    """
+    Returns a data-frame ready to project a fantasy wr's output in next game
+    :param player_id:
+    :param season:
+    :param week:
+    :param FeaturePlan plan: Features to prepare, feature_engineering.default_feature_plan() if None
+    :return: polars DataFrame, None if the player's team is on bye
+    """
+    df = wr_offensive_states(season, week, [player_id], plan)
+
+    # The player's team is read from their latest game
+    if df.is_empty():
+        raise ValueError(
+            f"Player {player_id} has no wr games before week {week} of {season}, a projection needs at least one"
+        )
+    team = df["team"].item()
+
+    # Opponent from the schedule index
+    game = team_week(team, season, week)
+    if game is None or game["bye"]:
+        return None
+
+    df = df.with_columns(
+        pl.lit(game["opponent_team"], dtype=TEAM).alias("opponent_team"),
+        pl.lit(week).cast(df.schema["week"]).alias("week")
     )
 
-    if schedule.select(["away_team"]).item() == team:
-        opponent_team = schedule.select(["home_team"]).item()
-    else:
-        opponent_team = schedule.select(["away_team"]).item()
+    # Attaches the opponent's latest defensive state before the game
+    df = attach_as_of(df, point_in_time_defense_features(season, plan.defense if plan else None))
 
-    print(opponent_team)
+    df = select_wanted_cols(df, plan)
 
-    defense_stats = get_wr_defense_weekly_stats([season]).filter(
-        pl.col("opponent_team") == opponent_team
-    )
+    return generate_auxiliary_features(df, plan=plan)
 
-    defense_pbp = get_wr_defense_pbp_stats([season]).filter(
-        pl.col("defteam") == opponent_team
-    )
+def _project_player_points(player_id, season, week):
+    model = load_recent_wr_model()
 
-    defense_df = defense_stats.join(
-        defense_pbp,
-        left_on=["opponent_team", "week", "season"],
-        right_on=["defteam", "week", "season"],
-        how="left"
-    )
+    # Only the features the saved model was trained on are computed
+    plan = model_feature_plan(model)
+    df = prepare_wr_metrics(player_id, season, week, plan)
+    if df is None:
+        return None
+    X_pred = df.select(plan.features).to_pandas()
+    y_pred = model.predict(X_pred)
+    return float(y_pred[0])
 
-    print(defense_df.describe())
+def project_player_points(player_id, season, week, cache=PROJECTION_CACHE):
+    """
+    :param str player_id: gsis id
+    :param int season: Season being projected
+    :param int week: Week being projected
+    :param ProjectionCache cache: Cache of earlier projections, None to always recompute
+    :return: Projected fantasy points, None if the player's team is on bye
+    """
+    if cache is None:
+        return _project_player_points(player_id, season, week)
 
-    defense_df = generate_defensive_averages(defense_df, training=False)
+    # Keyed by the saved model and the source data so either changing invalidates entries
+    key = cache.key(player_id, season, week, model_hash(wr_model_path()), data_version(season))
+    return cache.get_or_compute(key, lambda: _project_player_points(player_id, season, week))
 
-    # Joins df and defense_df
-    df = df.join(
-        defense_df,
-        left_on=["opponent_team", "week", "season"],
-        right_on=["opponent_team", "week", "season"],
-        how="left"
-    )
+def prepare_rest_of_season_metrics(season, week, player_ids=None, plan=None) -> pl.DataFrame:
+    """
+    Builds one (player, future week) feature matrix from every player's current averages and
+    each future opponent's current defensive state
+    :param int season: Season being projected
+    :param int week: First week projected
+    :param list[str] player_ids: Players to include, None for every wr
+    :param FeaturePlan plan: Features to prepare, feature_engineering.default_feature_plan() if None
+    :return: polars DataFrame of features with 'player_id', 'week' and 'opponent_team' keys
+    """
+    states = wr_offensive_states(season, week, player_ids, plan)
+
+    # Every team's remaining games
+    games = load_season_schedule_index(season).filter(
+        (pl.col("week") >= week) & ~pl.col("bye")
+    ).select("team", "opponent_team", pl.col("week").alias("future_week"))
+
+    # Pairs each player's state with their team's remaining games
+    df = states.drop("opponent_team").join(games, on="team", how="inner")
+
+    # Attaches each opponent's latest defensive state entering week
+    df = df.with_columns(pl.lit(week).cast(df.schema["week"]).alias("week"))
+    df = attach_as_of(df, point_in_time_defense_features(season, plan.defense if plan else None))
+    df = df.with_columns(pl.col("future_week").cast(df.schema["week"]).alias("week")).sort(["player_id", "week"])
 
-    df = select_wanted_cols(df)
+    keys = df.select("player_id", "week", "opponent_team")
+    return generate_auxiliary_features(select_wanted_cols(df, plan), plan=plan).with_columns(keys)
 
-    return generate_auxiliary_features(df)
+def project_rest_of_season(season, week, player_ids=None) -> pl.DataFrame:
+    """
+    Projects every remaining week for players with a single predict call
+    :param int season: Season being projected
+    :param int week: First week projected
+    :param list[str] player_ids: Players to include, None for every wr
+    :return: polars DataFrame of players x weeks (gsis id strings), a col per week (null on byes)
+    """
+    model = load_recent_wr_model()
+    plan = model_feature_plan(model)
+    matrix = prepare_rest_of_season_metrics(season, week, player_ids, plan)
+
+    projections = matrix.select(gsis_string(pl.col("player_id")).alias("player_id"), "week").with_columns(
+        pl.Series("projection", model.predict(matrix.select(plan.features).to_pandas()))
+    )
+    table = projections.pivot(on="week", index="player_id", values="projection")
+    weeks = sorted(projections["week"].unique().to_list())
+    return table.select(["player_id"] + [str(w) for w in weeks])
 
-def project_player_points(player_id, season, week):
+def explain_week(season, week, player_ids=None, top_k=None) -> pl.DataFrame:
+    """
+    Explains a week's projection of every player with one batched pred_contrib call,
+    see utils.model_analysis.explain()
+    :param int season: Season being projected
+    :param int week: Week being projected
+    :param list[str] player_ids: Players to include, None for every wr
+    :param int top_k: Stats kept per player by absolute contribution, None keeps every stat
+    :return: Long df of 'player_id' (gsis id), 'opponent_team', 'feature' and 'contribution'
+    """
     model = load_recent_wr_model()
-    X_pred = prepare_wr_metrics(player_id, season, week).select(features()).to_pandas()
-    y_pred = model.predict(X_pred)
-    return float(y_pred[0])
+    matrix = prepare_rest_of_season_metrics(season, week, player_ids, model_feature_plan(model))
+    matrix = matrix.filter(pl.col("week") == week)
+
+    keys = matrix.select(gsis_string(pl.col("player_id")).alias("player_id"), "opponent_team")
+    return explain(model, matrix, keys, top_k)
\ No newline at end of file
@@ -1,19 +1,48 @@
 
 import polars as pl
-from lightgbm import LGBMRegressor
-from sklearn.model_selection import train_test_split
 
+from fantasy_football_projections.data_loading.load_models import WR_MODEL_PATH, save_booster
+from fantasy_football_projections.utils.backtesting import require_cols, walk_forward_backtest
 from fantasy_football_projections.utils.model_analysis import training_metrics, visualize_training
-from fantasy_football_projections.wr_modeling.feature_engineering import build_feature_df, features
+from fantasy_football_projections.utils.model_compression import DEFAULT_TOLERANCE, compress, save_variants
+from fantasy_football_projections.wr_modeling.feature_engineering import TRAINING_ID_COLS, build_feature_df, features
+from fantasy_football_projections.wr_modeling.feature_graph import model_feature_plan
 
 
-def train(location, show_metrics=False, show_visuals=False):
+def model_params(n_jobs=-1)->dict:
+    """
+    :param int n_jobs: LightGBM threads, -1 for every core
+    :return: LGBMRegressor keyword arguments of the wr model
+    """
+    return {
+        "n_jobs": n_jobs,
+        "objective": 'regression',
+        "boosting_type": 'gbdt',
+        "learning_rate": 0.02,
+        "num_leaves": 80,  # increased complexity
+        "max_depth": 20,  # deeper trees
+        "n_estimators": 1800,  # more trees for convergence
+        "min_child_samples": 12,
+        "feature_fraction": 0.9,
+        "lambda_l1": 0.1,
+        "lambda_l2": 0.1,
+        "random_state": 42,
+        "verbosity": -1,
+    }
+
+def train(location, show_metrics=False, show_visuals=False, visuals_dir=None, params=None):
     """
     :param str location: The file path to the parquet file with the training data-frame
     :param bool show_metrics: Whether to show training metrics or not
     :param bool show_visuals: Whether to show training visuals or not
+    :param str visuals_dir: Folder the visuals are saved to instead of shown (headless)
+    :param dict params: LGBMRegressor keyword arguments, model_params() if None
     :return: A gbdt model for predicting fantasy rb output
     """
+    # Model and sklearn imports are deferred so projecting never loads them
+    from lightgbm import LGBMRegressor
+    from sklearn.model_selection import train_test_split
+
     # Uses all rb1, rb2, rb3 games over 2021 - 2024 seasons
     df = pl.read_parquet(location)
 
@@ -30,20 +59,7 @@ def train(location, show_metrics=False, show_visuals=False):
     )
 
     # Create gradiant boosting regression tree model
-    model = LGBMRegressor(
-        objective='regression',
-        boosting_type='gbdt',
-        learning_rate=0.02,
-        num_leaves=80,  # increased complexity
-        max_depth=20,  # deeper trees
-        n_estimators=1800,  # more trees for convergence
-        min_child_samples=12,
-        feature_fraction=0.9,
-        lambda_l1=0.1,
-        lambda_l2=0.1,
-        random_state=42,
-        verbosity=-1,
-    )
+    model = LGBMRegressor(**(params or model_params()))
 
     """
     Current Model:
@@ -55,19 +71,70 @@ def train(location, show_metrics=False, show_visuals=False):
 
     if show_metrics:
         training_metrics(y_test, y_pred=model.predict(X_test))
-    if show_visuals:
-        visualize_training(y_test, y_pred=model.predict(X_test), X_train=X_train, model=model)
+    if show_visuals or visuals_dir is not None:
+        visualize_training(y_test, y_pred=model.predict(X_test), X_train=X_train, model=model, output_dir=visuals_dir)
 
     return model
 
-def train_and_save(location, show_metrics=False, show_visuals=False):
+def train_and_save(location, show_metrics=False, show_visuals=False, visuals_dir=None, params=None, path=None):
     """
     Trains and saves model to file: "rb_model.txt"
     :param location: The file path to the parquet file with the training data-frame
     :param show_metrics: Whether to show training metrics or not
     :param show_visuals: Whether to show training visuals or not
+    :param visuals_dir: Folder the visuals are saved to instead of shown
+    :param params: LGBMRegressor keyword arguments, model_params() if None
+    :param path: Model file, WR_MODEL_PATH if None
     :return: The trained model
     """
-    model = train(location, show_metrics, show_visuals)
-    model.booster_.save_model("fantasy_football_projections/data_loading/models/wr_model.txt")
-    return model
\ No newline at end of file
+    model = train(location, show_metrics, show_visuals, visuals_dir, params)
+    save_booster(model.booster_, path or WR_MODEL_PATH)
+    return model
+
+def compress_and_save(location, tolerance=DEFAULT_TOLERANCE):
+    """
+    Builds compressed variants of the saved wr model (see utils.model_compression.compress())
+    and saves those within tolerance next to it. The split matches train() so the held out
+    games were never seen by the model
+    :param str location: The file path to the parquet file the model was trained on
+    :param float tolerance: Relative MAE increase allowed for a saved variant
+    :return: Report df of every variant's accuracy and latency
+    """
+    from lightgbm import Booster
+    from sklearn.model_selection import train_test_split
+
+    # Features in the saved model's own order, it may have been trained on another FeaturePlan
+    booster = Booster(model_file=WR_MODEL_PATH)
+    plan = model_feature_plan(booster)
+    features_df = build_feature_df(pl.read_parquet(location), plan=plan)
+    X = features_df.select(plan.features).to_numpy()
+    y = features_df["fantasy_points_ppr"].to_numpy().ravel()
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42
+    )
+
+    variants, report = compress(booster, X_train, X_test, y_test, tolerance)
+    save_variants(variants, report, WR_MODEL_PATH, tolerance)
+    return report
+
+def backtest(location, start_season, start_week=1, refresh_rounds=50):
+    """
+    Walk-forward backtest of the wr model, see utils.backtesting.walk_forward_backtest()
+    :param str location: The file path to the parquet file with the training data-frame
+    :param int start_season: Season of the first week predicted
+    :param int start_week: First week predicted in start_season
+    :param int refresh_rounds: Boosting rounds added on each newly available week
+    :return: (per-week metrics df, out-of-sample predictions df, final Booster)
+    """
+    df = pl.read_parquet(location)
+    require_cols(
+        df, ["season", "week", *TRAINING_ID_COLS], location,
+        "wr_modeling.feature_engineering.write_training_df_to_parquet()"
+    )
+
+    # Feature rows keep the order of the training df, so season/week and the id cols are carried over
+    features_df = build_feature_df(df).with_columns(df.select("season", "week", *TRAINING_ID_COLS))
+
+    return walk_forward_backtest(
+        features_df, features(), model_params(), start_season, start_week, refresh_rounds, id_cols=TRAINING_ID_COLS
+    )
\ No newline at end of file
@@ -0,0 +1,41 @@
+
+import nflreadpy
+import polars as pl
+import pytest
+
+from fantasy_football_projections.data_loading import snapshots
+
+from .synthetic import in_seasons, synthetic_league
+
+
+@pytest.fixture(scope="session")
+def league()->dict[str, pl.DataFrame]:
+    """
+    Serves synthetic_league() through nflreadpy for the whole session, snapshots are disabled
+    so nothing is written to the package folders
+    """
+    frames = synthetic_league()
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(snapshots, "SNAPSHOTS_ENABLED", False)
+        patch.setattr(nflreadpy, "load_players", lambda **kwargs: frames["players"])
+        patch.setattr(nflreadpy, "load_ff_playerids", lambda **kwargs: frames["ff_playerids"])
+        patch.setattr(
+            nflreadpy, "load_schedules", lambda seasons=None, **kwargs: in_seasons(frames["schedules"], seasons)
+        )
+        patch.setattr(
+            nflreadpy, "load_player_stats",
+            lambda seasons=None, **kwargs: in_seasons(frames["player_stats"], seasons)
+        )
+        patch.setattr(nflreadpy, "load_pbp", lambda seasons=None, **kwargs: in_seasons(frames["pbp"], seasons))
+        patch.setattr(
+            nflreadpy, "load_snap_counts", lambda seasons=None, **kwargs: in_seasons(frames["snap_counts"], seasons)
+        )
+        patch.setattr(
+            nflreadpy, "load_nextgen_stats",
+            lambda seasons=None, stat_type=None, **kwargs: in_seasons(frames["nextgen"], seasons)
+        )
+        patch.setattr(
+            nflreadpy, "load_ff_opportunity",
+            lambda seasons=None, stat_type=None, **kwargs: in_seasons(frames["ff_opportunity"], seasons)
+        )
+        yield frames
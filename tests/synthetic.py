@@ -0,0 +1,139 @@
+
+import numpy as np
+import polars as pl
+
+# Synthetic league served in place of nflverse downloads
+TEAMS = ("ARI", "BAL", "CHI", "DAL")
+SEASONS = (2022, 2023, 2024)
+WEEKS = 18
+ROSTER = {"QB": 1, "RB": 2, "WR": 3, "TE": 1}
+
+# Every team has one bye per season, two teams rest each bye week
+BYES = {"ARI": 6, "BAL": 6, "CHI": 9, "DAL": 9}
+
+# (season, week, game_type, home, away) playoff games appended after the regular season
+PLAYOFFS = [(2023, 19, "WC", "ARI", "CHI"), (2023, 20, "DIV", "DAL", "ARI")]
+
+
+def gsis_id(i)->str:
+    return f"00-{i:07d}"
+
+def _schedule()->list[tuple]:
+    """
+    :return: (game_id, season, week, game_type, home_team, away_team) of every game
+    """
+    games = []
+    for season in SEASONS:
+        for week in range(1, WEEKS + 1):
+            playing = [team for team in TEAMS if BYES[team] != week]
+            # Rotates the pairings so every team meets every other team
+            shift = week % (len(playing) - 1) if len(playing) > 2 else 0
+            order = playing[:1] + playing[1:][shift:] + playing[1:][:shift]
+            for home, away in zip(order[::2], order[1::2]):
+                games.append((f"{season}_{week:02d}_{away}_{home}", season, week, "REG", home, away))
+    for season, week, game_type, home, away in PLAYOFFS:
+        games.append((f"{season}_{week:02d}_{away}_{home}", season, week, game_type, home, away))
+    return games
+
+def synthetic_league(seed=0, plays_per_team=30)->dict[str, pl.DataFrame]:
+    """
+    :return: nflreadpy shaped frames: players, ff_playerids, schedules, player_stats, pbp,
+    snap_counts, nextgen and ff_opportunity
+    """
+    rng = np.random.default_rng(seed)
+    players = []
+    for team in TEAMS:
+        for position, count in ROSTER.items():
+            for _ in range(count):
+                players.append((gsis_id(30000 + len(players)), f"P{len(players)}", position, team))
+    players = pl.DataFrame(players, schema=["gsis_id", "display_name", "position", "team"], orient="row")
+    roster = {team: players.filter(pl.col("team") == team).rows() for team in TEAMS}
+
+    schedule = _schedule()
+    stats, plays, snaps, nextgen, opportunity = [], [], [], [], []
+    for game_id, season, week, _, home, away in schedule:
+        for team, opponent in ((home, away), (away, home)):
+            for player_id, name, position, _ in roster[team]:
+                targets = int(rng.integers(0, 10))
+                receptions = int(rng.integers(0, targets + 1))
+                carries = int(rng.integers(0, 20)) if position in ("RB", "QB") else 0
+                passer = position == "QB"
+                stats.append({
+                    "player_id": player_id, "player_name": name, "position": position, "team": team,
+                    "opponent_team": opponent, "season": season, "week": week,
+                    "receptions": receptions, "targets": targets,
+                    "receiving_yards": float(receptions * rng.integers(3, 15)),
+                    "receiving_tds": int(rng.random() < .1), "receiving_air_yards": float(targets * 8),
+                    "receiving_yards_after_catch": float(receptions * 4), "receiving_first_downs": receptions // 2,
+                    "receiving_epa": float(rng.normal()), "racr": float(rng.random()),
+                    "target_share": float(rng.random() * .3), "air_yards_share": float(rng.random() * .3),
+                    "wopr": float(rng.random() * .5), "carries": carries, "rushing_yards": float(carries * 4),
+                    "rushing_tds": int(rng.random() < .1), "completions": 20 if passer else 0,
+                    "attempts": 32 if passer else 0, "passing_yards": 250.0 if passer else 0.0,
+                    "passing_tds": 2 if passer else 0, "passing_interceptions": 1 if passer else 0,
+                    "sacks_suffered": 2 if passer else 0, "passing_air_yards": 200.0 if passer else 0.0,
+                    "passing_epa": float(rng.normal()) if passer else 0.0,
+                    "fantasy_points_ppr": float(rng.gamma(2, 5)),
+                })
+                snaps.append({
+                    "pfr_player_id": "pfr" + player_id[3:], "offense_pct": float(rng.random()),
+                    "week": week, "season": season, "position": position,
+                })
+                if position in ("WR", "TE"):
+                    nextgen.append({
+                        "player_gsis_id": player_id, "season": season, "week": week, "player_position": position,
+                        "avg_cushion": 5.0, "avg_separation": float(rng.random() * 4),
+                        "catch_percentage": float(rng.random() * 100),
+                        "avg_yac_above_expectation": float(rng.normal()),
+                    })
+                if position == "RB":
+                    opportunity.append({
+                        "player_id": player_id, "position": position, "season": season, "week": week,
+                        "rush_yards_gained_exp": float(rng.gamma(3, 15)), "rush_touchdown_exp": float(rng.random()),
+                        "rush_first_down_exp": float(rng.gamma(2, 1.5)), "rec_yards_gained_exp": float(rng.gamma(2, 10)),
+                        "rec_touchdown_exp": float(rng.random() * .5), "rec_first_down_exp": float(rng.gamma(1, 1)),
+                        "receptions_exp": float(rng.gamma(2, 1.2)),
+                    })
+
+            qb = next(row[0] for row in roster[team] if row[2] == "QB")
+            rushers = [row[0] for row in roster[team] if row[2] == "RB"]
+            receivers = [row[0] for row in roster[team] if row[2] != "QB"]
+            for _ in range(plays_per_team):
+                run = bool(rng.random() < .45)
+                yardline = float(rng.integers(1, 100))
+                gained = float(rng.integers(-3, 25))
+                complete = 0.0 if run else float(rng.random() < .65)
+                plays.append({
+                    "game_id": game_id, "season": season, "week": week, "posteam": team, "defteam": opponent,
+                    "play_type": "run" if run else "pass", "yardline_100": yardline, "yards_gained": gained,
+                    "rush_attempt": float(run), "rush_touchdown": float(run and gained >= yardline),
+                    "pass_touchdown": float(not run and complete == 1 and gained >= yardline),
+                    "complete_pass": complete, "pass_attempt": 0.0 if run else 1.0,
+                    "air_yards": None if run else float(rng.integers(-2, 40)),
+                    "yards_after_catch": None if run or not complete else float(rng.integers(0, 10)),
+                    "yac_epa": None if run else float(rng.normal()),
+                    "comp_yac_epa": None if run else float(rng.normal() * complete),
+                    "epa": float(rng.normal()), "success": float(rng.random() < .45),
+                    "interception": 0.0 if run else float(rng.random() < .02), "sack": 0.0, "fumble_lost": 0.0,
+                    "rusher_player_id": str(rng.choice(rushers)) if run else None,
+                    "receiver_player_id": None if run else str(rng.choice(receivers)),
+                    "passer_player_id": None if run else qb,
+                })
+
+    keys = [pl.col("season").cast(pl.Int32), pl.col("week").cast(pl.Int32)]
+    return {
+        "players": players.with_columns(pl.lit(2024).alias("last_season"), pl.lit(2015).alias("draft_year")),
+        "ff_playerids": players.select("gsis_id", "position", pfr_id=pl.lit("pfr") + pl.col("gsis_id").str.slice(3)),
+        "schedules": pl.DataFrame(
+            schedule, schema=["game_id", "season", "week", "game_type", "home_team", "away_team"], orient="row"
+        ).with_columns(keys),
+        "player_stats": pl.DataFrame(stats).with_columns(keys),
+        "pbp": pl.DataFrame(plays).with_columns(keys),
+        "snap_counts": pl.DataFrame(snaps).with_columns(keys),
+        "nextgen": pl.DataFrame(nextgen).with_columns(keys),
+        "ff_opportunity": pl.DataFrame(opportunity).with_columns(keys),
+    }
+
+def in_seasons(df, seasons)->pl.DataFrame:
+    seasons = [seasons] if isinstance(seasons, int) else list(seasons)
+    return df.filter(pl.col("season").is_in(seasons))
@@ -0,0 +1,17 @@
+
+import pytest
+
+from fantasy_football_projections.wr_modeling.feature_engineering import get_training_df
+from fantasy_football_projections.wr_modeling.training import backtest
+
+from .synthetic import SEASONS
+
+
+def test_backtest_asks_to_rebuild_old_training_dfs(league, tmp_path):
+    # Training dfs written before the id cols were kept
+    location = str(tmp_path / "wr_training_ds.parquet")
+    get_training_df(list(SEASONS)).drop("week", "team").write_parquet(location)
+
+    with pytest.raises(ValueError, match="no week, team col") as error:
+        backtest(location, SEASONS[-1])
+    assert "write_training_df_to_parquet()" in str(error.value)
@@ -0,0 +1,17 @@
+
+import pytest
+
+from fantasy_football_projections.cli import parser, retrain
+from fantasy_football_projections.utils.training_scheduler import TrainingJob
+
+
+def test_train_rejects_positions_without_a_training_module():
+    assert parser().parse_args(["train", "WR", "wr.parquet"]).position == "WR"
+    with pytest.raises(SystemExit):
+        parser().parse_args(["train", "RB", "rb.parquet"])
+
+def test_retrain_rejects_positions_without_a_training_module():
+    with pytest.raises(ValueError, match="RB:rb.parquet"):
+        retrain(parser().parse_args(["retrain", "WR:wr.parquet", "RB:rb.parquet"]))
+    with pytest.raises(ValueError, match="can't be trained"):
+        TrainingJob("RB", "rb.parquet")
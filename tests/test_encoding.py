@@ -0,0 +1,79 @@
+
+import polars as pl
+import pytest
+
+from fantasy_football_projections.data_loading.encoding import (
+    TEAMS,
+    decode_gsis_id,
+    encode_frame,
+    encode_gsis_id,
+    game_key,
+    gsis_string,
+)
+
+from .synthetic import gsis_id
+
+# High 32 bits of a game_key
+GAME_SHIFT = 32
+
+
+@pytest.fixture
+def frame()->pl.DataFrame:
+    return pl.DataFrame({
+        "player_id": [gsis_id(33873), gsis_id(1), "00-9999999", None],
+        "receiver_player_id": [gsis_id(30003), None, gsis_id(2), gsis_id(3)],
+        "posteam": ["ARI", "WAS", "KC", None],
+        "defteam": ["SF", "BAL", "BUF", "SEA"],
+        "player_name": ["A", "B", "C", "D"],
+        "season": [2024, 2024, 2023, 2022],
+        "week": [1, 18, 22, 9],
+    })
+
+def test_encode_frame_round_trips(frame):
+    encoded = encode_frame(frame)
+    assert encoded.schema["player_id"] == pl.UInt32
+    assert encoded.schema["posteam"] == pl.Enum(TEAMS)
+    assert encoded["player_name"].equals(frame["player_name"])
+
+    decoded = encoded.with_columns(
+        gsis_string(pl.col("player_id")).alias("player_id"),
+        gsis_string(pl.col("receiver_player_id")).alias("receiver_player_id"),
+        pl.col("posteam").cast(pl.String),
+        pl.col("defteam").cast(pl.String),
+    )
+    assert decoded.equals(frame)
+
+def test_encode_frame_is_idempotent_and_lazy(frame):
+    encoded = encode_frame(frame)
+    assert encode_frame(encoded).equals(encoded)
+    assert encode_frame(frame.lazy()).collect().equals(encoded)
+
+def test_legacy_and_unknown_values():
+    df = encode_frame(pl.DataFrame({"team": ["OAK", "STL", "XYZ"], "player_id": ["00-0000001", "PFR123", ""]}))
+    assert df["team"].cast(pl.String).to_list() == ["LV", "LA", None]
+    assert df["player_id"].to_list() == [1, None, None]
+
+def test_gsis_id_helpers_round_trip():
+    assert encode_gsis_id("00-0033873") == 33873
+    assert decode_gsis_id(encode_gsis_id("00-0033873")) == "00-0033873"
+    assert encode_gsis_id(33873) == 33873
+    assert encode_gsis_id("not an id") is None
+    assert decode_gsis_id(None) is None
+
+def test_game_key_packs_season_week_and_player(frame):
+    encoded = encode_frame(frame).filter(pl.col("player_id").is_not_null())
+    keys = encoded.select(game_key().alias("key"))["key"]
+    assert keys.dtype == pl.UInt64
+    assert keys.is_unique().all()
+
+    # The key unpacks to the cols it was built from
+    unpacked = keys.to_frame().select(
+        (pl.col("key") % (1 << GAME_SHIFT)).cast(pl.UInt32).alias("player_id"),
+        (pl.col("key") // (1 << GAME_SHIFT) // 100).cast(pl.Int64).alias("season"),
+        (pl.col("key") // (1 << GAME_SHIFT) % 100).cast(pl.Int64).alias("week"),
+    )
+    assert unpacked.equals(encoded.select("player_id", "season", "week"))
+
+def test_game_key_orders_games_in_time():
+    df = pl.DataFrame({"player_id": [5, 1, 9], "season": [2023, 2024, 2024], "week": [22, 1, 2]})
+    assert df.select(game_key().alias("key"))["key"].is_sorted()
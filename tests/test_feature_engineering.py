@@ -0,0 +1,15 @@
+
+import polars as pl
+
+from fantasy_football_projections.wr_modeling.feature_engineering import get_training_df
+
+from .synthetic import SEASONS
+
+
+def test_training_df_drops_games_without_a_defensive_state(league):
+    df = get_training_df([SEASONS[0]])
+    assert df.height > 0
+    # Every team opens the season in week 1, its opponents have no earlier game to read
+    assert df["week"].min() == 2
+    defense_cols = [col for col in df.columns if "_against_" in col]
+    assert df.select(pl.all_horizontal(pl.col(defense_cols).is_null())).to_series().sum() == 0
@@ -0,0 +1,51 @@
+
+import pytest
+from polars.testing import assert_frame_equal
+
+from fantasy_football_projections.wr_modeling.feature_engineering import (
+    build_feature_df,
+    default_feature_plan,
+    get_training_df,
+)
+from fantasy_football_projections.wr_modeling.feature_graph import feature_plan
+
+from .synthetic import SEASONS
+
+
+def test_plan_of_a_plain_average():
+    plan = feature_plan(("receptions_3g_avg",))
+    assert plan.offense == (("3g_avg", ("receptions",)),)
+    assert plan.defense == () and plan.auxiliary == ()
+
+def test_auxiliary_features_resolve_to_their_averages():
+    plan = feature_plan(("receiver_quality_score_6g_avg", "racr_differential_season_avg"))
+    # Auxiliary features are in stage order, the ones they read come first
+    assert plan.auxiliary == (
+        ("6g_avg", ("avg_depth_of_target", "receiver_quality_score")),
+        ("season_avg", ("racr_differential",)),
+    )
+    # Averages are in get_stat_cols() order
+    assert plan.offense == (("6g_avg", ("receptions", "targets", "air_yards_targeted")), ("season_avg", ("racr",)))
+    assert plan.defense == (("season_avg", ("racr_against",)),)
+
+def test_windows_keep_their_computed_order():
+    plan = feature_plan(("targets_season_avg", "targets_3g_avg", "targets_6g_avg"))
+    assert [window for window, _ in plan.offense] == ["3g_avg", "6g_avg", "season_avg"]
+    assert plan.features == ("targets_season_avg", "targets_3g_avg", "targets_6g_avg")
+
+@pytest.mark.parametrize("feature", ["targets", "made_up_stat_3g_avg"])
+def test_unknown_features_raise(feature):
+    with pytest.raises(ValueError):
+        feature_plan((feature,))
+
+def test_pruned_build_matches_the_full_build(league):
+    features = ("receiver_quality_score_6g_avg", "racr_differential_season_avg", "receiving_yards_3g_avg")
+    plan = feature_plan(features)
+    pruned = build_feature_df(get_training_df([SEASONS[0]], plan), plan=plan)
+    full = build_feature_df(get_training_df([SEASONS[0]]), plan=default_feature_plan())
+
+    # Only the averages the plan reads are built, and they equal the full build's
+    assert set(pruned.columns) < set(full.columns)
+    assert not {col for col in pruned.columns if col.endswith("_avg")} - set(plan.window_cols() + list(features))
+    # Both training frames are ordered by (player_id, season, week)
+    assert_frame_equal(pruned, full.select(pruned.columns))
@@ -0,0 +1,121 @@
+
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from fantasy_football_projections.data_loading.encoding import encode_gsis_id, team_code
+from fantasy_football_projections.pipeline.engine import (
+    build_position_datasets,
+    carryover_lookback_seasons,
+)
+from fantasy_football_projections.pipeline.position_specs import position_specs
+from fantasy_football_projections.pipeline.sharding import sharded_build
+from fantasy_football_projections.utils.filtering import select_relevant_plays
+from fantasy_football_projections.utils.game_index import (
+    game_sequence_index,
+    games_before,
+    lookback_seasons,
+    player_game_index,
+    team_game_index,
+)
+
+from .synthetic import SEASONS, gsis_id
+
+# Row order of the built datasets
+KEYS = ["player_id", "season", "week"]
+
+
+def team(abbr)->str:
+    """
+    :return: Team as stored in encoded frames
+    """
+    return pl.select(team_code(pl.lit(abbr))).item()
+
+def prior_games(index, entity_col, entity, season, week, game_amt)->list[tuple[int, int]]:
+    """
+    :return: (season, week) of the entity's last game_amt games before (season, week)
+    """
+    targets = pl.DataFrame({entity_col: [entity], "season": [season], "week": [week]}).with_columns(
+        pl.col(entity_col).cast(index.schema[entity_col]),
+        pl.col("season").cast(index.schema["season"]),
+        pl.col("week").cast(index.schema["week"]),
+    )
+    window = games_before(index, targets, game_amt, entity_col)
+    return list(zip(window["game_season"].to_list(), window["game_week"].to_list()))
+
+@pytest.fixture(scope="module")
+def team_index(league)->pl.DataFrame:
+    return team_game_index(*SEASONS)
+
+def test_games_before_skips_byes(team_index):
+    # ARI is on bye in week 6, week 7's last two games are weeks 4 and 5
+    assert prior_games(team_index, "team", team("ARI"), 2022, 7, 2) == [(2022, 4), (2022, 5)]
+
+def test_games_before_reads_week_18(team_index):
+    assert prior_games(team_index, "team", team("BAL"), 2023, 1, 3) == [(2022, 16), (2022, 17), (2022, 18)]
+
+def test_games_before_crosses_playoffs_and_seasons(team_index):
+    ari, chi = team("ARI"), team("CHI")
+    # ARI played both playoff games of 2023, CHI lost its first one
+    assert prior_games(team_index, "team", ari, 2024, 1, 2) == [(2023, 19), (2023, 20)]
+    assert prior_games(team_index, "team", chi, 2024, 1, 2) == [(2023, 18), (2023, 19)]
+    # A window longer than a season reaches two seasons back
+    assert prior_games(team_index, "team", chi, 2024, 1, 20)[0] == (2022, 17)
+
+def test_game_seq_runs_across_seasons(league):
+    index = player_game_index(*SEASONS)
+    player = encode_gsis_id(gsis_id(30000))
+    seq = index.filter(pl.col("player_id") == player).sort("season", "week")["game_seq"].to_list()
+    assert seq == list(range(len(seq)))
+    assert index.filter((pl.col("player_id") == player) & (pl.col("season") == 2023))["week"].min() == 1
+
+def test_lookback_seasons(league):
+    index = player_game_index(*SEASONS)
+    assert lookback_seasons(index, 0, [2023], "player_id") == 0
+    assert lookback_seasons(index, 6, [2023, 2024], "player_id") == 1
+    assert lookback_seasons(index, 20, [2024], "player_id") == 2
+    assert lookback_seasons(index, None, [2024], "player_id") == 2
+    assert lookback_seasons(index, None, [2022], "player_id") == 0
+
+def test_select_relevant_plays_reaches_previous_season(league):
+    plays = league["pbp"].filter(pl.col("posteam") == "ARI")
+    relevant = select_relevant_plays(plays, [2023], 3, 1)
+    assert relevant.select("season", "week").unique().sort("week").rows() == [(2022, 16), (2022, 17), (2022, 18)]
+
+    # Every team is windowed in one pass
+    relevant = select_relevant_plays(league["pbp"], [2022], 2, 7, entity_col="posteam")
+    weeks = relevant.group_by("posteam").agg(pl.col("week").unique().sort()).sort("posteam")
+    assert dict(weeks.rows()) == {"ARI": [4, 5], "BAL": [4, 5], "CHI": [5, 6], "DAL": [5, 6]}
+
+def test_carryover_windows_read_previous_season(league):
+    df = build_position_datasets([2022, 2023], ["WR"])["WR"]
+    player = df["player_id"][0]
+    games = df.filter(pl.col("player_id") == player).sort("season", "week")
+    first_2023 = games.with_row_index().filter(pl.col("season") == 2023).row(0, named=True)
+
+    # The first game of 2023 averages the player's last 6 games of 2022
+    expected = games["targets"][first_2023["index"] - 6:first_2023["index"]].mean()
+    assert first_2023["targets_6g_carryover_avg"] == pytest.approx(expected)
+    assert first_2023["targets_3g_avg"] is None
+
+def test_sharded_carryover_build_matches_serial(league):
+    specs = [position_specs()["WR"], position_specs()["RB"]]
+    lookback = carryover_lookback_seasons(specs, list(SEASONS))
+    assert lookback == 1
+
+    serial = build_position_datasets(list(SEASONS), ["WR", "RB"])
+    sharded = sharded_build(
+        build_position_datasets, list(SEASONS), 1, lookback_seasons=lookback,
+        positions=["WR", "RB"], sort_by=KEYS
+    )
+    for position in ("WR", "RB"):
+        assert_frame_equal(sharded[position], serial[position])
+
+    # Without the lookback every season's first games lose their carryover averages
+    unshared = sharded_build(build_position_datasets, list(SEASONS), 1, positions=["WR"], sort_by=KEYS)
+    assert not unshared["WR"].equals(serial["WR"])
+
+def test_game_sequence_index_ignores_null_entities():
+    games = pl.DataFrame({"team": ["A", None, "A"], "season": [2024, 2024, 2023], "week": [1, 1, 18]})
+    index = game_sequence_index(games, "team")
+    assert index.rows() == [("A", 2023, 18, 0), ("A", 2024, 1, 1)]
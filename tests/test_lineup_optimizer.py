@@ -0,0 +1,57 @@
+
+import itertools
+
+import polars as pl
+import pytest
+
+from fantasy_football_projections.utils.lineup_optimizer import (
+    optimize_lineups,
+    random_slate,
+)
+
+# Small roster so every lineup of a slate can be enumerated
+ROSTER = {"RB": 1, "WR": 2, "TE": 1}
+FLEX = 1
+SALARY_CAP = 28_000
+
+
+def brute_force(slate, k)->list[float]:
+    """
+    :return: Projections of the k best distinct lineups, from every combination of players
+    """
+    players = slate.rows(named=True)
+    slots = sum(ROSTER.values()) + FLEX
+    totals = []
+    for lineup in itertools.combinations(players, slots):
+        if sum(player["salary"] for player in lineup) > SALARY_CAP:
+            continue
+        counts = {position: sum(player["position"] == position for player in lineup) for position in ROSTER}
+        if all(counts[p] >= ROSTER[p] for p in ROSTER) and sum(counts.values()) == slots:
+            totals.append(sum(player["projection"] for player in lineup))
+    return sorted(totals, reverse=True)[:k]
+
+def lineup_totals(lineups)->list[float]:
+    return lineups.group_by("lineup").agg(pl.col("projection").sum()).sort("lineup")["projection"].to_list()
+
+@pytest.mark.parametrize("seed", [0, 1, 3, 4])
+@pytest.mark.parametrize("k", [1, 5])
+def test_optimizer_matches_brute_force(seed, k):
+    slate = random_slate(16, seed)
+    lineups = optimize_lineups(slate, roster=ROSTER, flex=FLEX, salary_cap=SALARY_CAP, k=k)
+    expected = brute_force(slate, k)
+    assert len(expected) == k
+    assert lineup_totals(lineups) == pytest.approx(expected)
+
+    # Every lineup fills the roster under the cap with distinct players
+    for _, lineup in lineups.group_by("lineup"):
+        assert lineup.height == sum(ROSTER.values()) + FLEX
+        assert lineup["player_id"].n_unique() == lineup.height
+        assert lineup["salary"].sum() <= SALARY_CAP
+    assert lineups.group_by("lineup").agg(pl.col("player_id").sort()).select("player_id").is_unique().all()
+
+@pytest.mark.parametrize(("seed", "salary_cap"), [(0, 10_000), (2, SALARY_CAP)])
+def test_no_lineup_fits(seed, salary_cap):
+    # Seed 0 can't fill a roster under 10k, seed 2 draws no TE
+    lineups = optimize_lineups(random_slate(16, seed), roster=ROSTER, flex=FLEX, salary_cap=salary_cap)
+    assert lineups.is_empty()
+    assert {"lineup", "lineup_projection"} <= set(lineups.columns)
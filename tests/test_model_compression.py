@@ -0,0 +1,25 @@
+
+import inspect
+
+from fantasy_football_projections.cli import parser
+from fantasy_football_projections.utils.model_compression import (
+    DEFAULT_TOLERANCE,
+    compress,
+    save_variants,
+)
+from fantasy_football_projections.wr_modeling.training import compress_and_save
+
+
+def test_every_step_defaults_to_one_tolerance():
+    for fn in (compress, save_variants, compress_and_save):
+        assert inspect.signature(fn).parameters["tolerance"].default == DEFAULT_TOLERANCE, fn.__name__
+
+def test_cli_tolerance_defaults_to_the_module_tolerance(monkeypatch):
+    from fantasy_football_projections.wr_modeling import training
+
+    tolerances = []
+    monkeypatch.setattr(training, "compress_and_save", lambda location, tolerance: tolerances.append(tolerance))
+    for argv in (["compress", "wr.parquet"], ["compress", "wr.parquet", "--tolerance", "0.1"]):
+        args = parser().parse_args(argv)
+        args.func(args)
+    assert tolerances == [DEFAULT_TOLERANCE, 0.1]
@@ -0,0 +1,133 @@
+
+import numpy as np
+import polars as pl
+import pytest
+
+from fantasy_football_projections.data_loading.player_data import load_player_positions
+from fantasy_football_projections.pipeline.online import OnlineAggregator
+from fantasy_football_projections.pipeline.position_specs import position_specs
+from fantasy_football_projections.rb_metrics.rb_efficiency_metrics import (
+    rb_efficiency_metrics,
+)
+from fantasy_football_projections.utils.window_kernel import window_means
+from fantasy_football_projections.wr_metrics.wr_defense_stat_aggregation import (
+    get_wr_defense_pbp_stats,
+)
+from fantasy_football_projections.wr_metrics.wr_stat_aggregation import (
+    get_wr_pbp_stats_weekly,
+)
+
+from .synthetic import SEASONS
+
+# Relative error allowed between online float64 sums and the batch sums of compact frames
+RTOL = 1e-5
+
+
+def assert_totals_match(online, batch, keys, cols):
+    """
+    Every online game is in batch with the same totals of cols
+    """
+    joined = online.join(batch.select(keys + cols), on=keys, how="left", suffix="_batch")
+    assert joined.height == online.height > 0
+    for col in cols:
+        np.testing.assert_allclose(
+            joined[col].to_numpy(), joined[f"{col}_batch"].fill_null(0).cast(pl.Float64).to_numpy(),
+            rtol=RTOL, atol=1e-6, err_msg=col
+        )
+
+@pytest.fixture(scope="module")
+def aggregator(league)->OnlineAggregator:
+    """
+    Every synthetic play ingested a week at a time, with a tenth of the plays held back and
+    ingested at the end like late rows and stat corrections of closed weeks
+    """
+    plays = league["pbp"].with_row_index("_row")
+    late = plays.sample(fraction=0.1, seed=0)
+    plays = plays.join(late, on="_row", how="anti")
+
+    aggregator = OnlineAggregator()
+    for _, week_plays in plays.group_by(["season", "week"], maintain_order=True):
+        aggregator.ingest(week_plays.drop("_row"))
+    aggregator.ingest(late.sort("_row", descending=True).drop("_row"))
+    aggregator.close_week(SEASONS[-1], 22)
+    return aggregator
+
+def test_wr_weekly_totals_match_batch(aggregator):
+    online = aggregator.weekly("WR")
+    batch = get_wr_pbp_stats_weekly(list(SEASONS))
+    cols = ["redzone_targets", "big_play_attempts", "comp_yac_epa", "redzone_touchdowns",
+            "big_play_conversions", "air_yards_targeted"]
+    assert_totals_match(online, batch, ["player_id", "season", "week"], cols)
+
+    # Every wr game of the batch is online
+    wr_ids = load_player_positions().filter(pl.col("position") == "WR")["gsis_id"]
+    assert batch.filter(pl.col("player_id").is_in(wr_ids)).height == online.height
+
+def test_wr_defense_totals_match_batch(aggregator):
+    online = aggregator.weekly("WR", "defense").rename({"opponent_team": "defteam"})
+    batch = get_wr_defense_pbp_stats(list(SEASONS))
+    cols = list(position_specs()["WR"].defense_play_aggs)
+    assert_totals_match(online, batch, ["defteam", "season", "week"], cols)
+
+def test_rb_weekly_totals_match_efficiency_metrics(aggregator):
+    online = aggregator.weekly("RB")
+    batch = rb_efficiency_metrics(list(SEASONS))
+    cols = ["redzone_carries", "redzone_td_rushes", "successful_rushes", "explosive_rushes",
+            "rush_fpoints_gained", "weighted_carries", "redzone_carry_weight", "redzone_targets",
+            "redzone_td_receptions", "successful_targets", "explosive_receptions", "rec_fpoints_gained",
+            "weighted_targets", "redzone_target_weight"]
+    assert_totals_match(online, batch, ["player_id", "season", "week"], cols)
+
+@pytest.mark.parametrize(("position", "side"), [("WR", "offense"), ("RB", "offense"), ("WR", "defense")])
+def test_features_match_batch_windows(aggregator, position, side):
+    spec = position_specs()[position]
+    entity_col = "player_id" if side == "offense" else "opponent_team"
+    windows = spec.offense_windows if side == "offense" else spec.defense_windows
+    cols = [col for col in aggregator.weekly(position, side).columns if col not in (entity_col, "season", "week")]
+
+    # Batch windows over the weekly totals, read at each entity's last game
+    weekly = aggregator.weekly(position, side).filter(pl.col("season") == SEASONS[-1])
+    batch = window_means(weekly, cols, windows, [entity_col, "season"], 0).group_by(entity_col).last()
+
+    online = aggregator.features(position, side)
+    schema = [f"{col}_{suffix}" for suffix in windows for col in cols]
+    joined = online.join(batch, on=entity_col, how="inner", suffix="_batch")
+    assert joined.height == online.height == batch.height
+    assert (joined["week"] == joined["week_batch"]).all()
+    for col in schema:
+        np.testing.assert_allclose(
+            joined[col].to_numpy(), joined[f"{col}_batch"].to_numpy(), rtol=1e-9, atol=1e-9, err_msg=col
+        )
+
+def test_late_plays_refold_closed_windows(league):
+    plays = league["pbp"].filter((pl.col("season") == SEASONS[0]) & (pl.col("week") <= 3))
+    in_order = OnlineAggregator(["WR"])
+    in_order.ingest(plays)
+    in_order.close_week(SEASONS[0], 3)
+
+    # Week 1 arrives last, after weeks 2 and 3 closed
+    late = OnlineAggregator(["WR"])
+    late.ingest(plays.filter(pl.col("week") > 1))
+    late.close_week(SEASONS[0], 3)
+    late.ingest(plays.filter(pl.col("week") == 1))
+    assert late.features("WR").equals(in_order.features("WR"))
+    assert late.weekly("WR").equals(in_order.weekly("WR"))
+
+def test_failed_ingest_keeps_the_file_offset(league, tmp_path, monkeypatch):
+    path = str(tmp_path / "pbp.csv")
+    plays = league["pbp"].filter((pl.col("season") == SEASONS[0]) & (pl.col("week") == 1))
+    plays.write_csv(path)
+
+    aggregator = OnlineAggregator(["WR"])
+    ingest = aggregator.ingest
+
+    def fail(plays):
+        raise RuntimeError("ingest failed")
+    monkeypatch.setattr(aggregator, "ingest", fail)
+    with pytest.raises(RuntimeError):
+        aggregator.ingest_file(path)
+
+    # The rows that failed are read again
+    monkeypatch.setattr(aggregator, "ingest", ingest)
+    assert aggregator.ingest_file(path) == plays.height
+    assert aggregator.ingest_file(path) == 0
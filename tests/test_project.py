@@ -0,0 +1,31 @@
+
+import polars as pl
+import pytest
+
+from fantasy_football_projections.wr_modeling.project import (
+    prepare_wr_metrics,
+    wr_offensive_states,
+)
+
+from .synthetic import SEASONS, gsis_id
+
+# A receiver and a running back of the synthetic league (rosters are QB, RB, RB, WR, WR, WR, TE)
+WR_ID, RB_ID = gsis_id(30003), gsis_id(30001)
+
+
+def test_offensive_state_is_the_latest_game(league):
+    states = wr_offensive_states(SEASONS[-1], 5, [WR_ID])
+    assert states.height == 1
+    assert states["week"].item() < 5
+
+def test_player_without_prior_games_raises(league):
+    assert wr_offensive_states(SEASONS[-1], 1, [WR_ID]).is_empty()
+    with pytest.raises(ValueError, match="no wr games before week 1"):
+        prepare_wr_metrics(WR_ID, SEASONS[-1], 1)
+    with pytest.raises(ValueError, match=RB_ID):
+        prepare_wr_metrics(RB_ID, SEASONS[-1], 5)
+
+def test_bye_week_projects_nothing(league):
+    # Every synthetic team's bye is week 6 or 9, WR_ID's team (ARI) rests in week 6
+    assert prepare_wr_metrics(WR_ID, SEASONS[-1], 6) is None
+    assert isinstance(prepare_wr_metrics(WR_ID, SEASONS[-1], 7), pl.DataFrame)
@@ -0,0 +1,112 @@
+
+import itertools
+
+import nflreadpy
+import polars as pl
+import pytest
+
+from fantasy_football_projections.utils import projection_cache
+from fantasy_football_projections.utils.projection_cache import (
+    _MISS,
+    ProjectionCache,
+    data_version,
+    refresh_season_data,
+)
+
+from .synthetic import in_seasons
+
+# Season treated as in progress
+SEASON = 2024
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Replaces the cache's wall clock with one that ticks once per call, so last uses never tie
+    """
+    ticks = itertools.count()
+    monkeypatch.setattr(projection_cache.time, "time", lambda: float(next(ticks)))
+
+@pytest.fixture
+def current_season(league, monkeypatch):
+    """
+    Makes SEASON the current season with only its first 10 weeks of stats played, yields
+    fn() that publishes the rest of the season
+    """
+    monkeypatch.setattr(projection_cache, "CURRENT_SEASON", SEASON)
+    stats = league["player_stats"]
+    monkeypatch.setattr(
+        nflreadpy, "load_player_stats",
+        lambda seasons=None, **kwargs: in_seasons(stats, seasons).filter(
+            (pl.col("season") < SEASON) | (pl.col("week") <= 10)
+        )
+    )
+    refresh_season_data(SEASON)
+
+    def publish():
+        monkeypatch.setattr(
+            nflreadpy, "load_player_stats", lambda seasons=None, **kwargs: in_seasons(stats, seasons)
+        )
+    yield publish
+
+    # Later tests must not read the truncated season
+    monkeypatch.undo()
+    refresh_season_data(SEASON)
+
+def test_disk_tier_evicts_least_recently_used(tmp_path, clock):
+    cache = ProjectionCache(maxsize=1, path=str(tmp_path / "cache.sqlite"), disk_maxsize=3)
+    keys = [cache.key(f"P{i}", 2024, 1, "model", "data") for i in range(4)]
+    for key in keys[:3]:
+        cache.put(key, 1.0)
+
+    # A fourth entry evicts the oldest
+    cache.put(keys[3], 1.0)
+    assert cache.get(keys[0]) is _MISS
+
+    # Reading P1 from disk in a new process makes P2 the least recently used
+    cache = ProjectionCache(maxsize=1, path=str(tmp_path / "cache.sqlite"), disk_maxsize=3)
+    assert cache.get(keys[1]) == 1.0
+    cache.put(keys[0], 2.0)
+    assert cache.get(keys[2]) is _MISS
+    assert cache.stats()["disk_size"].item() == 3
+
+def test_disk_tier_indexes_last_use(tmp_path):
+    cache = ProjectionCache(path=str(tmp_path / "cache.sqlite"))
+    plan = cache._db.execute(
+        "EXPLAIN QUERY PLAN SELECT key FROM projections ORDER BY used DESC LIMIT -1 OFFSET 10"
+    ).fetchall()
+    assert any("projections_used" in row[-1] for row in plan)
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ProjectionCache(maxsize=2)
+    keys = [cache.key(f"P{i}", 2024, 1, "model", "data") for i in range(3)]
+    cache.put(keys[0], 1.0)
+    cache.put(keys[1], None)
+    assert cache.get(keys[0]) == 1.0
+    cache.put(keys[2], 3.0)
+    assert cache.get(keys[1]) is _MISS
+    assert cache.get(keys[0]) == 1.0
+
+def test_completed_seasons_are_final():
+    assert data_version(2020) == "2020-final"
+
+def test_new_games_change_the_version_after_a_refresh(current_season):
+    before = data_version(SEASON)
+    current_season()
+    # Loaded sources are kept until they are refreshed
+    assert data_version(SEASON) == before
+    refresh_season_data(SEASON)
+    assert data_version(SEASON) != before
+
+def test_stale_sources_are_reloaded(current_season, monkeypatch):
+    before = data_version(SEASON)
+    current_season()
+    monkeypatch.setattr(projection_cache, "CURRENT_SEASON_MAX_AGE", 0)
+    assert data_version(SEASON) != before
+
+def test_new_data_version_misses_cached_projections():
+    cache = ProjectionCache()
+    computed = []
+    for version in ("v1", "v1", "v2"):
+        cache.get_or_compute(cache.key("P0", 2024, 1, "model", version), lambda: computed.append(version) or 1.0)
+    assert computed == ["v1", "v2"]
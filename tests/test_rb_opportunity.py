@@ -0,0 +1,45 @@
+
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from fantasy_football_projections.data_loading.player_data import (
+    load_ff_opportunity_data,
+    load_player_stats,
+)
+from fantasy_football_projections.rb_metrics.rb_opportunity_metrics import (
+    rb_opportunity_scores,
+)
+from fantasy_football_projections.rb_metrics.utility import (
+    OPPORTUNITY_BOUND_COLS,
+    STAT_BOUND_COLS,
+    rusher_opportunity_bounds,
+)
+
+from .synthetic import SEASONS
+
+
+def test_bounds_are_percentiles_of_each_season_and_position(league):
+    bounds = rusher_opportunity_bounds(*SEASONS)
+    assert bounds.select("season", "position").is_unique().all()
+    assert bounds.filter(pl.col("position") == "RB").height == len(SEASONS)
+
+    for season in SEASONS:
+        rb = bounds.filter((pl.col("season") == season) & (pl.col("position") == "RB")).row(0, named=True)
+        stats = load_player_stats(season).filter(pl.col("position") == "RB")
+        opportunity = load_ff_opportunity_data(season).filter(pl.col("position") == "RB")
+        for frame, cols in ((stats, STAT_BOUND_COLS), (opportunity, OPPORTUNITY_BOUND_COLS)):
+            for name, col in cols.items():
+                assert rb[f"{name}_lower"] == frame[col].quantile(0.01)
+                assert rb[f"{name}_upper"] == frame[col].quantile(0.99)
+
+def test_bounds_of_a_season_ignore_other_seasons(league):
+    together = rusher_opportunity_bounds(*SEASONS).filter(pl.col("season") == SEASONS[0])
+    alone = rusher_opportunity_bounds(SEASONS[0])
+    assert_frame_equal(together, alone, check_row_order=False, check_column_order=False)
+
+def test_scores_are_scaled_by_their_own_season(league):
+    together = rb_opportunity_scores(list(SEASONS)).filter(pl.col("season") == SEASONS[-1])
+    alone = rb_opportunity_scores([SEASONS[-1]])
+    keys = ["player_id", "season", "week"]
+    assert together.height == alone.height > 0
+    assert_frame_equal(together.sort(keys), alone.sort(keys), check_column_order=False)
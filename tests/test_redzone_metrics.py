@@ -0,0 +1,58 @@
+
+import polars as pl
+import pytest
+
+from fantasy_football_projections.config import REDZONE_YARDLINE
+from fantasy_football_projections.data_loading.player_data import (
+    get_rb_ids,
+    load_pbp_data,
+)
+from fantasy_football_projections.pipeline.engine import build_position_datasets
+from fantasy_football_projections.rb_metrics.rb_efficiency_metrics import (
+    rb_efficiency_metrics,
+)
+from fantasy_football_projections.rb_metrics.utility import get_rb_efficiency_cols
+from fantasy_football_projections.wr_metrics import wr_stat_aggregation
+
+from .synthetic import SEASONS
+
+KEYS = ["player_id", "season", "week"]
+
+
+@pytest.fixture(scope="module")
+def efficiency(league)->pl.DataFrame:
+    return rb_efficiency_metrics(list(SEASONS))
+
+def test_efficiency_cols(efficiency):
+    assert set(get_rb_efficiency_cols()) <= set(efficiency.columns)
+
+def test_redzone_carries_read_redzone_yardline(efficiency):
+    plays = load_pbp_data(*SEASONS).filter(pl.col("rusher_player_id").is_in(get_rb_ids()))
+    expected = plays.group_by(pl.col("rusher_player_id").alias("player_id"), "season", "week").agg(
+        (pl.col("yardline_100") <= REDZONE_YARDLINE).sum().alias("expected")
+    )
+    joined = efficiency.join(expected, on=KEYS, how="inner")
+    assert joined.height > 0
+    assert (joined["redzone_carries"] == joined["expected"]).all()
+
+def test_weighted_opportunities_match_the_rb_spec(efficiency):
+    cols = ["weighted_carries", "weighted_targets", "redzone_carry_weight", "redzone_target_weight"]
+    spec = build_position_datasets(list(SEASONS), ["RB"])["RB"].select(KEYS + cols)
+    joined = efficiency.join(spec, on=KEYS, how="inner", suffix="_spec")
+    assert joined.height > 0
+    for col in cols:
+        assert (joined[col] - joined[f"{col}_spec"].fill_null(0)).abs().max() < 1e-9, col
+
+def test_capitalization_is_null_without_redzone_opportunities(efficiency):
+    no_redzone = efficiency.filter(pl.col("redzone_carry_weight") == 0)
+    assert no_redzone["redzone_carry_capitalization"].null_count() == no_redzone.height
+
+    scored = efficiency.filter(pl.col("redzone_carry_weight") > 0)
+    expected = scored["redzone_td_rushes"] * scored["redzone_carries"] / scored["redzone_carry_weight"]
+    assert (scored["redzone_carry_capitalization"] - expected).abs().max() < 1e-9
+
+def test_wr_redzone_targets_read_redzone_yardline(league, monkeypatch):
+    weekly = wr_stat_aggregation.get_wr_pbp_stats_weekly([SEASONS[0]])
+    monkeypatch.setattr(wr_stat_aggregation, "REDZONE_YARDLINE", 0)
+    assert weekly["redzone_targets"].sum() > 0
+    assert wr_stat_aggregation.get_wr_pbp_stats_weekly([SEASONS[0]])["redzone_targets"].sum() == 0
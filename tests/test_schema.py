@@ -0,0 +1,80 @@
+
+import numpy as np
+import polars as pl
+import pytest
+
+from fantasy_football_projections.data_loading.schema import (
+    compact_frame,
+    downcast_drift,
+    schema_fingerprint,
+)
+from fantasy_football_projections.data_loading.snapshots import snapshot_path
+from fantasy_football_projections.utils.window_kernel import window_means
+
+# Windows of the offensive and defensive averages the pipelines build
+WINDOWS = {"3g_avg": (3, 1), "6g_avg": (6, 4), "season_avg": None}
+
+# Relative error allowed between averages of the compact frame and of the float64 source
+RTOL = 1e-5
+
+
+@pytest.fixture(scope="module")
+def weekly_stats()->pl.DataFrame:
+    """
+    :return: Synthetic weekly player stats with float64 cols, as loaded before compact_frame()
+    """
+    rng = np.random.default_rng(0)
+    players, seasons, weeks = 60, (2023, 2024), 17
+    rows = players * len(seasons) * weeks
+    teams = np.array(["ARI", "BAL", "CHI", "DAL", "KC", "SF"])
+    return pl.DataFrame({
+        "player_id": np.repeat([f"P{i}" for i in range(players)], len(seasons) * weeks),
+        "season": np.tile(np.repeat(seasons, weeks), players).astype(np.int32),
+        "week": np.tile(np.arange(1, weeks + 1), players * len(seasons)).astype(np.int32),
+        "opponent_team": rng.choice(teams, rows),
+        "targets": rng.poisson(6, rows).astype(np.float64),
+        "receiving_yards": rng.poisson(55, rows).astype(np.float64),
+        "receiving_tds": rng.binomial(2, 0.2, rows).astype(np.float64),
+        "receiving_epa": rng.normal(1.5, 4.0, rows),
+        "target_share": rng.beta(2, 10, rows),
+        "fantasy_points_ppr": rng.gamma(2.0, 5.0, rows),
+    })
+
+def test_compact_frame_dtypes(weekly_stats):
+    compact = compact_frame(weekly_stats)
+    assert compact.schema["targets"] == pl.Int16
+    assert compact.schema["receiving_yards"] == pl.Int16
+    assert compact.schema["receiving_epa"] == pl.Float32
+    assert compact.schema["season"] == pl.Int32
+    assert compact.estimated_size() < weekly_stats.estimated_size()
+
+def test_window_averages_within_tolerance(weekly_stats):
+    cols = ["targets", "receiving_yards", "receiving_tds", "receiving_epa", "target_share", "fantasy_points_ppr"]
+    group = ["player_id", "season"]
+    expected = window_means(weekly_stats, cols, WINDOWS, group)
+    actual = window_means(compact_frame(weekly_stats), cols, WINDOWS, group)
+
+    for col in [f"{col}_{suffix}" for suffix in WINDOWS for col in cols]:
+        assert expected[col].is_null().equals(actual[col].is_null()), col
+        np.testing.assert_allclose(
+            actual[col].drop_nulls().to_numpy(), expected[col].drop_nulls().to_numpy(), rtol=RTOL, atol=1e-6,
+            err_msg=col
+        )
+
+def test_defense_aggregates_within_tolerance(weekly_stats):
+    keys = ["opponent_team", "season", "week"]
+    drift = downcast_drift(weekly_stats.drop("player_id"), keys)
+    assert drift["max_rel_error"].max() < RTOL, drift.filter(pl.col("max_rel_error") >= RTOL)
+
+    # Season averages of the weekly totals allowed, as the defense cube builds them
+    def averages(frame):
+        cols = [col for col in frame.columns if col not in keys + ["player_id"]]
+        totals = frame.group_by(keys).agg(pl.col(cols).cast(pl.Float64).sum()).sort(keys)
+        return window_means(totals, cols, WINDOWS, ["opponent_team", "season"], 0), cols
+
+    (expected, cols), (actual, _) = averages(weekly_stats), averages(compact_frame(weekly_stats))
+    for col in [f"{col}_{suffix}" for suffix in WINDOWS for col in cols]:
+        np.testing.assert_allclose(actual[col].to_numpy(), expected[col].to_numpy(), rtol=RTOL, err_msg=col)
+
+def test_snapshot_path_is_keyed_on_schema():
+    assert snapshot_path("pbp", (2023, 2024)).endswith(f"pbp_2023_2024_{schema_fingerprint()}.arrow")
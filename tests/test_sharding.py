@@ -0,0 +1,32 @@
+
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from fantasy_football_projections.pipeline.sharding import sharded_build
+from fantasy_football_projections.wr_modeling.feature_engineering import get_training_df
+
+from .synthetic import SEASONS
+
+# Row order of the built datasets
+KEYS = ["player_id", "season", "week"]
+
+
+def test_wr_training_df_shards_match_serial(league):
+    serial = get_training_df(list(SEASONS))
+    # Offensive windows and defensive states restart each season, shards need no earlier season
+    sharded = sharded_build(get_training_df, list(SEASONS), 1, sort_by=KEYS)
+    assert serial.height > 0
+    # Window means are differences of prefix sums over the whole frame, a shard's prefix is
+    # shorter so the last bits of a mean can differ
+    assert_frame_equal(sharded, serial, atol=1e-6)
+
+def test_serial_training_df_is_sorted(league):
+    df = get_training_df([SEASONS[-1]])
+    assert df.select(KEYS).equals(df.select(KEYS).sort(KEYS))
+
+def test_sharded_build_merges_dict_results():
+    def build(seasons):
+        return {"a": pl.DataFrame({"season": seasons, "x": [s * 2 for s in seasons]})}
+
+    merged = sharded_build(build, [2024, 2022, 2023], 1)
+    assert merged["a"]["season"].to_list() == [2022, 2023, 2024]
@@ -0,0 +1,83 @@
+
+import numpy as np
+import polars as pl
+import pytest
+
+from fantasy_football_projections.utils.simulation import (
+    N_QUANTILES,
+    projection_band,
+    residual_distributions,
+    simulate_slate,
+    teammate_correlation,
+)
+
+# Games, players per team game and residual std of the synthetic predictions
+GAMES, TEAMMATES, STD = 400, 4, 5.0
+
+
+def predictions(rho, seed=0)->pl.DataFrame:
+    """
+    :return: Out-of-sample predictions whose residuals share a team game draw weighted by rho
+    """
+    rng = np.random.default_rng(seed)
+    game = np.repeat(np.arange(GAMES), TEAMMATES)
+    residual = STD * (np.sqrt(rho) * rng.standard_normal(GAMES)[game] +
+                      np.sqrt(1 - rho) * rng.standard_normal(GAMES * TEAMMATES))
+    projection = rng.uniform(2, 25, GAMES * TEAMMATES)
+    return pl.DataFrame({
+        "team": [f"T{g % 32}" for g in game],
+        "season": 2024,
+        "week": game // 32 + 1,
+        "position": np.tile(["WR", "WR", "RB", "TE"], GAMES),
+        "projection": projection,
+        "fantasy_points_ppr": projection + residual,
+    })
+
+@pytest.fixture(scope="module")
+def distributions()->pl.DataFrame:
+    return residual_distributions(predictions(0.0))
+
+@pytest.fixture(scope="module")
+def slate()->pl.DataFrame:
+    return pl.DataFrame({
+        "team": ["A", "A", "A", "B", "B"],
+        "position": ["WR", "WR", "RB", "WR", "TE"],
+        "projection": [18.0, 12.0, 15.0, 8.0, 3.0],
+    })
+
+@pytest.mark.parametrize("rho", [0.0, 0.3, 0.6])
+def test_teammate_correlation_recovers_the_shared_draw(rho):
+    assert teammate_correlation(predictions(rho)) == pytest.approx(rho, abs=0.06)
+
+def test_teammate_correlation_without_teammates():
+    df = predictions(0.5).unique(["team", "season", "week"], keep="first")
+    assert teammate_correlation(df) == 0.0
+
+def test_simulations_are_seeded(distributions, slate):
+    sims = simulate_slate(slate, distributions, n_sims=1000, seed=1)
+    assert sims.shape == (1000, slate.height)
+    assert sims.dtype == np.float32
+    assert np.array_equal(sims, simulate_slate(slate, distributions, n_sims=1000, seed=1))
+
+def test_simulations_center_on_the_projection(distributions, slate):
+    sims = simulate_slate(slate, distributions, n_sims=20_000, seed=0, floor=None)
+    # Each player's median is the projection plus the median residual of its band
+    medians = slate.with_columns(projection_band(pl.col("projection")).alias("band")).join(
+        distributions, on=["position", "band"], how="left", maintain_order="left"
+    ).select(pl.col("projection") + pl.col("quantiles").list.get(N_QUANTILES // 2))
+    np.testing.assert_allclose(np.median(sims, axis=0), medians.to_series().to_numpy(), atol=0.2)
+
+def test_floor_clips_low_outcomes(distributions, slate):
+    assert (simulate_slate(slate, distributions, n_sims=5000, seed=0, floor=None) < 0).any()
+    assert simulate_slate(slate, distributions, n_sims=5000, seed=0).min() >= 0
+
+def test_rho_correlates_teammates_only(distributions, slate):
+    for rho in (0.0, 0.5):
+        corr = np.corrcoef(simulate_slate(slate, distributions, n_sims=20_000, rho=rho, seed=0, floor=None).T)
+        # Players 0 and 1 share team A, player 3 plays for team B
+        assert corr[0, 1] == pytest.approx(rho, abs=0.05)
+        assert corr[0, 3] == pytest.approx(0.0, abs=0.05)
+
+def test_missing_distribution_raises(distributions, slate):
+    with pytest.raises(ValueError, match="QB"):
+        simulate_slate(slate.with_columns(pl.lit("QB").alias("position")), distributions, n_sims=10)
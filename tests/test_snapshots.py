@@ -0,0 +1,52 @@
+
+import os
+
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from fantasy_football_projections.data_loading import snapshots
+from fantasy_football_projections.data_loading.snapshots import snapshotted
+from fantasy_football_projections.rb_metrics.rb_efficiency_metrics import (
+    rb_efficiency_metrics,
+)
+
+from .synthetic import SEASONS
+
+
+@pytest.fixture
+def snapshot_dir(league, tmp_path, monkeypatch)->str:
+    """
+    Turns snapshots on, written to a temporary folder
+    """
+    monkeypatch.setattr(snapshots, "SNAPSHOTS_ENABLED", True)
+    monkeypatch.setattr(snapshots, "SNAPSHOT_DIR", str(tmp_path))
+    return str(tmp_path)
+
+def test_derived_weekly_frames_are_snapshotted(snapshot_dir):
+    built = rb_efficiency_metrics([SEASONS[0]])
+    names = os.listdir(snapshot_dir)
+    assert [name for name in names if name.startswith("rb_efficiency_weekly_")]
+    # The second load reads the snapshot
+    assert_frame_equal(rb_efficiency_metrics([SEASONS[0]]), built)
+    assert os.listdir(snapshot_dir) == names
+
+def test_derivation_changes_write_new_snapshots(snapshot_dir):
+    def derive(seasons):
+        return pl.DataFrame({"season": seasons, "x": [1] * len(seasons)})
+    first = snapshotted("derived", code=())(derive)
+
+    def derive(seasons):
+        return pl.DataFrame({"season": seasons, "x": [2] * len(seasons)})
+    second = snapshotted("derived", code=())(derive)
+
+    assert first([SEASONS[0]])["x"].to_list() == [1]
+    assert second([SEASONS[0]])["x"].to_list() == [2]
+    assert len(os.listdir(snapshot_dir)) == 2
+
+def test_snapshots_are_keyed_on_the_schema_fingerprint(snapshot_dir, monkeypatch):
+    raw = snapshotted("raw")(lambda seasons: pl.DataFrame({"season": seasons}))
+    raw([SEASONS[0]])
+    monkeypatch.setattr(snapshots, "schema_fingerprint", lambda: "new dtype rules")
+    raw([SEASONS[0]])
+    assert len(os.listdir(snapshot_dir)) == 2
@@ -0,0 +1,26 @@
+
+import pytest
+
+from fantasy_football_projections.data_loading import encoding
+from fantasy_football_projections.pipeline.stage_cache import StageGraph, code_hash
+from fantasy_football_projections.wr_modeling import feature_engineering
+from fantasy_football_projections.wr_modeling.feature_engineering import training_stages
+
+
+def stage_keys(tmp_path)->dict[str, str]:
+    graph = StageGraph(training_stages([2022]), str(tmp_path))
+    return {name: graph.key(name) for name in graph.stages}
+
+@pytest.mark.parametrize("patched", ["schema_fingerprint", "code_hash"])
+def test_schema_and_encoding_changes_miss_source_stages(league, tmp_path, monkeypatch, patched):
+    before = stage_keys(tmp_path)
+    if patched == "schema_fingerprint":
+        monkeypatch.setattr(feature_engineering, "schema_fingerprint", lambda: "new dtype rules")
+    else:
+        monkeypatch.setattr(
+            feature_engineering, "code_hash", lambda obj: "new encoding" if obj is encoding else code_hash(obj)
+        )
+    after = stage_keys(tmp_path)
+    # Every stage reads a source stage or reads one downstream of it
+    assert before.keys() == after.keys()
+    assert all(before[name] != after[name] for name in before)
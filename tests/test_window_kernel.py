@@ -0,0 +1,113 @@
+
+import numpy as np
+import polars as pl
+import pytest
+
+from fantasy_football_projections.utils.window_kernel import (
+    lazy_window_means,
+    segment_starts,
+    segmented_window_means,
+    window_lookback,
+    window_means,
+)
+
+# (window_size, min_periods) of every window the pipelines build
+WINDOWS = [(3, 1), (6, 4), (6, 1), (6, 3), (None, 1)]
+
+
+def reference_window_means(values, starts, window_size=None, min_periods=1, shift=1)->np.ndarray:
+    """
+    Row by row implementation of segmented_window_means()
+    """
+    values = np.asarray(values, dtype=np.float64)
+    means = np.full(values.shape, np.nan)
+    group_start = 0
+    for row in range(values.shape[0]):
+        if starts[row]:
+            group_start = row
+        source = row - shift
+        if source < group_start:
+            continue
+        low = group_start if window_size is None else max(source - window_size + 1, group_start)
+        for col in range(values.shape[1]):
+            window = values[low:source + 1, col]
+            window = window[np.isfinite(window)]
+            if len(window) >= max(min_periods, 1):
+                means[row, col] = window.sum() / len(window)
+    return means
+
+@pytest.fixture(scope="module")
+def random_values()->tuple[np.ndarray, np.ndarray]:
+    """
+    :return: (values, starts) of 2000 rows in groups of ~12, 5% of values NaN and some +-inf
+    """
+    rng = np.random.default_rng(0)
+    rows, cols, missing = 2000, 4, 0.05
+    starts = rng.random(rows) < 1 / 12
+    values = rng.normal(10, 5, (rows, cols))
+    values[rng.random((rows, cols)) < missing] = np.nan
+    values[rng.random((rows, cols)) < missing / 3] = np.inf
+    values[rng.random((rows, cols)) < missing / 3] = -np.inf
+    return values, starts
+
+@pytest.mark.parametrize("shift", [0, 1, 2])
+@pytest.mark.parametrize(("window_size", "min_periods"), WINDOWS)
+def test_kernel_matches_reference(random_values, window_size, min_periods, shift):
+    values, starts = random_values
+    np.testing.assert_allclose(
+        segmented_window_means(values, starts, window_size, min_periods, shift),
+        reference_window_means(values, starts, window_size, min_periods, shift),
+        rtol=0, atol=1e-9
+    )
+
+def test_windows_restart_at_group_boundaries():
+    values = np.array([1., 2., 3., 100., 200.])
+    starts = np.array([True, False, False, True, False])
+    means = segmented_window_means(values, starts, 3, 1, 1)
+    np.testing.assert_array_equal(means, [np.nan, 1., 1.5, np.nan, 100.])
+
+def test_windows_restart_each_season():
+    df = pl.DataFrame({
+        "player_id": ["A"] * 4 + ["B"] * 2,
+        "season": [2023, 2023, 2024, 2024, 2024, 2024],
+        "week": [17, 18, 1, 2, 1, 2],
+        "targets": [4, 6, 10, 2, 8, 8],
+    })
+    per_season = window_means(df, ["targets"], {"3g_avg": (3, 1)}, ["player_id", "season"])
+    assert per_season["targets_3g_avg"].to_list() == [None, 4.0, None, 10.0, None, 8.0]
+
+    # Grouped by player only, week 1 reads the previous season but never another player
+    carryover = window_means(df, ["targets"], {"3g_avg": (3, 1)}, ["player_id"])
+    assert carryover["targets_3g_avg"].to_list() == [None, 4.0, 5.0, 20 / 3, None, 8.0]
+
+def test_null_inputs_are_skipped():
+    df = pl.DataFrame({"player_id": ["A"] * 4, "targets": [4.0, None, float("nan"), 8.0]})
+    means = window_means(df, ["targets"], {"season_avg": None}, ["player_id"], 0)
+    # Missing values count towards neither sum nor count, and later rows aren't poisoned
+    assert means["targets_season_avg"].to_list() == [4.0, 4.0, 4.0, 6.0]
+
+def test_min_periods():
+    values = np.array([1., np.nan, 3., 5., 7.])
+    starts = np.array([True, False, False, False, False])
+    means = segmented_window_means(values, starts, 6, 3, 0)
+    np.testing.assert_array_equal(means, [np.nan, np.nan, np.nan, 3., 4.])
+
+    df = pl.DataFrame({"player_id": ["A"] * 5, "targets": values})
+    nulls = window_means(df, ["targets"], {"6g_avg": (6, 3)}, ["player_id"], 0)["targets_6g_avg"]
+    assert nulls.null_count() == 3
+
+def test_segment_starts():
+    df = pl.DataFrame({"player_id": ["A", "A", None, None, "B"], "season": [2023, 2024, 2024, 2024, 2024]})
+    assert segment_starts(df, ["player_id", "season"]).tolist() == [True, True, True, False, True]
+
+def test_lazy_window_means_matches_eager():
+    df = pl.DataFrame({"player_id": ["A", "A", "A", "B"], "targets": [1, 2, 3, 4]})
+    windows = {"3g_avg": (3, 1), "season_avg": None}
+    lazy = lazy_window_means(df.lazy(), ["targets"], windows, ["player_id"]).collect()
+    assert lazy.equals(window_means(df, ["targets"], windows, ["player_id"]))
+
+def test_window_lookback():
+    assert window_lookback({"3g_avg": (3, 1), "6g_avg": (6, 4)}) == 6
+    assert window_lookback({"6g_avg": (6, 4)}, 0) == 5
+    assert window_lookback({"season_avg": None}) is None
+    assert window_lookback({}) == 0